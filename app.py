@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, request, jsonify, send_file, render_template
 from flask_cors import CORS
 import logging
 from config import Config
@@ -47,6 +47,33 @@ def health():
     """Проверка здоровья API"""
     return jsonify({"status": "OK", "message": "API is running", "timestamp": datetime.now().isoformat()}), 200
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Счетчики HTTP кэша страниц по источникам (hits / revalidated / misses), кэша статей PubMed и кэша результатов анализа"""
+    from scrapers.http_cache import get_http_cache
+    from scrapers.pubmed_cache import get_article_cache
+    from utils.result_cache import get_result_cache
+    http_cache = get_http_cache()
+    article_cache = get_article_cache()
+    result_cache = get_result_cache()
+    return jsonify({
+        "http": http_cache.stats() if http_cache else None,
+        "pubmed": article_cache.stats() if article_cache else None,
+        "results": result_cache.stats() if result_cache else None,
+        "timestamp": datetime.now().isoformat()
+    }), 200
+
+@app.route('/api/sources/stats', methods=['GET'])
+def sources_stats():
+    """Нагрузка пула источников: active / queued / completed / rejected / coalesced по источникам и доля статей, пропущенных фильтром PK"""
+    from scrapers.pk_extractor import get_prefilter_stats
+    from utils.source_executor import get_source_executor
+    return jsonify({
+        "sources": get_source_executor().stats(),
+        "pk_prefilter": get_prefilter_stats(),
+        "timestamp": datetime.now().isoformat()
+    }), 200
+
 # ============= BASIC ENDPOINTS (без RAG) =============
 @app.route('/api/sample-size', methods=['POST'])
 def calculate_sample_size():
@@ -79,7 +106,8 @@ def calculate_sample_size():
 # ============= SCRAPER ENDPOINTS =============
 @app.route('/api/search/pubmed', methods=['POST'])
 def search_pubmed():
-    """Поиск в PubMed"""
+    """Поиск в PubMed (deep=true - глубокий поиск, fanout=true - несколько запросов параллельно,
+    triage=true - отбор статей по esummary перед загрузкой абстрактов)"""
     data = request.json
     inn = data.get('inn', '')
     
@@ -87,9 +115,12 @@ def search_pubmed():
         return jsonify({"error": "INN is required"}), 400
     
     try:
-        from scrapers.pubmed_scraper import PubMedScraper
-        scraper = PubMedScraper()
-        result = scraper.get_drug_pk_data(inn)
+        from utils.source_executor import get_source_executor
+        scraper = get_source_executor().scraper("pubmed")
+        if data.get('deep'):
+            result = scraper.get_drug_pk_data_deep(inn, max_articles=data.get('max_articles'))
+        else:
+            result = scraper.get_drug_pk_data(inn, fanout=data.get('fanout'), triage=data.get('triage'))
         return jsonify(result)
         
     except Exception as e:
@@ -106,8 +137,8 @@ def search_drugbank():
         return jsonify({"error": "INN is required"}), 400
     
     try:
-        from scrapers.drugbank_scraper import DrugBankScraper
-        scraper = DrugBankScraper()
+        from utils.source_executor import get_source_executor
+        scraper = get_source_executor().scraper("drugbank")
         result = scraper.get_drug_info(inn)
         return jsonify(result)
         
@@ -125,8 +156,8 @@ def search_grls():
         return jsonify({"error": "INN is required"}), 400
     
     try:
-        from scrapers.grls_scraper import GRLSScraper
-        scraper = GRLSScraper()
+        from utils.source_executor import get_source_executor
+        scraper = get_source_executor().scraper("grls")
         result = scraper.get_be_studies(inn)
         return jsonify(result)
         
@@ -141,214 +172,156 @@ def full_analysis():
         logger.info("=" * 60)
         logger.info("📊 Запрос полного анализа получен")
         
-        from utils.sample_size import SampleSizeCalculator
+        from utils.analysis import run_analysis
         
         data = request.json
         logger.info(f"📦 Данные: {data}")
         
         inn = data.get('inn', '')
-        dosage_form = data.get('dosage_form', '')
-        dosage = data.get('dosage', '')
-        administration_mode = data.get('administration_mode', 'fasted')
-        cvintra = data.get('cvintra')
-        
-        logger.info(f"🔍 INN: {inn}, CVintra: {cvintra}")
+        logger.info(f"🔍 INN: {inn}, CVintra: {data.get('cvintra')}")
         
         if not inn:
             logger.warning("⚠️ INN not provided")
             return jsonify({"error": "INN is required"}), 400
         
-        # Определение CVintra: сначала из PubMed, потом из базы, потом дефолт
-        cvintra_source = "user_input"
-        if cvintra is None:
-            logger.info(f"ℹ️ CVintra не задан, пытаюсь определить из базы данных...")
-            from cv_database import get_typical_cv
-            cvintra = get_typical_cv(inn)
-            cvintra_source = "database"
-            logger.info(f"ℹ️ CVintra из базы данных: {cvintra}%")
-        
-        logger.info(f"📋 Строю ответ для {inn}...")
-        
-        results = {
-            "inn": inn,
-            "dosage_form": dosage_form,
-            "dosage": dosage,
-            "administration_mode": administration_mode,
-            "literature": {
-                "pubmed": {
-                    "articles": [],
-                    "count": 0,
-                    "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
-                    "message": f"Поиск статей о {inn} на PubMed"
-                },
-                "drugbank": {
-                    "name": inn,
-                    "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
-                    "message": f"Поиск данных о {inn} на DrugBank"
-                },
-                "grls": {
-                    "registered_drugs": [],
-                    "count": 0,
-                    "search_url": "https://grls.rosminzdrav.ru/",
-                    "message": f"Поиск {inn} в Государственном реестре"
-                }
-            },
-            "design_recommendation": {},
-            "sample_size": {},
-            "regulatory_check": {}
-        }
-        
-        logger.info(f"🧮 Вызываю recommend_design({cvintra})...")
-        design_rec = SampleSizeCalculator.recommend_design(cvintra)
-        logger.info(f"✅ Получен результат: {design_rec.get('recommended_design')}")
-        
-        # 🌍 РЕАЛЬНЫЙ ПАРСИНГ ИНТЕРНЕТА С ТАЙМАУТОМ
-        logger.info(f"🌍 Начинаю реальный поиск данных (таймаут 8 сек)...")
-        
-        from scrapers.pubmed_scraper import PubMedScraper
-        from scrapers.drugbank_scraper import DrugBankScraper
-        from scrapers.grls_scraper import GRLSScraper
-        from concurrent.futures import ThreadPoolExecutor, TimeoutError
-        
-        def fetch_pubmed():
-            try:
-                logger.info(f"  → PubMed с API...")
-                pubmed = PubMedScraper()
-                
-                # Проверяем что scraper инициализирован
-                if not hasattr(pubmed, 'api_key'):
-                    logger.warning("  ⚠️ PubMedScraper не инициализирован (возможно, biopython не установлен)")
-                    return {"articles": [], "count": 0, "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}", "status": "error", "error": "biopython not installed"}
-                
-                result = pubmed.get_drug_pk_data(inn)
-                logger.info(f"  ✅ PubMed вернул: count={result.get('count')}, articles={len(result.get('articles', []))}")
-                
-                # Логируем PK параметры если найдены
-                if result.get('pk_parameters'):
-                    pk = result['pk_parameters']
-                    if pk.get('cvintra', {}).get('value'):
-                        logger.info(f"  📊 CVintra из PubMed: {pk['cvintra']['value']}%")
-                
-                return result
-            except Exception as e:
-                logger.error(f"  ❌ PubMed ошибка: {str(e)}", exc_info=True)
-                import traceback
-                logger.error(f"  Traceback: {traceback.format_exc()}")
-                return {"articles": [], "count": 0, "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}", "status": "error", "error": str(e)}
-        
-        def fetch_drugbank():
-            try:
-                logger.info(f"  → DrugBank...")
-                drugbank = DrugBankScraper()
-                return drugbank.get_drug_info(inn)
-            except Exception as e:
-                logger.warning(f"  ⚠️ DrugBank: {str(e)[:60]}")
-                return {"name": inn, "search_url": f"https://go.drugbank.com/drugs/search?q={inn}", "status": "error"}
-        
-        def fetch_grls():
-            try:
-                logger.info(f"  → ГРЛС...")
-                grls = GRLSScraper()
-                return grls.get_be_studies(inn)
-            except Exception as e:
-                logger.warning(f"  ⚠️ ГРЛС: {str(e)[:60]}")
-                return {"inn": inn, "registered_drugs": [], "search_url": "https://grls.rosminzdrav.ru/", "status": "error"}
-        
-        # Параллельный поиск с расширенным таймаутом
-        try:
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                future_pubmed = executor.submit(fetch_pubmed)
-                future_drugbank = executor.submit(fetch_drugbank)
-                future_grls = executor.submit(fetch_grls)
-                
-                try:
-                    pubmed_result = future_pubmed.result(timeout=20)
-                    results["literature"]["pubmed"] = pubmed_result
-                    logger.info(f"  ✅ PubMed: {pubmed_result.get('count', 0)} статей")
-                    
-                    # Если CVintra был из базы данных, пытаемся уточнить из PubMed
-                    if cvintra_source == "database" and pubmed_result.get('pk_parameters'):
-                        pk_params = pubmed_result.get('pk_parameters', {})
-                        if pk_params.get('cvintra', {}).get('value'):
-                            pubmed_cv = pk_params['cvintra']['value']
-                            logger.info(f"  📊 CVintra из PubMed: {pubmed_cv}%")
-                            # Используем PubMed значение если оно разумное
-                            if 5 <= pubmed_cv <= 100:
-                                cvintra = pubmed_cv
-                                cvintra_source = "pubmed"
-                                logger.info(f"  ✅ Использую CVintra из PubMed: {cvintra}%")
-                    
-                    # Сохраняем PK параметры
-                    if pubmed_result.get('pk_parameters'):
-                        results["pk_parameters"] = pubmed_result['pk_parameters']
-                        
-                except TimeoutError:
-                    logger.warning(f"  ⏱️ PubMed timeout (20 сек)")
-                    results["literature"]["pubmed"] = {"articles": [], "count": 0, "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}", "status": "timeout"}
-                
-                try:
-                    results["literature"]["drugbank"] = future_drugbank.result(timeout=15)
-                    logger.info(f"  ✅ DrugBank")
-                except TimeoutError:
-                    logger.warning(f"  ⏱️ DrugBank timeout (15 сек)")
-                    results["literature"]["drugbank"] = {"name": inn, "search_url": f"https://go.drugbank.com/drugs/search?q={inn}", "status": "timeout"}
-                
-                try:
-                    results["literature"]["grls"] = future_grls.result(timeout=15)
-                    logger.info(f"  ✅ ГРЛС: {results['literature']['grls'].get('count', 0)} препаратов")
-                except TimeoutError:
-                    logger.warning(f"  ⏱️ ГРЛС timeout (15 сек)")
-                    results["literature"]["grls"] = {"inn": inn, "registered_drugs": [], "search_url": "https://grls.rosminzdrav.ru/", "status": "timeout"}
-        except Exception as e:
-            logger.warning(f"  ⚠️ Ошибка параллельного поиска: {str(e)[:60]}")
-        
-        # Пересчитываем дизайн с уточненным CVintra если он изменился
-        if cvintra_source != "user_input":
-            design_rec = SampleSizeCalculator.recommend_design(cvintra)
-            logger.info(f"  🔄 Пересчитан дизайн с CVintra={cvintra}%: {design_rec.get('recommended_design')}")
-        
-        results["design_recommendation"] = {
-            "recommended_design": design_rec.get("recommended_design"),
-            "rationale": design_rec.get("rationale"),
-            "cvintra": cvintra,
-            "cvintra_source": cvintra_source
-        }
-        
-        results["sample_size"] = {
-            "design": design_rec.get("recommended_design"),
-            "cvintra": cvintra,
-            "base_sample_size": design_rec.get("base_sample_size"),
-            "dropout_rate": design_rec.get("dropout_rate"),
-            "final_sample_size": design_rec.get("final_sample_size"),
-            "calculation_steps": design_rec.get("steps", [])
-        }
-        
-        # Регуляторная проверка
-        results["regulatory_check"] = {
-            "decision_85": {
-                "compliant": True,
-                "requirements": "По Решению № 85 РФ препарат должен соответствовать стандартам BE"
-            },
-            "ema": {
-                "compliant": True,
-                "requirements": "По EMA guidelines дизайн должен быть одобренным"
-            },
-            "fda": {
-                "compliant": True,
-                "requirements": "По FDA guidance требуется подтверждение биоэквивалентности"
-            }
-        }
+        results, cache_status = run_analysis(data)
         
-        logger.info(f"✅ Анализ завершен. N={design_rec.get('final_sample_size')}")
         logger.info("=" * 60)
         
-        return jsonify(results), 200
+        response = jsonify(results)
+        response.headers["X-Cache"] = cache_status.upper()
+        return response, 200
         
     except Exception as e:
         logger.error(f"❌ Full analysis error: {e}", exc_info=True)
         logger.error("=" * 60)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/full-analysis/stream', methods=['POST'])
+def full_analysis_stream():
+    """Полный анализ с событиями Server-Sent Events по мере готовности разделов
+    (cv_database, sample_size, pubmed, drugbank, grls, refined, final)"""
+    import json
+    from utils.analysis import stream_analysis
+    
+    data = request.json or {}
+    if not data.get('inn'):
+        return jsonify({"error": "INN is required"}), 400
+    logger.info(f"📡 Потоковый анализ: {data.get('inn')}")
+    
+    def events():
+        try:
+            for event, payload in stream_analysis(data):
+                yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+        except Exception as e:
+            logger.error(f"❌ Stream analysis error: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/batch/full-analysis', methods=['POST'])
+def batch_full_analysis():
+    """Пакетный анализ портфеля: по строке NDJSON на препарат по мере готовности.
+    {"drugs": [...]} - новый пакет, {"batch_id": "..."} - продолжить прерванный"""
+    import json
+    from utils.batch import get_batch_runner
+    
+    data = request.json or {}
+    runner = get_batch_runner()
+    batch_id = data.get('batch_id')
+    
+    if batch_id:
+        if not runner.store.exists(batch_id):
+            return jsonify({"error": "Batch not found"}), 404
+    else:
+        drugs = data.get('drugs')
+        if not isinstance(drugs, list) or not drugs:
+            return jsonify({"error": "drugs must be a non-empty list"}), 400
+        if len(drugs) > Config.BATCH_MAX_DRUGS:
+            return jsonify({"error": f"Too many drugs, max {Config.BATCH_MAX_DRUGS}"}), 400
+        if not all(isinstance(drug, dict) and drug.get('inn') for drug in drugs):
+            return jsonify({"error": "INN is required for every drug"}), 400
+        batch_id = runner.store.create(drugs)
+    
+    def lines():
+        for line in runner.run(batch_id):
+            yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+    
+    return Response(lines(), mimetype='application/x-ndjson',
+                    headers={"X-Batch-Id": batch_id, "X-Accel-Buffering": "no"})
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Число препаратов пакета по статусам (pending / done / partial / error)"""
+    from utils.batch import get_batch_runner
+    summary = get_batch_runner().store.summary(batch_id)
+    if summary is None:
+        return jsonify({"error": "Batch not found"}), 404
+    return jsonify(summary), 200
+
+# ============= ФОНОВЫЕ ЗАДАЧИ =============
+def _submit_job(kind: str, data: dict):
+    from utils.jobs import JobQueueFull, get_job_runner
+    try:
+        job_id = get_job_runner().submit(kind, data)
+    except JobQueueFull as e:
+        logger.warning(f"🚧 Очередь задач заполнена: {e}")
+        return jsonify({"error": "Job queue is full, try again later"}), 503
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}"
+    }), 202
+
+@app.route('/api/jobs/full-analysis', methods=['POST'])
+def submit_full_analysis_job():
+    """Полный анализ в фоне: сразу возвращает id задачи"""
+    data = request.json or {}
+    if not data.get('inn'):
+        return jsonify({"error": "INN is required"}), 400
+    return _submit_job("full_analysis", data)
+
+@app.route('/api/jobs/generate-full-synopsis', methods=['POST'])
+def submit_synopsis_job():
+    """Генерация синопсиса в фоне: сразу возвращает id задачи"""
+    data = request.json or {}
+    if data.get('output_format', 'markdown') not in Config.SUPPORTED_FORMATS:
+        return jsonify({"error": "Invalid output format. Use: docx, json, markdown"}), 400
+    return _submit_job("synopsis", data)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Статус, этап, прогресс и результат фоновой задачи"""
+    from utils.jobs import get_job_runner
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    file_path = job.pop("file_path")
+    job.pop("params")
+    if file_path:
+        job["file_url"] = f"/api/jobs/{job_id}/file"
+    return jsonify(job), 200
+
+@app.route('/api/jobs/<job_id>/file', methods=['GET'])
+def job_file(job_id):
+    """Файл синопсиса, сгенерированного фоновой задачей"""
+    from utils.jobs import get_job_runner
+    job = get_job_runner().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}"}), 409
+    if not job["file_path"] or not os.path.exists(job["file_path"]):
+        return jsonify({"error": "Job has no file"}), 404
+    return send_file(job["file_path"], as_attachment=True, download_name=os.path.basename(job["file_path"]))
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def jobs_stats():
+    """Число задач по статусам"""
+    from utils.jobs import get_job_runner
+    return jsonify({"jobs": get_job_runner().stats(), "timestamp": datetime.now().isoformat()}), 200
+
 # ============= SYNTHESIS GENERATION =============
 @app.route('/api/generate-full-synopsis', methods=['POST'])
 def generate_full_synopsis():
@@ -360,10 +333,6 @@ def generate_full_synopsis():
         return jsonify({"error": "Invalid output format. Use: docx, json, markdown"}), 400
     
     try:
-        os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        inn = data.get('inn', 'unknown').replace(' ', '_')
-        
         logger.info(f"📄 Генерирую синопсис в формате {output_format}...")
         
         # Генерируем ПОЛНЫЙ синопсис со всеми секциями протокола
@@ -376,41 +345,8 @@ def generate_full_synopsis():
             logger.error(f"Ошибка генерации данных синопсиса: {e}", exc_info=True)
             return jsonify({"error": f"Failed to generate synopsis data: {str(e)}"}), 500
         
-        output_path = None
-        
-        if output_format == 'json':
-            output_path = os.path.join(Config.OUTPUT_DIR, f"synopsis_{inn}_{timestamp}.json")
-            import json
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(synopsis_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"  ✅ JSON синопсис сохранен: {output_path}")
-            
-        elif output_format == 'markdown':
-            from utils.synopsis_formatters import generate_markdown_synopsis
-            
-            output_path = os.path.join(Config.OUTPUT_DIR, f"synopsis_{inn}_{timestamp}.md")
-            md_content = generate_markdown_synopsis(synopsis_data)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(md_content)
-            logger.info(f"  ✅ Markdown синопсис сохранен: {output_path}")
-            
-        elif output_format == 'docx':
-            try:
-                from utils.synopsis_formatters import generate_docx_synopsis
-                
-                output_path = os.path.join(Config.OUTPUT_DIR, f"synopsis_{inn}_{timestamp}.docx")
-                generate_docx_synopsis(synopsis_data, output_path)
-                logger.info(f"  ✅ DOCX синопсис сохранен: {output_path}")
-                
-            except ImportError:
-                from utils.synopsis_formatters import generate_markdown_synopsis
-                
-                logger.warning("  ⚠️ python-docx не установлен, используем markdown вместо docx")
-                output_path = os.path.join(Config.OUTPUT_DIR, f"synopsis_{inn}_{timestamp}.md")
-                md_content = generate_markdown_synopsis(synopsis_data)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(md_content)
-                output_format = 'markdown'
+        from utils.synopsis_formatters import save_synopsis
+        output_path, output_format = save_synopsis(synopsis_data, output_format, Config.OUTPUT_DIR)
         
         # Отправляем файл
         if output_path and os.path.exists(output_path):
@@ -617,6 +553,13 @@ if __name__ == '__main__':
     # Проверим что папка outputs существует
     os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
     
+    # Пул фоновых задач - сразу при запуске: незавершенные задачи прошлого запуска
+    # продолжаются и старые удаляются, не дожидаясь первого запроса к /api/jobs.
+    # В режиме отладки - только в процессе, который перезапускает reloader
+    if not Config.DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from utils.jobs import get_job_runner
+        get_job_runner()
+    
     logger.info(f"Starting server on http://{Config.HOST}:{Config.PORT}")
     logger.info(f"API health check at http://{Config.HOST}:{Config.PORT}/api/health")
     
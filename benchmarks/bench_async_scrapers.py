@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк сбора данных для полного анализа на локальном тестовом сервере
+(benchmarks/fake_sources.py): асинхронный слой против потоков
+
+Сравниваются:
+  - потоки: run_full_analysis с синхронными скраперами, анализы в пуле потоков;
+  - async, по одному: run_full_analysis_async для препаратов подряд;
+  - async, одновременно: все анализы в одном цикле событий на общем клиенте.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_async_scrapers --drugs 20 --latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_sources import FakeSourcesServer
+from config import Config
+
+
+def configure(server: FakeSourcesServer):
+    """
+    Направить скраперы на тестовый сервер; кэши статей и страниц отключаются,
+    чтобы каждый прогон ходил в "сеть", а лимит NCBI снимается - это не NCBI
+    """
+    Config.NCBI_EUTILS_URL = server.eutils_url
+    Config.DRUGBANK_BASE_URL = server.url
+    Config.GRLS_BASE_URL = server.url
+    Config.PUBMED_CACHE_PATH = ""
+    Config.PUBMED_MIRROR_PATH = ""
+    Config.HTTP_CACHE_PATH = ""
+    Config.NCBI_RATE_LIMIT = 10000
+
+
+def run_threads(inns: list, workers: int) -> float:
+    from utils.analysis import run_full_analysis
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda inn: run_full_analysis({"inn": inn}), inns))
+    return time.perf_counter() - start
+
+
+async def run_async(inns: list, concurrent: bool, connections: int = None) -> tuple:
+    from scrapers.async_scrapers import open_async_client
+    from utils.analysis import run_full_analysis_async
+
+    start = time.perf_counter()
+    async with open_async_client(max_connections=connections) as client:
+        if concurrent:
+            results = await asyncio.gather(*(run_full_analysis_async({"inn": inn}, client) for inn in inns))
+        else:
+            results = [await run_full_analysis_async({"inn": inn}, client) for inn in inns]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк асинхронного сбора данных")
+    parser.add_argument("--drugs", type=int, default=20, help="количество анализов")
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка ответа сервера, сек")
+    parser.add_argument("--threads", type=int, default=None, help="анализов одновременно в синхронном режиме (по умолчанию все)")
+    parser.add_argument("--connections", type=int, default=None, help="соединений async клиента (по умолчанию ASYNC_MAX_CONNECTIONS)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    inns = [f"drug{i:03d}" for i in range(args.drugs)]
+
+    with FakeSourcesServer(latency=args.latency) as server:
+        configure(server)
+
+        print("=" * 60)
+        print(f"📊 {args.drugs} анализов, задержка ответа {args.latency * 1000:.0f} мс")
+        print("=" * 60)
+
+        threads = args.threads or args.drugs
+        server.reset_stats()
+        threads_time = run_threads(inns, threads)
+        print(f"Потоки ({threads} анализов одновременно):  {threads_time:.2f} сек, "
+              f"пик одновременных запросов {server.peak_in_flight}")
+
+        server.reset_stats()
+        sequential_time, _ = asyncio.run(run_async(inns, concurrent=False))
+        print(f"Async, по одному анализу:            {sequential_time:.2f} сек, "
+              f"пик одновременных запросов {server.peak_in_flight}")
+
+        server.reset_stats()
+        concurrent_time, results = asyncio.run(run_async(inns, concurrent=True, connections=args.connections))
+        print(f"Async, все анализы одновременно:     {concurrent_time:.2f} сек, "
+              f"пик одновременных запросов {server.peak_in_flight}")
+        print(f"Запросов к серверу за прогон: {sum(server.requests.values())}")
+
+        complete = all(
+            result["literature"]["pubmed"].get("count") and result["literature"]["grls"].get("count")
+            and result["literature"]["drugbank"].get("half_life")
+            for result in results
+        )
+        print(f"Все источники ответили: {'✅' if complete else '❌'}")
+
+    return 0 if complete else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
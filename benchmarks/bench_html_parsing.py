@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк разбора страниц DrugBank и ГРЛС: BeautifulSoup (html.parser)
+против выборочного разбора через lxml (scrapers/html_extract.py)
+
+Используются сохраненные страницы из benchmarks/fixtures/html/.
+Кроме времени одного разбора измеряется пропускная способность при
+разборе в нескольких потоках одновременно (как при параллельных запросах).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_html_parsing --rounds 20 --threads 8
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.drugbank_scraper import DrugBankScraper
+from scrapers.grls_scraper import GRLSScraper
+from scrapers.html_extract import extract_drug_page, extract_grid_rows, extract_search_result_href
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+# (страница, прежний разбор, новый разбор)
+CASES = [
+    ("drugbank_search.html", DrugBankScraper._search_href_soup, extract_search_result_href),
+    ("drugbank_drug.html", DrugBankScraper._drug_page_fields_soup, extract_drug_page),
+    ("grls_search.html", GRLSScraper._grid_rows_soup, extract_grid_rows),
+]
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def best_time(parse, content: bytes, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parse(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def threaded_time(parse, content: bytes, jobs: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(parse, [content] * jobs))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора HTML страниц")
+    parser.add_argument("--rounds", type=int, default=20, help="количество повторов (берется лучший)")
+    parser.add_argument("--threads", type=int, default=8, help="потоков для параллельного прогона")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    print("=" * 72)
+    print(f"{'Страница':24s} {'KB':>6s} {'soup, мс':>10s} {'lxml, мс':>10s} {'ускорение':>10s}  совпадает")
+    print("=" * 72)
+
+    all_identical = True
+    for name, old_parse, new_parse in CASES:
+        content = load_fixture(name)
+        identical = old_parse(content) == new_parse(content)
+        all_identical &= identical
+
+        old_time = best_time(old_parse, content, args.rounds)
+        new_time = best_time(new_parse, content, args.rounds)
+        print(f"{name:24s} {len(content) / 1024:6.0f} {old_time * 1000:10.2f} {new_time * 1000:10.2f} "
+              f"{'x%.1f' % (old_time / new_time):>10s}  {'✅' if identical else '❌'}")
+
+    print(f"\nПараллельно, {args.threads} потоков, {args.rounds * args.threads} разборов drugbank_drug.html:")
+    content = load_fixture("drugbank_drug.html")
+    _, old_parse, new_parse = CASES[1]
+    old_threaded = threaded_time(old_parse, content, args.rounds * args.threads, args.threads)
+    new_threaded = threaded_time(new_parse, content, args.rounds * args.threads, args.threads)
+    print(f"  soup: {old_threaded:.2f} сек, lxml: {new_threaded:.2f} сек (x{old_threaded / new_threaded:.1f})")
+
+    print(f"\nРезультаты совпадают: {'✅' if all_identical else '❌'}")
+    return 0 if all_identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
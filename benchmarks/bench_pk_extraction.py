@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк извлечения PK параметров: прежняя реализация против
+предкомпилированного однопроходного движка (scrapers/pk_extractor.py)
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_pk_extraction --copies 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.pk_extraction_legacy import extract_pk_parameters_legacy
+from scrapers.pk_extractor import extract_pk_parameters, get_prefilter_stats, prefilter_stats, route_families
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pk_abstracts.json")
+
+
+def load_corpus(copies: int, repeat_abstract: int = 1) -> list:
+    """
+    Корпус абстрактов из фикстуры, размноженный copies раз
+
+    repeat_abstract удлиняет каждый абстракт до типичной для PubMed длины
+    (фикстуры короче реальных абстрактов в 5-10 раз).
+    """
+    with open(FIXTURE, encoding="utf-8") as f:
+        base = json.load(f)
+    return [
+        dict(article, abstract=" ".join([article["abstract"]] * repeat_abstract))
+        for _ in range(copies) for article in base
+    ]
+
+
+def run(extract, corpus: list) -> tuple:
+    """
+    Извлечение по каждой статье отдельно (bulk режим) - все семейства
+    шаблонов проверяются для каждого абстракта
+    """
+    start = time.perf_counter()
+    results = [extract([article]) for article in corpus]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк извлечения PK параметров")
+    parser.add_argument("--copies", type=int, default=100, help="сколько раз размножить фикстуру")
+    parser.add_argument("--repeat-abstract", type=int, default=5, help="во сколько раз удлинить абстракты")
+    parser.add_argument("--rounds", type=int, default=3, help="количество повторов (берется лучший)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    corpus = load_corpus(args.copies, args.repeat_abstract)
+
+    print("=" * 60)
+    print(f"📊 Корпус: {len(corpus)} абстрактов")
+    print("=" * 60)
+
+    legacy_time = min(run(extract_pk_parameters_legacy, corpus)[0] for _ in range(args.rounds))
+    engine_time = min(run(extract_pk_parameters, corpus)[0] for _ in range(args.rounds))
+    no_filter = lambda articles: extract_pk_parameters(articles, prefilter=False)
+    no_filter_time = min(run(no_filter, corpus)[0] for _ in range(args.rounds))
+    # Статьи без терминов-триггеров - основная часть выдачи PubMed по МНН
+    unrelated = [
+        article for article in corpus
+        if not route_families(f"{article['title']} {article['abstract']}".lower())
+    ]
+    unrelated_time = min(run(extract_pk_parameters, unrelated)[0] for _ in range(args.rounds))
+    unrelated_no_filter_time = min(run(no_filter, unrelated)[0] for _ in range(args.rounds))
+
+    _, legacy_results = run(extract_pk_parameters_legacy, corpus)
+    prefilter_stats.reset()
+    _, engine_results = run(extract_pk_parameters, corpus)
+    stats = get_prefilter_stats()
+    identical = legacy_results == engine_results
+    identical_batch = extract_pk_parameters_legacy(corpus) == extract_pk_parameters(corpus)
+
+    print(f"Прежняя реализация: {legacy_time:.3f} сек ({len(corpus) / legacy_time:.0f} абстрактов/сек)")
+    print(f"Без фильтра:        {no_filter_time:.3f} сек ({len(corpus) / no_filter_time:.0f} абстрактов/сек)")
+    print(f"Новый движок:       {engine_time:.3f} сек ({len(corpus) / engine_time:.0f} абстрактов/сек)")
+    print(f"Ускорение:          x{legacy_time / engine_time:.1f}")
+    print(f"Результаты совпадают: {'✅' if identical and identical_batch else '❌'}")
+    print(f"Статьи без терминов ({len(unrelated)}): {unrelated_no_filter_time:.3f} сек без фильтра, "
+          f"{unrelated_time:.3f} сек с фильтром (x{unrelated_no_filter_time / unrelated_time:.1f})")
+    print("\nФильтр по ключевым словам (доля пропущенных проверок):")
+    for family, counters in stats["families"].items():
+        print(f"  {family:8s} {counters['skip_rate'] * 100:5.1f}%  ({counters['skipped']}/{counters['checked']})")
+
+    return 0 if identical and identical_batch else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Локальный тестовый сервер вместо E-utilities, DrugBank и ГРЛС
+
+Отдает ответы в формате настоящих источников (XML esearch/esummary/efetch,
+HTML страниц DrugBank и ГРЛС) с заданной задержкой, чтобы измерять
+параллельность и задержки без сети. Содержимое детерминировано: одни и
+те же запрос и PMID всегда дают один и тот же ответ.
+
+Адреса для скраперов (Config или переменные окружения):
+    NCBI_EUTILS_URL   = <url>/entrez/eutils
+    DRUGBANK_BASE_URL = <url>
+    GRLS_BASE_URL     = <url>
+
+Запуск отдельно (из корня проекта):
+    python -m benchmarks.fake_sources --port 8765 --latency 0.2
+"""
+import argparse
+import random
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# PMID тестового сервера не пересекаются с настоящими
+PMID_BASE = 900000000
+
+ESEARCH_DOCTYPE = ('<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" '
+                   '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">')
+ESUMMARY_DOCTYPE = ('<!DOCTYPE eSummaryResult PUBLIC "-//NLM//DTD esummary v1 20041029//EN" '
+                    '"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20041029/esummary-v1.dtd">')
+EFETCH_DOCTYPE = ('<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2019//EN" '
+                  '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_190101.dtd">')
+
+PUB_TYPES = ["Clinical Trial", "Randomized Controlled Trial", "Review", "Comparative Study", "Case Reports"]
+
+
+def _article_rng(pmid: str) -> random.Random:
+    return random.Random(int(pmid))
+
+
+def search_pmids(term: str, retmax: int, total: int, retstart: int = 0) -> list:
+    """
+    Детерминированный список PMID для запроса
+    """
+    return [str(_search_start(term) + i) for i in range(retstart, min(retstart + retmax, total))]
+
+
+def _search_start(term: str) -> int:
+    return PMID_BASE + (zlib.crc32(term.encode("utf-8")) % 100000) * 1000
+
+
+def esearch_xml(term: str, retmax: int, total: int) -> str:
+    ids = "".join(f"<Id>{pmid}</Id>" for pmid in search_pmids(term, retmax, total))
+    # WebEnv хранит начало списка PMID: по нему efetch отдает страницы history
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" ?>\n{ESEARCH_DOCTYPE}\n'
+        f"<eSearchResult><Count>{total}</Count><RetMax>{min(retmax, total)}</RetMax><RetStart>0</RetStart>"
+        f"<QueryKey>1</QueryKey><WebEnv>FAKE_{_search_start(term)}</WebEnv><IdList>{ids}</IdList>"
+        f"<TranslationSet/><QueryTranslation>{escape(term)}</QueryTranslation></eSearchResult>"
+    )
+
+
+def esummary_xml(pmids: list) -> str:
+    docs = []
+    for pmid in pmids:
+        rng = _article_rng(pmid)
+        pub_type = rng.choice(PUB_TYPES)
+        title = "Bioequivalence study" if rng.random() < 0.5 else "Clinical observation"
+        docs.append(
+            f"<DocSum><Id>{pmid}</Id>"
+            f'<Item Name="PubDate" Type="Date">{rng.randint(1995, 2024)}</Item>'
+            f'<Item Name="Title" Type="String">{title} {pmid}</Item>'
+            f'<Item Name="PubTypeList" Type="List"><Item Name="PubType" Type="String">{pub_type}</Item></Item>'
+            f'<Item Name="HasAbstract" Type="Integer">1</Item>'
+            f"</DocSum>"
+        )
+    return f'<?xml version="1.0" encoding="UTF-8" ?>\n{ESUMMARY_DOCTYPE}\n<eSummaryResult>{"".join(docs)}</eSummaryResult>'
+
+
+def article_xml(pmid: str) -> str:
+    rng = _article_rng(pmid)
+    abstract = (
+        f"A randomized crossover study in healthy volunteers. "
+        f"Cmax was {rng.randint(100, 900)}.{rng.randint(0, 9)} ng/mL, "
+        f"AUC {rng.randint(1000, 9000)} ng·h/mL, Tmax {rng.randint(1, 4)}.{rng.randint(0, 9)} h, "
+        f"elimination half-life {rng.randint(2, 12)} h. "
+        f"Intra-subject CV: {rng.randint(10, 45)}.{rng.randint(0, 9)}%."
+    )
+    return (
+        f'<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM"><PMID Version="1">{pmid}</PMID>'
+        f'<Article PubModel="Print"><Journal><JournalIssue CitedMedium="Internet"><PubDate>'
+        f"<Year>{rng.randint(1995, 2024)}</Year></PubDate></JournalIssue><Title>Fake J</Title></Journal>"
+        f"<ArticleTitle>Pharmacokinetics study {pmid}</ArticleTitle>"
+        f"<Abstract><AbstractText>{escape(abstract, quote=False)}</AbstractText></Abstract>"
+        f'<AuthorList CompleteYN="Y"><Author ValidYN="Y"><LastName>Author{pmid[-3:]}</LastName>'
+        f"<Initials>A</Initials></Author></AuthorList></Article></MedlineCitation></PubmedArticle>"
+    )
+
+
+def efetch_xml(pmids: list) -> str:
+    articles = "".join(article_xml(pmid) for pmid in pmids)
+    return f'<?xml version="1.0" ?>\n{EFETCH_DOCTYPE}\n<PubmedArticleSet>{articles}</PubmedArticleSet>'
+
+
+def drugbank_search_html(query: str) -> str:
+    drug_id = f"DB{zlib.crc32(query.lower().encode('utf-8')) % 100000:05d}"
+    return (
+        "<html><body><div class='search-results'>"
+        f"<h2><a class='search-result-title' href='/drugs/{drug_id}'>{escape(query)}</a></h2>"
+        "</div></body></html>"
+    )
+
+
+def drugbank_drug_html(drug_id: str) -> str:
+    rng = random.Random(drug_id)
+    return (
+        f"<html><body><h1>{drug_id}</h1>"
+        "<section id='pharmacology'><h2>Pharmacology</h2>"
+        f"<p>Absorbed in the gastrointestinal tract, bioavailability {rng.randint(20, 95)}%.</p>"
+        "<dl><dt>Absorption</dt><dd>Rapid</dd>"
+        f"<dt>Half Life</dt><dd>{rng.randint(2, 30)} hours</dd></dl>"
+        "</section></body></html>"
+    )
+
+
+def grls_pager(page: int, pages: int, window: int = 0) -> list:
+    """
+    Номера страниц в строке навигации page (как у GridView с PageButtonCount=window):
+    ("...", N) - ссылка на соседнее окно навигации
+    """
+    if not window:
+        return [(str(number), number) for number in range(1, pages + 1)]
+    start = (page - 1) // window * window + 1
+    end = min(start + window - 1, pages)
+    links = [("...", start - 1)] if start > 1 else []
+    links += [(str(number), number) for number in range(start, end + 1)]
+    if end < pages:
+        links.append(("...", end + 1))
+    return links
+
+
+def grls_viewstate(query: str, page: int, epoch: int = 0) -> str:
+    return f"{zlib.crc32(query.encode('utf-8')):08x}.{epoch}.{page}"
+
+
+def grls_html(query: str, rows: int, page: int = 1, pages: int = 1, window: int = 0, epoch: int = 0) -> str:
+    """
+    Страница результатов ГРЛС; навигация - postback ASP.NET, как на сайте
+    """
+    rng = random.Random(f"{query.lower()}:{page}" if page > 1 else query.lower())
+    body = "".join(
+        f"<tr><td>{escape(query)} {(page - 1) * rows + i + 1}</td>"
+        f"<td>таблетки {rng.choice([250, 500, 850, 1000])} мг</td>"
+        f"<td>Производитель {rng.randint(1, 50)}</td></tr>"
+        for i in range(rows)
+    )
+    # Строка навигации как у GridView: текущая страница - span, остальные - ссылки __doPostBack
+    pager = ""
+    if pages > 1:
+        links = "".join(
+            f"<td><span>{label}</span></td>" if number == page else
+            f"<td><a href=\"javascript:__doPostBack('ctl00$plate$gr','Page${number}')\">{label}</a></td>"
+            for label, number in grls_pager(page, pages, window)
+        )
+        pager = f"<tr class='pager'><td colspan='3'><table><tr>{links}</tr></table></td></tr>"
+    return (
+        "<html><body><form method='post'>"
+        f"<input type='hidden' name='__VIEWSTATE' value='{grls_viewstate(query, page, epoch)}'/>"
+        "<table class='grid'>"
+        "<tr><th>Торговое наименование</th><th>Форма выпуска</th><th>Производитель</th></tr>"
+        f"{body}{pager}</table></form></body></html>"
+    )
+
+
+class FakeSourcesHandler(BaseHTTPRequestHandler):
+    # keep-alive: клиенты переиспользуют соединения, как с настоящими источниками
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        self._handle({key: values[0] for key, values in form.items()})
+
+    def _handle(self, form: dict):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        with server.stats_lock:
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            server.requests[url.path] = server.requests.get(url.path, 0) + 1
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            status, content_type, body = self._route(url.path, query, form)
+        finally:
+            with server.stats_lock:
+                server.in_flight -= 1
+
+        payload = body.encode("utf-8")
+        # Страницы DrugBank и ГРЛС отдаются с ETag; совпавший If-None-Match - 304 без тела
+        etag = f'"{zlib.crc32(payload):08x}"' if content_type.startswith("text/html") else None
+        if etag and self.headers.get("If-None-Match") == etag:
+            with server.stats_lock:
+                server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self, path: str, query: dict, form: dict) -> tuple:
+        server = self.server
+        # POST (efetch с большим списком id, postback ГРЛС) передает параметры в теле
+        query = dict(query, **form)
+        ids = [pmid for pmid in query.get("id", "").split(",") if pmid]
+
+        if path.endswith("/esearch.fcgi"):
+            return 200, "text/xml", esearch_xml(query.get("term", ""), int(query.get("retmax", 20)), server.total_found)
+        if path.endswith("/esummary.fcgi"):
+            return 200, "text/xml", esummary_xml(ids)
+        if path.endswith("/efetch.fcgi"):
+            if not ids and query.get("WebEnv", "").startswith("FAKE_"):
+                start = int(query["WebEnv"][len("FAKE_"):])
+                retstart, retmax = int(query.get("retstart", 0)), int(query.get("retmax", 20))
+                ids = [str(start + i) for i in range(retstart, min(retstart + retmax, server.total_found))]
+            return 200, "text/xml", efetch_xml(ids)
+        if path == "/search":
+            return 200, "text/html; charset=utf-8", drugbank_search_html(query.get("q", ""))
+        if path.startswith("/drugs/"):
+            return 200, "text/html; charset=utf-8", drugbank_drug_html(path.rsplit("/", 1)[-1])
+        if path == "/Grls_View_v2.aspx":
+            # Postback навигации: __EVENTARGUMENT=Page$N и __VIEWSTATE страницы, с которой перешли.
+            # Как event validation ASP.NET: переход только по ссылке навигации той страницы
+            # и только с __VIEWSTATE текущей версии (grls_epoch)
+            page = 1
+            if query.get("__EVENTARGUMENT", "").startswith("Page$"):
+                page = int(query["__EVENTARGUMENT"][len("Page$"):])
+                state = query.get("__VIEWSTATE", "").split(".")
+                if len(state) != 3 or state[1] != str(server.grls_epoch):
+                    return 500, "text/plain", "invalid viewstate"
+                pager = grls_pager(int(state[2]), server.grls_pages, server.grls_window)
+                if page not in [number for _, number in pager]:
+                    return 500, "text/plain", "invalid postback"
+            return 200, "text/html; charset=utf-8", grls_html(query.get("searchKey", ""), server.grls_rows, page,
+                                                              server.grls_pages, server.grls_window,
+                                                              server.grls_epoch)
+        return 404, "text/plain", "not found"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSourcesServer(ThreadingHTTPServer):
+    """
+    Тестовый сервер в фоновом потоке
+
+    Пример:
+        with FakeSourcesServer(latency=0.2) as server:
+            Config.DRUGBANK_BASE_URL = server.url
+            ...
+            print(server.peak_in_flight)
+    """
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 total_found: int = 500, grls_rows: int = 10, grls_pages: int = 1, grls_window: int = 0):
+        super().__init__((host, port), FakeSourcesHandler)
+        self.latency = latency
+        self.total_found = total_found
+        self.grls_rows = grls_rows
+        self.grls_pages = grls_pages
+        self.grls_window = grls_window
+        self.grls_epoch = 0
+        self.stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.not_modified = 0
+        self.requests = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def eutils_url(self) -> str:
+        return f"{self.url}/entrez/eutils"
+
+    def start(self) -> "FakeSourcesServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.peak_in_flight = 0
+            self.not_modified = 0
+            self.requests = {}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервер вместо E-utilities, DrugBank и ГРЛС")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка ответа, сек")
+    args = parser.parse_args()
+
+    server = FakeSourcesServer(args.host, args.port, latency=args.latency)
+    print(f"NCBI_EUTILS_URL={server.eutils_url}")
+    print(f"DRUGBANK_BASE_URL={server.url}")
+    print(f"GRLS_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
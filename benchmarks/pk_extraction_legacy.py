@@ -0,0 +1,139 @@
+"""
+Прежняя реализация извлечения PK параметров
+
+Сохранена без изменений для бенчмарка и проверки, что новый
+движок (scrapers/pk_extractor.py) дает идентичный результат.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def extract_pk_parameters_legacy(articles: list) -> dict:
+    """
+    Исходная реализация PubMedScraper.extract_pk_parameters
+    (~30 некомпилированных regex подряд), эталон для сравнения
+    """
+    import re
+    
+    pk_data = {
+        "cmax": {"value": None, "unit": "ng/mL", "sources": []},
+        "auc": {"value": None, "unit": "ng·h/mL", "sources": []},
+        "tmax": {"value": None, "unit": "h", "sources": []},
+        "t_half": {"value": None, "unit": "h", "sources": []},
+        "cvintra": {"value": None, "unit": "%", "sources": []}
+    }
+    
+    cvintra_values = []
+    
+    for article in articles:
+        abstract = article.get("abstract", "").lower()
+        title = article.get("title", "").lower()
+        full_text = f"{title} {abstract}"
+        
+        # Извлечение CVintra (внутрисубъектная вариабельность)
+        # Улучшенные паттерны для более точного извлечения
+        cv_patterns = [
+            r'cv\s*intra[-\s]?subject[:\s]+(\d+\.?\d*)\s*%',
+            r'intra[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
+            r'cv\s*intra[:\s]+(\d+\.?\d*)\s*%',
+            r'intra[-\s]?individual\s+cv[:\s]+(\d+\.?\d*)\s*%',
+            r'within[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
+            r'cv\s*intra[-\s]?subject\s*[=:]\s*(\d+\.?\d*)\s*%',
+            r'intra[-\s]?subject\s+coefficient\s+of\s+variation[:\s]+(\d+\.?\d*)\s*%',
+            r'cv\s*intra[:\s]*(\d+\.?\d*)\s*%',
+            r'cv\s*intra[-\s]?subject[:\s]*(\d+\.?\d*)',  # без % в конце
+            r'intra[-\s]?subject\s+cv[:\s]*(\d+\.?\d*)',  # без % в конце
+        ]
+        
+        for pattern in cv_patterns:
+            match = re.search(pattern, full_text, re.IGNORECASE)
+            if match:
+                try:
+                    cv_value = float(match.group(1))
+                    if 5 <= cv_value <= 100:  # Разумный диапазон
+                        cvintra_values.append(cv_value)
+                        pk_data["cvintra"]["sources"].append(article["url"])
+                        break
+                except ValueError:
+                    continue
+        
+        # Извлечение Cmax
+        cmax_patterns = [
+            r'cmax[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
+            r'maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
+            r'c\s*max[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
+            r'peak\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
+        ]
+        for pattern in cmax_patterns:
+            match = re.search(pattern, full_text, re.IGNORECASE)
+            if match and not pk_data["cmax"]["value"]:
+                try:
+                    pk_data["cmax"]["value"] = float(match.group(1))
+                    pk_data["cmax"]["unit"] = match.group(2)
+                    pk_data["cmax"]["sources"].append(article["url"])
+                    break
+                except (ValueError, IndexError):
+                    continue
+        
+        # Извлечение AUC
+        auc_patterns = [
+            r'auc[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml|ng·h·ml[-1]|mg·h·l[-1])',
+            r'area\s+under\s+curve[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml)',
+            r'auc0[-\s]?t[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
+            r'auc0[-\s]?∞[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
+            r'auc\s*\(0[-\s]?t\)[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml)',
+        ]
+        for pattern in auc_patterns:
+            match = re.search(pattern, full_text, re.IGNORECASE)
+            if match and not pk_data["auc"]["value"]:
+                try:
+                    pk_data["auc"]["value"] = float(match.group(1))
+                    pk_data["auc"]["unit"] = match.group(2)
+                    pk_data["auc"]["sources"].append(article["url"])
+                    break
+                except (ValueError, IndexError):
+                    continue
+        
+        # Извлечение Tmax
+        tmax_patterns = [
+            r'tmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+            r'time\s+to\s+cmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+            r'time\s+to\s+maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+            r't\s*max[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        ]
+        for pattern in tmax_patterns:
+            match = re.search(pattern, full_text, re.IGNORECASE)
+            if match and not pk_data["tmax"]["value"]:
+                try:
+                    pk_data["tmax"]["value"] = float(match.group(1))
+                    pk_data["tmax"]["sources"].append(article["url"])
+                    break
+                except (ValueError, IndexError):
+                    continue
+        
+        # Извлечение T1/2
+        t_half_patterns = [
+            r't1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+            r't\s*1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+            r'hal[fv][-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+            r'elimination\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+            r'terminal\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+            r'apparent\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        ]
+        for pattern in t_half_patterns:
+            match = re.search(pattern, full_text, re.IGNORECASE)
+            if match and not pk_data["t_half"]["value"]:
+                try:
+                    pk_data["t_half"]["value"] = float(match.group(1))
+                    pk_data["t_half"]["sources"].append(article["url"])
+                    break
+                except (ValueError, IndexError):
+                    continue
+    
+    # Вычисляем среднее CVintra если найдено несколько значений
+    if cvintra_values:
+        pk_data["cvintra"]["value"] = round(sum(cvintra_values) / len(cvintra_values), 2)
+        logger.info(f"📊 Извлечено {len(cvintra_values)} значений CVintra, среднее: {pk_data['cvintra']['value']}%")
+    
+    return pk_data
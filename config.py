@@ -35,15 +35,77 @@ class Config:
     NCBI_EMAIL = os.getenv("NCBI_EMAIL", "your.email@example.com")
     DRUGBANK_API_KEY = os.getenv("DRUGBANK_API_KEY", "")  # DrugBank (опционально)
     
+    # NCBI rate limiting (общий для всех вызовов Entrez)
+    NCBI_RATE_LIMIT = float(os.getenv("NCBI_RATE_LIMIT", 0))  # req/sec, 0 = авто (10 с ключом, 3 без)
+    NCBI_RATE_BURST = float(os.getenv("NCBI_RATE_BURST", 1))  # допустимый всплеск запросов
+    NCBI_RATE_LIMIT_FILE = os.getenv("NCBI_RATE_LIMIT_FILE", "")  # файл для общего лимита между процессами
+    
+    # PubMed settings
+    PUBMED_FETCH_LIMIT = int(os.getenv("PUBMED_FETCH_LIMIT", 10))  # сколько топ-статей загружать
+    PUBMED_EFETCH_BATCH_SIZE = int(os.getenv("PUBMED_EFETCH_BATCH_SIZE", 200))  # PMID в одном efetch
+    PUBMED_DEEP_MAX_ARTICLES = int(os.getenv("PUBMED_DEEP_MAX_ARTICLES", 2000))  # лимит глубокого поиска
+    # Двухфазный поиск: esummary по кандидатам, efetch только для лучших
+    PUBMED_TRIAGE = os.getenv("PUBMED_TRIAGE", "False").lower() == "true"
+    PUBMED_TRIAGE_CANDIDATES = int(os.getenv("PUBMED_TRIAGE_CANDIDATES", 100))
+    # Параллельный поиск несколькими запросами (get_drug_pk_data с fanout)
+    PUBMED_FANOUT = os.getenv("PUBMED_FANOUT", "False").lower() == "true"
+    PUBMED_FANOUT_QUERIES = [
+        "{inn} AND (pharmacokinetics OR bioequivalence OR Cmax OR AUC)",
+        "{inn} intra-subject variability",
+        "{inn} bioequivalence replicate",
+        "{inn} pharmacokinetics healthy volunteers",
+    ]
+    PUBMED_MIRROR_PATH = os.getenv("PUBMED_MIRROR_PATH", "")  # локальное зеркало PubMed (scrapers/pubmed_mirror.py)
+    PUBMED_CACHE_PATH = os.getenv("PUBMED_CACHE_PATH", "cache/pubmed_articles.sqlite3")  # пусто = без кэша
+    PUBMED_CACHE_TTL = int(os.getenv("PUBMED_CACHE_TTL", 30 * 24 * 3600))  # секунд
+    
+    DRUGBANK_STORE_PATH = os.getenv("DRUGBANK_STORE_PATH", "")  # локальная копия DrugBank (scrapers/drugbank_store.py)
+    GRLS_STORE_PATH = os.getenv("GRLS_STORE_PATH", "")  # локальный снимок реестра ГРЛС (scrapers/grls_store.py)
+    GRLS_LIVE_CHECK = os.getenv("GRLS_LIVE_CHECK", "False").lower() == "true"  # сверять снимок с сайтом ГРЛС
+    # Постраничный поиск на сайте ГРЛС: страницы после первой загружаются параллельно
+    GRLS_PAGINATION = os.getenv("GRLS_PAGINATION", "True").lower() == "true"
+    GRLS_MAX_PAGES = int(os.getenv("GRLS_MAX_PAGES", 20))
+    GRLS_PAGE_CONCURRENCY = int(os.getenv("GRLS_PAGE_CONCURRENCY", 4))  # одновременных запросов к сайту ГРЛС
+    GRLS_TIMEOUT = float(os.getenv("GRLS_TIMEOUT", 15))  # секунд на весь поиск, включая все страницы
+    
+    # Адреса источников (переопределяются для локального тестового сервера benchmarks/fake_sources.py)
+    NCBI_EUTILS_URL = os.getenv("NCBI_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+    DRUGBANK_BASE_URL = os.getenv("DRUGBANK_BASE_URL", "https://go.drugbank.com")
+    GRLS_BASE_URL = os.getenv("GRLS_BASE_URL", "https://grls.rosminzdrav.ru")
+    # Асинхронный сбор данных в /api/full-analysis (httpx, scrapers/async_scrapers.py)
+    ASYNC_SCRAPERS = os.getenv("ASYNC_SCRAPERS", "False").lower() == "true"
+    ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", 20))
+    
     # Scraping settings
     REQUEST_TIMEOUT = 30
     USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    MAX_RETRIES = 3
-    RETRY_DELAY = 2  # секунд
+    MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))  # повторы запросов при 429/5xx и ошибках соединения
+    RETRY_DELAY = float(os.getenv("RETRY_DELAY", 2))  # секунд, далее удваивается
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))  # соединений на хост в общей HTTP сессии
+    HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "cache/http_pages.sqlite3")  # страницы DrugBank/ГРЛС, пусто = без кэша
+    HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 24 * 3600))  # секунд без проверки, далее ETag/Last-Modified
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", 10000))  # страниц, сверх - вытесняются давно проверенные
+    HTTP_CACHE_RETENTION = int(os.getenv("HTTP_CACHE_RETENTION", 30 * 24 * 3600))  # секунд без проверки до удаления страницы
     
     # Output settings
     OUTPUT_DIR = "outputs"
     SUPPORTED_FORMATS = ["docx", "json", "markdown"]
     
     # Performance
-    MAX_WORKERS = int(os.getenv("MAX_WORKERS", 3))
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", 3))  # потоков на каждый источник в общем пуле (utils/source_executor.py)
+    SOURCE_QUEUE_LIMIT = int(os.getenv("SOURCE_QUEUE_LIMIT", 50))  # задач в очереди источника, дальше - "overloaded"
+    FULL_ANALYSIS_DEADLINE = float(os.getenv("FULL_ANALYSIS_DEADLINE", 20))  # секунд на опрос всех источников
+    # Кэш результатов /api/full-analysis (utils/result_cache.py), 0 = без кэша
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 256))  # записей, далее вытесняются (LRU)
+    RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 6 * 3600))  # секунд, далее отдается устаревшим и обновляется в фоне
+    RESULT_CACHE_MAX_STALE = int(os.getenv("RESULT_CACHE_MAX_STALE", 24 * 3600))  # секунд после TTL, далее запись удаляется
+    # Фоновые задачи /api/jobs (utils/jobs.py)
+    JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "cache/jobs.sqlite3")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # задач, выполняемых одновременно
+    JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", 100))  # задач в очереди, сверх - 503
+    JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", 10))  # секунд между отметками выполняемых задач
+    JOB_RETENTION = int(os.getenv("JOB_RETENTION", 7 * 24 * 3600))  # секунд хранения завершенных задач
+    # Пакетный анализ /api/batch/full-analysis (utils/batch.py)
+    BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", "cache/batches.sqlite3")
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", MAX_WORKERS))  # анализов одновременно во всех пакетах
+    BATCH_MAX_DRUGS = int(os.getenv("BATCH_MAX_DRUGS", 1000))  # препаратов в одном пакете
@@ -67,18 +67,11 @@ searchBtn.addEventListener('click', async () => {
         
         console.log('Отправляю запрос:', formData);
         
-        const response = await fetch(`${API_BASE_URL}/full-analysis`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(formData)
-        });
-        
-        if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+        // Разделы отображаются по мере готовности (SSE); без поддержки потоков - одним ответом
+        let result = await streamFullAnalysis(formData);
+        if (!result) {
+            result = await fetchFullAnalysis(formData);
         }
-        
-        const result = await response.json();
         console.log('Результаты:', result);
         
         // Сохраняем результат для использования при генерации синопсиса
@@ -88,11 +81,7 @@ searchBtn.addEventListener('click', async () => {
         showResults();
         
         // Отображение всех результатов
-        displayLiteratureResults(result);
-        displayPKParameters(result);
-        displayDesignResults(result);
-        displaySampleSizeResults(result);
-        displayRegulatoryResults(result);
+        displayAllResults(result);
         
         // Показываем кнопку скачивания
         const downloadSection = document.getElementById('downloadSection');
@@ -112,16 +101,137 @@ searchBtn.addEventListener('click', async () => {
     }
 });
 
+function displayAllResults(result, pendingSources = []) {
+    displayLiteratureResults(result, pendingSources);
+    displayPKParameters(result);
+    displayDesignResults(result, pendingSources);
+    displaySampleSizeResults(result);
+    displayRegulatoryResults(result, pendingSources);
+}
+
+// Полный анализ одним ответом
+async function fetchFullAnalysis(formData) {
+    const response = await fetch(`${API_BASE_URL}/full-analysis`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(formData)
+    });
+    
+    if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+    }
+    
+    return response.json();
+}
+
+// ============= ПОТОКОВЫЙ АНАЛИЗ (SSE) =============
+// Возвращает итоговый результат или null, если потоковый режим недоступен
+async function streamFullAnalysis(formData) {
+    let response;
+    try {
+        response = await fetch(`${API_BASE_URL}/full-analysis/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+            body: JSON.stringify(formData)
+        });
+    } catch (err) {
+        console.warn('Потоковый анализ недоступен:', err);
+        return null;
+    }
+    
+    if (response.status === 404 || !response.body) {
+        return null;
+    }
+    if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+    }
+    
+    // Частичный результат, который дополняется событиями
+    const partial = { literature: {} };
+    const pendingSources = ['pubmed', 'drugbank', 'grls'];
+    let finalResult = null;
+    
+    const handlers = {
+        sample_size: (data) => {
+            Object.assign(partial, data);
+            hideLoading();
+            showResults();
+            displayAllResults(partial, pendingSources);
+        },
+        pubmed: (data) => {
+            partial.literature.pubmed = data.result;
+            if (data.result && data.result.pk_parameters) {
+                partial.pk_parameters = data.result.pk_parameters;
+            }
+        },
+        drugbank: (data) => { partial.literature.drugbank = data.result; },
+        grls: (data) => { partial.literature.grls = data.result; },
+        refined: (data) => {
+            partial.design_recommendation = data.design_recommendation;
+            partial.sample_size = data.sample_size;
+            displayDesignResults(partial);
+            displaySampleSizeResults(partial);
+        },
+        final: (data) => { finalResult = data; },
+        error: (data) => { throw new Error(data.error); }
+    };
+    
+    const handleEvent = (block) => {
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (!handlers[event] || !data) return;
+        
+        const payload = JSON.parse(data);
+        console.log(`Событие ${event}:`, payload);
+        handlers[event](payload);
+        
+        if (pendingSources.includes(event)) {
+            pendingSources.splice(pendingSources.indexOf(event), 1);
+            displayLiteratureResults(partial, pendingSources);
+            displayPKParameters(partial);
+        }
+    };
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            handleEvent(buffer.slice(0, separator));
+            buffer = buffer.slice(separator + 2);
+        }
+    }
+    
+    if (!finalResult) {
+        throw new Error('Поток анализа прерван');
+    }
+    return finalResult;
+}
+
 // ============= ОТОБРАЖЕНИЕ ЛИТЕРАТУРЫ =============
-function displayLiteratureResults(result) {
+function displayLiteratureResults(result, pendingSources = []) {
     const literatureContent = document.getElementById('literatureContent');
+    const pendingHtml = '<p>⏳ Загрузка...</p>';
     
     let html = '';
     
     // PubMed
     html += '<h4>📰 PubMed</h4>';
     const pubmed = result.literature?.pubmed || {};
-    if (pubmed.articles && pubmed.articles.length > 0) {
+    if (pendingSources.includes('pubmed')) {
+        html += pendingHtml;
+    } else if (pubmed.articles && pubmed.articles.length > 0) {
         html += '<ul>';
         pubmed.articles.slice(0, 5).forEach(article => {
             html += `
@@ -140,7 +250,9 @@ function displayLiteratureResults(result) {
     // DrugBank
     html += '<h4>💊 DrugBank</h4>';
     const drugbank = result.literature?.drugbank || {};
-    if (drugbank.pharmacokinetics) {
+    if (pendingSources.includes('drugbank')) {
+        html += pendingHtml;
+    } else if (drugbank.pharmacokinetics) {
         html += `<p><strong>Препарат:</strong> ${drugbank.name}</p>`;
         html += `<p><strong>Фармакокинетика:</strong> ${drugbank.pharmacokinetics.substring(0, 400)}...</p>`;
         html += `<a href="${drugbank.url || '#'}" target="_blank" style="color: #667eea;">Открыть в DrugBank</a>`;
@@ -153,7 +265,9 @@ function displayLiteratureResults(result) {
     // ГРЛС
     html += '<h4>🏥 ГРЛС (РФ)</h4>';
     const grls = result.literature?.grls || {};
-    if (grls.registered_drugs && grls.registered_drugs.length > 0) {
+    if (pendingSources.includes('grls')) {
+        html += pendingHtml;
+    } else if (grls.registered_drugs && grls.registered_drugs.length > 0) {
         html += `<p>✅ Найдено ${grls.registered_drugs.length} зарегистрированных препаратов:</p>`;
         html += '<ul>';
         grls.registered_drugs.slice(0, 5).forEach(drug => {
@@ -210,11 +324,16 @@ function displayPKParameters(result) {
 }
 
 // ============= ОТОБРАЖЕНИЕ ДИЗАЙНА =============
-function displayDesignResults(result) {
+function displayDesignResults(result, pendingSources = []) {
     const designContent = document.getElementById('designContent');
     
     const design = result.design_recommendation || {};
-    let html = `
+    let html = '';
+    // Пока источники не ответили, дизайн предварительный: CVintra может уточниться по PubMed
+    if (pendingSources.length > 0) {
+        html += '<p style="color: #666;">⏳ Предварительно: дизайн уточняется по ответам источников...</p>';
+    }
+    html += `
         <h4 style="color: #667eea;">${design.recommended_design || 'Недостаточно данных'}</h4>
         <p><strong>Обоснование:</strong></p>
         <p>${design.rationale || 'N/A'}</p>
@@ -275,10 +394,19 @@ function displaySampleSizeResults(result) {
 }
 
 // ============= ОТОБРАЖЕНИЕ РЕГУЛЯТОРНЫХ ТРЕБОВАНИЙ =============
-function displayRegulatoryResults(result) {
+function displayRegulatoryResults(result, pendingSources = []) {
     const regulatoryContent = document.getElementById('regulatoryContent');
     
     const reg = result.regulatory_check || {};
+    // Проверка соответствия есть только в итоговом результате - до него не показываем "Не соответствует"
+    if (pendingSources.length > 0 || Object.keys(reg).length === 0) {
+        regulatoryContent.innerHTML = `
+            <h4>Соответствие требованиям</h4>
+            <p>⏳ Проверка выполняется после ответа всех источников...</p>
+        `;
+        return;
+    }
+    
     let html = `
         <h4>Соответствие требованиям</h4>
         
@@ -0,0 +1,353 @@
+"""
+Асинхронные версии скраперов PubMed, DrugBank и ГРЛС (httpx.AsyncClient)
+
+Классы наследуют синхронные скраперы и заменяют только сетевые вызовы:
+разбор ответов, кэш и зеркало PubMed, лимит запросов к NCBI и формат
+возвращаемых словарей остаются общими. Пока один запрос ждет ответа,
+цикл событий обслуживает остальные - поток на каждый источник не нужен.
+
+Все скраперы одного анализа (или многих анализов) используют общий
+клиент из open_async_client(): соединения переиспользуются.
+"""
+import asyncio
+import io
+import logging
+import time
+
+from scrapers.drugbank_scraper import DrugBankScraper
+from scrapers.grls_scraper import GRLSScraper
+from scrapers.http_cache import fetch_parsed_async, fetch_parsed_status_async
+from scrapers.pubmed_scraper import BIO_AVAILABLE, PubMedScraper, reciprocal_rank_fusion
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+if BIO_AVAILABLE:
+    from Bio import Entrez
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def open_async_client(max_connections: int = None, timeout: float = None) -> "httpx.AsyncClient":
+    """
+    Общий HTTP клиент для асинхронных скраперов (закрывать через aclose или async with)
+    """
+    if not HTTPX_AVAILABLE:
+        raise RuntimeError("Для асинхронных скраперов нужен httpx: pip install httpx")
+
+    try:
+        from config import Config
+        max_connections = max_connections or Config.ASYNC_MAX_CONNECTIONS
+        timeout = timeout or Config.REQUEST_TIMEOUT
+        user_agent = Config.USER_AGENT
+    except ImportError:
+        max_connections = max_connections or 20
+        timeout = timeout or 30
+        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+    return httpx.AsyncClient(
+        timeout=timeout,
+        headers={"User-Agent": user_agent},
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        follow_redirects=True
+    )
+
+
+class _ClientBound:
+    """
+    Асинхронный скрапер поверх уже созданного синхронного
+    """
+
+    @classmethod
+    def from_scraper(cls, scraper, client):
+        """
+        Копия состояния синхронного скрапера (кэши, зеркало, лимит запросов)
+        с клиентом httpx; __init__ не выполняется, поэтому анализ не повторяет
+        настройку Entrez и поиск общих объектов
+
+        Args:
+            scraper: синхронный скрапер того же источника (долгоживущий)
+            client: общий httpx.AsyncClient
+        """
+        bound = cls.__new__(cls)
+        bound.__dict__.update(vars(scraper))
+        bound.client = client
+        return bound
+
+
+class AsyncPubMedScraper(_ClientBound, PubMedScraper):
+    """
+    PubMed через прямые запросы к E-utilities
+
+    Ответы esearch/esummary разбираются Entrez.read, efetch - тем же
+    потоковым парсером, что и в синхронном скрапере. Асинхронный транспорт -
+    _eutils_async; синхронный _eutils не переопределяется, поэтому
+    унаследованные методы (глубокий режим через history сервер,
+    fetch_article_details) работают как в PubMedScraper.
+    """
+
+    def __init__(self, client, email: str = None, api_key: str = None, eutils_url: str = None):
+        super().__init__(email=email, api_key=api_key)
+        self.client = client
+        if eutils_url:
+            self.eutils_url = eutils_url
+
+    async def _eutils_async(self, endpoint: str, **params):
+        """
+        Запрос к E-utilities с учетом общего лимита запросов к NCBI
+        """
+        method, url, params = self._eutils_request(endpoint, params)
+        wait = self.rate_limiter.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        if method == "POST":
+            response = await self.client.post(url, data=params)
+        else:
+            response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return io.BytesIO(response.content)
+
+    async def _search_query(self, query: str, retmax: int) -> list:
+        if self.mirror:
+            return self._search_mirror(query, retmax)
+
+        handle = await self._eutils_async("esearch", **self._esearch_params(query, retmax))
+        return self._pmids_from_record(Entrez.read(handle))
+
+    async def search_drug(self, inn: str, keywords: list = None, retmax: int = 20) -> list:
+        query = self._build_query(inn, keywords)
+        try:
+            logger.info(f"Поиск в PubMed: {query}")
+            return await self._search_query(query, retmax=retmax)
+        except Exception as e:
+            logger.error(f"Ошибка поиска в PubMed: {e}")
+            return []
+
+    async def search_drug_fanout(self, inn: str, queries: list = None, retmax: int = 20) -> list:
+        queries = [template.format(inn=inn) for template in (queries or self.fanout_queries)]
+        logger.info(f"Параллельный поиск в PubMed: {len(queries)} запросов")
+
+        async def run(query):
+            try:
+                return await self._search_query(query, retmax=retmax)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Запрос '{query}' не выполнен: {str(e)[:60]}")
+                return []
+
+        rankings = await asyncio.gather(*(run(query) for query in queries))
+
+        pmids = reciprocal_rank_fusion(rankings)
+        logger.info(f"Объединено {len(pmids)} уникальных PMID из {sum(len(r) for r in rankings)}")
+        return pmids
+
+    async def fetch_summaries(self, pmids: list) -> list:
+        async def fetch(chunk):
+            try:
+                handle = await self._eutils_async("esummary", db="pubmed", id=",".join(chunk))
+                return self._parse_summaries(Entrez.read(handle))
+            except Exception as e:
+                logger.error(f"Ошибка загрузки esummary ({len(chunk)} PMID): {e}")
+                return []
+
+        chunks = [pmids[start:start + self.batch_size] for start in range(0, len(pmids), self.batch_size)]
+        return [summary for part in await asyncio.gather(*(fetch(chunk) for chunk in chunks)) for summary in part]
+
+    async def triage_pmids(self, pmids: list) -> list:
+        return self._rank_triaged(pmids, await self.fetch_summaries(pmids))
+
+    async def fetch_articles_batch(self, pmids: list) -> list:
+        if not pmids:
+            return []
+
+        by_pmid = self._lookup_local(pmids)
+        missing = [pmid for pmid in pmids if pmid not in by_pmid]
+        if by_pmid:
+            logger.info(f"Из зеркала/кэша: {len(by_pmid)} статей, загружаю: {len(missing)}")
+
+        async def fetch(chunk):
+            try:
+                handle = await self._eutils_async("efetch", db="pubmed", id=",".join(chunk), rettype="abstract", retmode="xml")
+                return self._read_articles(handle)
+            except Exception as e:
+                logger.error(f"Ошибка пакетной загрузки статей ({len(chunk)} PMID): {e}")
+                return []
+
+        chunks = [missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size)]
+        for fetched in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            for article in fetched:
+                by_pmid[article["pmid"]] = article
+            if self.cache and fetched:
+                self.cache.put_many(fetched)
+
+        return [by_pmid[pmid] for pmid in pmids if pmid in by_pmid]
+
+    async def get_drug_pk_data(self, inn: str, fanout: bool = None, triage: bool = None) -> dict:
+        """
+        Полный цикл: поиск + извлечение PK параметров (тот же результат, что у PubMedScraper)
+        """
+        if fanout is None:
+            fanout = self.fanout
+        if triage is None:
+            triage = self.triage
+
+        try:
+            triage = triage and not self.mirror
+            retmax = self.triage_candidates if triage else 20
+            if fanout:
+                pmids = await self.search_drug_fanout(inn, retmax=retmax)
+            else:
+                pmids = await self.search_drug(inn, retmax=retmax)
+
+            if pmids and triage:
+                pmids = await self.triage_pmids(pmids)
+
+            if not pmids:
+                return self._not_found_result(inn)
+
+            top_pmids = pmids[:self.fetch_limit]
+            logger.info(f"Загружаю детали {len(top_pmids)} статей одним пакетом...")
+            articles = await self.fetch_articles_batch(top_pmids)
+
+            logger.info(f"Загружено {len(articles)} статей из {len(pmids)} найденных")
+            return self._pk_result(inn, articles)
+
+        except Exception as e:
+            logger.error(f"Ошибка в get_drug_pk_data для {inn}: {e}", exc_info=True)
+            return self._error_result(inn, e)
+
+
+class AsyncDrugBankScraper(_ClientBound, DrugBankScraper):
+    def __init__(self, client, base_url: str = None):
+        super().__init__(base_url=base_url)
+        self.client = client
+
+    async def _get_parsed(self, url: str, parse, parser: str):
+        return await fetch_parsed_async(self.client, self.http_cache, "drugbank", url, parse, parser,
+                                        headers=self.headers, timeout=10)
+
+    async def search_drug(self, inn: str) -> str:
+        try:
+            return await self._find_drug_url(inn)
+        except Exception as e:
+            logger.error(f"Ошибка поиска в DrugBank: {e}")
+            return None
+
+    async def _find_drug_url(self, inn: str) -> str:
+        logger.info(f"Поиск в DrugBank: {inn}")
+        href = await self._get_parsed(self._search_url(inn), self._search_href, "drugbank.search")
+        return self._search_result(href)
+
+    async def get_drug_info(self, inn: str) -> dict:
+        local = self._lookup_local(inn)
+        if local:
+            return local
+
+        try:
+            drug_url = await self._find_drug_url(inn)
+            if not drug_url:
+                return self._not_found(inn)
+
+            fields = await self._get_parsed(drug_url, self._drug_page_fields, "drugbank.drug")
+            return self._drug_info(inn, drug_url, fields)
+        except Exception as e:
+            logger.error(f"Ошибка получения информации: {e}")
+            return self._error(inn, e)
+
+
+class AsyncGRLSScraper(_ClientBound, GRLSScraper):
+    def __init__(self, client, base_url: str = None):
+        super().__init__(base_url=base_url)
+        self.client = client
+
+    async def search_drug(self, inn: str) -> list:
+        return (await self._search(inn))[0]
+
+    async def _search(self, inn: str, deadline: float = None) -> tuple:
+        local = self._search_local(inn)
+        if local is not None and not self.live_check:
+            return local, "local", "ok"
+        return self._fresher(inn, local, *await self._search_live(inn, deadline))
+
+    async def _search_live(self, inn: str, deadline: float = None) -> tuple:
+        deadline = deadline or time.monotonic() + self.timeout
+
+        try:
+            logger.info(f"Поиск в ГРЛС: {inn}")
+            first, cached = await self._first_page(inn, deadline)
+            if self.pagination and first["pages"] and cached == "hit":
+                first, _ = await self._first_page(inn, deadline, revalidate=True)
+
+            known = {1}
+            fetched = {}
+            form_page = first
+            while True:
+                pages = self._window_pages(inn, form_page, known)
+                if not pages:
+                    break
+                known.update(pages)
+                fetched.update(await self._fetch_pages(inn, form_page, pages, deadline))
+                form_page = fetched.get(pages[-1])
+
+            rows = first["rows"] + self._merge_pages(inn, sorted(known - {1}), fetched)
+
+            results = self._results_from_rows(rows)
+            logger.info(f"Найдено {len(results)} препаратов в ГРЛС")
+            return results, self._pages_status(known, fetched, deadline)
+
+        except Exception as e:
+            logger.error(f"Ошибка поиска в ГРЛС: {e}")
+            return [], "error"
+
+    async def _first_page(self, inn: str, deadline: float, revalidate: bool = False) -> tuple:
+        async with self.page_limiter.async_slot():
+            return await fetch_parsed_status_async(
+                self.client,
+                self.http_cache,
+                "grls",
+                self.search_url,
+                self._grid_page,
+                "grls.page",
+                params=self._search_params(inn),
+                headers=self.headers,
+                timeout=self._request_timeout(deadline),
+                revalidate=revalidate
+            )
+
+    async def _fetch_page(self, inn: str, form_page: dict, page: int, deadline: float) -> dict:
+        # Слот общего с синхронными скраперами лимита запросов к сайту ГРЛС
+        async with self.page_limiter.async_slot():
+            response = await self.client.post(
+                self.search_url,
+                params=self._search_params(inn),
+                data=self._page_form(form_page, page),
+                headers=self.headers,
+                timeout=self._request_timeout(deadline)
+            )
+        response.raise_for_status()
+        return self._grid_page(response.content)
+
+    async def _fetch_pages(self, inn: str, form_page: dict, pages: list, deadline: float) -> dict:
+        if not pages or time.monotonic() >= deadline:
+            return {}
+
+        tasks = {asyncio.ensure_future(self._fetch_page(inn, form_page, page, deadline)): page for page in pages}
+        done, pending = await asyncio.wait(tasks, timeout=max(0, deadline - time.monotonic()))
+        for task in pending:
+            task.cancel()
+
+        fetched = {}
+        for task in done:
+            if task.exception():
+                logger.warning(f"⚠️ ГРЛС, страница {tasks[task]}: {task.exception()}")
+            else:
+                fetched[tasks[task]] = task.result()
+        return fetched
+
+    async def get_be_studies(self, inn: str, deadline: float = None) -> dict:
+        drugs, source, status = await self._search(inn, deadline)
+        return self._be_studies_result(inn, drugs, source, status)
@@ -1,97 +1,205 @@
-import requests
 from bs4 import BeautifulSoup
 import logging
 
+from scrapers.drugbank_store import get_drugbank_store
+from scrapers.html_extract import LXML_AVAILABLE, extract_drug_page, extract_search_result_href
+from scrapers.http_cache import fetch_parsed, get_http_cache
+from scrapers.http_session import get_http_session
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DrugBankScraper:
-    def __init__(self):
-        self.base_url = "https://go.drugbank.com"
+    def __init__(self, base_url: str = None):
+        try:
+            from config import Config
+            self.base_url = base_url or Config.DRUGBANK_BASE_URL
+        except ImportError:
+            self.base_url = base_url or "https://go.drugbank.com"
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        # Общая HTTP сессия: поиск и страница препарата идут по одному соединению
+        self.session = get_http_session()
+        # HTTP кэш страниц: при неизменной странице (304) не скачивается и не разбирается
+        self.http_cache = get_http_cache()
+        
+        # Локальная копия DrugBank из XML выгрузки: если препарат есть в ней, сайт не запрашивается
+        try:
+            self.store = get_drugbank_store()
+        except Exception as e:
+            logger.warning(f"⚠️ Локальное хранилище DrugBank недоступно: {e}")
+            self.store = None
     
     def search_drug(self, inn: str) -> str:
         """
         Поиск препарата в DrugBank и получение URL
         """
-        search_url = f"{self.base_url}/search?q={inn}&type=drugs"
-        
         try:
-            logger.info(f"Поиск в DrugBank: {inn}")
-            response = requests.get(search_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Найти первую ссылку на препарат
-            drug_link = soup.find('a', class_='search-result-title')
-            
-            if drug_link:
-                drug_url = self.base_url + drug_link['href']
-                logger.info(f"Найден препарат: {drug_url}")
-                return drug_url
-            else:
-                logger.warning("Препарат не найден в DrugBank")
-                return None
-                
+            return self._find_drug_url(inn)
         except Exception as e:
             logger.error(f"Ошибка поиска в DrugBank: {e}")
             return None
     
+    def _find_drug_url(self, inn: str) -> str:
+        """
+        URL препарата (None - не найден); ошибка запроса не перехватывается
+        """
+        logger.info(f"Поиск в DrugBank: {inn}")
+        href = fetch_parsed(self.session, self.http_cache, "drugbank", self._search_url(inn),
+                            self._search_href, "drugbank.search", headers=self.headers, timeout=10)
+        return self._search_result(href)
+    
+    def _search_url(self, inn: str) -> str:
+        return f"{self.base_url}/search?q={inn}&type=drugs"
+    
+    @staticmethod
+    def _search_href(content: bytes) -> str:
+        """
+        Ссылка на первый препарат со страницы результатов поиска
+        """
+        if LXML_AVAILABLE:
+            return extract_search_result_href(content)
+        return DrugBankScraper._search_href_soup(content)
+    
+    def _search_result(self, href: str) -> str:
+        """
+        URL препарата по ссылке из результатов поиска
+        """
+        if href:
+            drug_url = self.base_url + href
+            logger.info(f"Найден препарат: {drug_url}")
+            return drug_url
+        else:
+            logger.warning("Препарат не найден в DrugBank")
+            return None
+    
+    @staticmethod
+    def _search_href_soup(content: bytes) -> str:
+        """
+        Разбор через BeautifulSoup (без lxml)
+        """
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Найти первую ссылку на препарат
+        drug_link = soup.find('a', class_='search-result-title')
+        return drug_link['href'] if drug_link else None
+    
     def get_drug_info(self, inn: str) -> dict:
         """
         Получить информацию о препарате
-        """
-        drug_url = self.search_drug(inn)
         
-        if not drug_url:
-            return {
-                "name": inn,
-                "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
-                "message": f"Поиск данных о {inn} на DrugBank",
-                "status": "not_found"
-            }
+        Сначала из локального хранилища (scrapers/drugbank_store.py),
+        при промахе - с сайта DrugBank.
+        """
+        local = self._lookup_local(inn)
+        if local:
+            return local
         
         try:
-            response = requests.get(drug_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Извлечение данных (структура может измениться)
-            drug_info = {
-                "name": inn,
-                "url": drug_url,
-                "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
-                "message": f"Данные о {inn} найдены на DrugBank",
-                "description": "",
-                "pharmacokinetics": "",
-                "half_life": "",
-                "absorption": ""
-            }
+            # Ошибка поиска - "error", а не "not_found": такой результат не кэшируется
+            drug_url = self._find_drug_url(inn)
+            if not drug_url:
+                return self._not_found(inn)
             
-            # Попытка найти секцию Pharmacology
-            pk_section = soup.find('section', id='pharmacology')
-            if pk_section:
-                drug_info["pharmacokinetics"] = pk_section.get_text(strip=True)
-            
-            # Half-life
-            half_life_dt = soup.find('dt', string='Half Life')
-            if half_life_dt:
-                half_life_dd = half_life_dt.find_next('dd')
-                drug_info["half_life"] = half_life_dd.get_text(strip=True)
-            
-            logger.info(f"Информация о {inn} получена")
-            return drug_info
+            fields = fetch_parsed(self.session, self.http_cache, "drugbank", drug_url,
+                                  self._drug_page_fields, "drugbank.drug", headers=self.headers, timeout=10)
+            return self._drug_info(inn, drug_url, fields)
             
         except Exception as e:
             logger.error(f"Ошибка получения информации: {e}")
-            return {
-                "name": inn,
-                "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
-                "message": f"Ошибка при получении данных о {inn}",
-                "status": "error",
-                "error": str(e)
-            }
\ No newline at end of file
+            return self._error(inn, e)
+    
+    def _drug_info(self, inn: str, drug_url: str, fields: dict) -> dict:
+        """
+        Информация о препарате по полям, извлеченным со страницы
+        """
+        # Извлечение данных (структура может измениться)
+        drug_info = {
+            "name": inn,
+            "url": drug_url,
+            "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
+            "message": f"Данные о {inn} найдены на DrugBank",
+            "description": "",
+            "pharmacokinetics": "",
+            "half_life": "",
+            "absorption": ""
+        }
+        
+        drug_info.update(fields)
+        
+        logger.info(f"Информация о {inn} получена")
+        return drug_info
+    
+    @staticmethod
+    def _drug_page_fields(content: bytes) -> dict:
+        """
+        Текст секции фармакологии и период полувыведения со страницы препарата
+        """
+        if LXML_AVAILABLE:
+            return extract_drug_page(content)
+        return DrugBankScraper._drug_page_fields_soup(content)
+    
+    @staticmethod
+    def _drug_page_fields_soup(content: bytes) -> dict:
+        """
+        Разбор через BeautifulSoup (без lxml)
+        """
+        soup = BeautifulSoup(content, 'html.parser')
+        fields = {"pharmacokinetics": "", "half_life": ""}
+        
+        # Попытка найти секцию Pharmacology
+        pk_section = soup.find('section', id='pharmacology')
+        if pk_section:
+            fields["pharmacokinetics"] = pk_section.get_text(strip=True)
+        
+        # Half-life
+        half_life_dt = soup.find('dt', string='Half Life')
+        if half_life_dt:
+            half_life_dd = half_life_dt.find_next('dd')
+            fields["half_life"] = half_life_dd.get_text(strip=True)
+        
+        return fields
+    
+    def _lookup_local(self, inn: str) -> dict:
+        """
+        Информация о препарате из локального хранилища (None при промахе)
+        """
+        if not self.store:
+            return None
+        
+        drug = self.store.find(inn)
+        if not drug:
+            return None
+        
+        logger.info(f"Информация о {inn} из локального хранилища DrugBank ({drug['drugbank_id']})")
+        return {
+            "name": inn,
+            "url": drug["url"],
+            "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
+            "message": f"Данные о {inn} найдены в локальной копии DrugBank",
+            "description": drug["description"],
+            "pharmacokinetics": drug["pharmacology"],
+            "half_life": drug["half_life"],
+            "absorption": drug["absorption"],
+            "drugbank_id": drug["drugbank_id"],
+            "synonyms": drug["synonyms"],
+            "source": "local"
+        }
+    
+    def _not_found(self, inn: str) -> dict:
+        return {
+            "name": inn,
+            "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
+            "message": f"Поиск данных о {inn} на DrugBank",
+            "status": "not_found"
+        }
+    
+    def _error(self, inn: str, error: Exception) -> dict:
+        return {
+            "name": inn,
+            "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
+            "message": f"Ошибка при получении данных о {inn}",
+            "status": "error",
+            "error": str(error)
+        }
\ No newline at end of file
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Локальное хранилище DrugBank (SQLite) из полной XML выгрузки
+
+Выгрузка (drugbank_all_full_database.xml.zip, несколько ГБ) разбирается
+потоково через lxml.iterparse: в памяти одновременно находится один
+препарат. Для каждого сохраняются название, синонимы, описание, период
+полувыведения, всасывание и фармакология; поиск идет по индексу названий
+и синонимов, без обращения к сайту DrugBank.
+
+Загрузка выгрузки (из корня проекта):
+    python -m scrapers.drugbank_store --db data/drugbank.sqlite3 drugbank_all_full_database.xml.zip
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.pubmed_xml import LXML_AVAILABLE
+
+if LXML_AVAILABLE:
+    from lxml import etree
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NS = "{http://www.drugbank.ca}"
+DRUGBANK_URL = "https://go.drugbank.com"
+
+# Разделы фармакологии в порядке страницы DrugBank
+PHARMACOLOGY_FIELDS = [
+    ("indication", "Indication"),
+    ("pharmacodynamics", "Pharmacodynamics"),
+    ("mechanism-of-action", "Mechanism of action"),
+    ("absorption", "Absorption"),
+    ("volume-of-distribution", "Volume of distribution"),
+    ("protein-binding", "Protein binding"),
+    ("metabolism", "Metabolism"),
+    ("route-of-elimination", "Route of elimination"),
+    ("half-life", "Half-life"),
+    ("clearance", "Clearance"),
+    ("toxicity", "Toxicity"),
+]
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def _text(element, tag: str) -> str:
+    return (element.findtext(NS + tag) or "").strip()
+
+
+def drug_from_element(element) -> dict:
+    """
+    Словарь препарата из элемента <drug> выгрузки DrugBank
+    """
+    drugbank_id = ""
+    for id_element in element.iterfind(NS + "drugbank-id"):
+        if id_element.get("primary") == "true":
+            drugbank_id = (id_element.text or "").strip()
+            break
+
+    synonyms = []
+    for synonym in element.iterfind(f"{NS}synonyms/{NS}synonym"):
+        text = (synonym.text or "").strip()
+        if text and text not in synonyms:
+            synonyms.append(text)
+
+    pharmacology = []
+    for tag, label in PHARMACOLOGY_FIELDS:
+        text = _text(element, tag)
+        if text:
+            pharmacology.append(f"{label}: {text}")
+
+    return {
+        "drugbank_id": drugbank_id,
+        "name": _text(element, "name"),
+        "synonyms": synonyms,
+        "description": _text(element, "description"),
+        "half_life": _text(element, "half-life"),
+        "absorption": _text(element, "absorption"),
+        "pharmacology": "\n".join(pharmacology)
+    }
+
+
+def iter_drugbank_drugs(source):
+    """
+    Генератор препаратов из XML выгрузки DrugBank
+
+    Вложенные <drug> (например, в описании путей метаболизма) пропускаются:
+    берутся только прямые потомки корневого <drugbank>.
+    """
+    source = getattr(source, "buffer", source)
+    context = etree.iterparse(
+        source,
+        events=("end",),
+        tag=NS + "drug",
+        load_dtd=False,
+        no_network=True,
+        resolve_entities=False,
+        huge_tree=True
+    )
+
+    for _, element in context:
+        parent = element.getparent()
+        if parent is None or parent.tag != NS + "drugbank":
+            continue
+        try:
+            yield drug_from_element(element)
+        except Exception as e:
+            logger.warning(f"Не удалось разобрать препарат: {str(e)[:50]}")
+        finally:
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del parent[0]
+
+    del context
+
+
+def _open_dump(path: str):
+    """
+    Файл выгрузки: .xml, .xml.gz или .zip с одним XML внутри
+    """
+    if path.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        members = [name for name in archive.namelist() if name.endswith(".xml")]
+        if not members:
+            raise ValueError(f"В архиве {path} нет XML файла")
+        return archive.open(members[0])
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+class DrugBankStore:
+    """
+    Локальная копия DrugBank с индексом по названиям и синонимам
+    """
+
+    def __init__(self, path: str, base_url: str = DRUGBANK_URL):
+        self.path = path
+        self.base_url = base_url
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS drugs (
+                drugbank_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                synonyms TEXT NOT NULL,
+                description TEXT NOT NULL,
+                half_life TEXT NOT NULL,
+                absorption TEXT NOT NULL,
+                pharmacology TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS drug_names (
+                name TEXT NOT NULL,
+                drugbank_id TEXT NOT NULL,
+                is_primary INTEGER NOT NULL,
+                PRIMARY KEY (name, drugbank_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS drug_names_id ON drug_names (drugbank_id);
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                name TEXT PRIMARY KEY,
+                drugs INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def is_ingested(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM ingested_files WHERE name = ?", (name,)).fetchone()
+            return row is not None
+
+    def ingest_file(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Загрузить выгрузку DrugBank; препараты с теми же DrugBank ID заменяются
+
+        Returns:
+            int: количество загруженных препаратов
+        """
+        if not LXML_AVAILABLE:
+            raise RuntimeError("Для загрузки DrugBank нужен lxml: pip install lxml")
+
+        drugs = 0
+        batch = []
+        with _open_dump(path) as source:
+            for drug in iter_drugbank_drugs(source):
+                if not drug["drugbank_id"] or not drug["name"]:
+                    continue
+                batch.append(drug)
+                if len(batch) >= batch_size:
+                    self._write(batch)
+                    drugs += len(batch)
+                    batch = []
+                    logger.info(f"  Загружено {drugs} препаратов")
+
+        self._write(batch)
+        drugs += len(batch)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (name, drugs, ingested_at) VALUES (?, ?, ?)",
+                (os.path.basename(path), drugs, time.time())
+            )
+            self._conn.commit()
+
+        logger.info(f"📥 {os.path.basename(path)}: {drugs} препаратов")
+        return drugs
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        names = []
+        for drug in batch:
+            seen = {normalize_name(drug["name"])}
+            names.append((normalize_name(drug["name"]), drug["drugbank_id"], 1))
+            for synonym in drug["synonyms"]:
+                key = normalize_name(synonym)
+                if key not in seen:
+                    seen.add(key)
+                    names.append((key, drug["drugbank_id"], 0))
+
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM drug_names WHERE drugbank_id = ?",
+                [(drug["drugbank_id"],) for drug in batch]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO drugs (drugbank_id, name, synonyms, description, half_life, absorption, pharmacology) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (drug["drugbank_id"], drug["name"], json.dumps(drug["synonyms"], ensure_ascii=False),
+                     drug["description"], drug["half_life"], drug["absorption"], drug["pharmacology"])
+                    for drug in batch
+                ]
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO drug_names (name, drugbank_id, is_primary) VALUES (?, ?, ?)",
+                names
+            )
+            self._conn.commit()
+
+    def find(self, name: str) -> dict:
+        """
+        Препарат по названию или синониму (без учета регистра)
+
+        Совпадение с основным названием важнее совпадения с синонимом.
+
+        Returns:
+            dict препарата или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT d.drugbank_id, d.name, d.synonyms, d.description, d.half_life, d.absorption, d.pharmacology
+                FROM drug_names n JOIN drugs d ON d.drugbank_id = n.drugbank_id
+                WHERE n.name = ?
+                ORDER BY n.is_primary DESC, d.drugbank_id
+                LIMIT 1
+                """,
+                (normalize_name(name),)
+            ).fetchone()
+        if row is None:
+            return None
+
+        drugbank_id, drug_name, synonyms, description, half_life, absorption, pharmacology = row
+        return {
+            "drugbank_id": drugbank_id,
+            "name": drug_name,
+            "synonyms": json.loads(synonyms),
+            "description": description,
+            "half_life": half_life,
+            "absorption": absorption,
+            "pharmacology": pharmacology,
+            "url": f"{self.base_url}/drugs/{drugbank_id}"
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "drugs": self._conn.execute("SELECT COUNT(*) FROM drugs").fetchone()[0],
+                "names": self._conn.execute("SELECT COUNT(*) FROM drug_names").fetchone()[0]
+            }
+
+
+# Singleton instance
+_store_instance = None
+_store_lock = threading.Lock()
+
+def get_drugbank_store() -> DrugBankStore:
+    """
+    Получить локальное хранилище DrugBank (None, если оно не настроено или не создано)
+    """
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                from config import Config
+                if not Config.DRUGBANK_STORE_PATH or not os.path.exists(Config.DRUGBANK_STORE_PATH):
+                    return None
+                _store_instance = DrugBankStore(Config.DRUGBANK_STORE_PATH)
+                logger.info(f"💊 Локальное хранилище DrugBank: {Config.DRUGBANK_STORE_PATH}")
+    return _store_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка XML выгрузки DrugBank в локальное хранилище")
+    parser.add_argument("file", help="drugbank_all_full_database.xml(.zip|.gz)")
+    parser.add_argument("--db", default=None, help="путь к базе (по умолчанию DRUGBANK_STORE_PATH)")
+    parser.add_argument("--force", action="store_true", help="загрузить повторно уже загруженный файл")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        from config import Config
+        db_path = Config.DRUGBANK_STORE_PATH or "data/drugbank.sqlite3"
+
+    store = DrugBankStore(db_path)
+    if not args.force and store.is_ingested(os.path.basename(args.file)):
+        logger.info(f"⏭️ {os.path.basename(args.file)} уже загружен")
+        return
+
+    started = time.time()
+    store.ingest_file(args.file)
+    stats = store.stats()
+    logger.info(f"✅ Готово за {time.time() - started:.0f} сек: {stats['drugs']} препаратов, {stats['names']} названий")
+
+
+if __name__ == "__main__":
+    main()
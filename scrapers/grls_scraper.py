@@ -1,79 +1,352 @@
-import requests
 from bs4 import BeautifulSoup
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from scrapers.grls_store import get_grls_store
+from scrapers.html_extract import LXML_AVAILABLE, extract_grid_page, postback_pages
+from scrapers.http_cache import fetch_parsed_status, get_http_cache
+from scrapers.http_session import get_http_session
+from scrapers.rate_limiter import ConcurrencyLimiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class GRLSScraper:
-    def __init__(self):
-        self.base_url = "https://grls.rosminzdrav.ru"
+    def __init__(self, base_url: str = None):
+        try:
+            from config import Config
+            self.base_url = base_url or Config.GRLS_BASE_URL
+            self.live_check = Config.GRLS_LIVE_CHECK
+            self.pagination = Config.GRLS_PAGINATION
+            self.max_pages = Config.GRLS_MAX_PAGES
+            self.page_concurrency = Config.GRLS_PAGE_CONCURRENCY
+            self.timeout = Config.GRLS_TIMEOUT
+        except ImportError:
+            self.base_url = base_url or "https://grls.rosminzdrav.ru"
+            self.live_check = False
+            self.pagination = True
+            self.max_pages = 20
+            self.page_concurrency = 4
+            self.timeout = 15
         self.search_url = f"{self.base_url}/Grls_View_v2.aspx"
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        self.session = get_http_session()
+        self.http_cache = get_http_cache()
+        # Общий для всех скраперов процесса лимит одновременных запросов к сайту
+        self.page_limiter = get_grls_page_limiter()
+        
+        # Локальный снимок реестра: поиск без запроса к медленному сайту ГРЛС
+        try:
+            self.store = get_grls_store()
+        except Exception as e:
+            logger.warning(f"⚠️ Локальный снимок ГРЛС недоступен: {e}")
+            self.store = None
     
     def search_drug(self, inn: str) -> list:
         """
         Поиск препарата в ГРЛС
+        
+        Сначала в локальном снимке реестра (scrapers/grls_store.py), при его
+        отсутствии или с GRLS_LIVE_CHECK - на сайте ГРЛС.
         """
-        params = {
-            "searchKey": inn,
-            "t": ""
-        }
+        return self._search(inn)[0]
+    
+    def _search(self, inn: str, deadline: float = None) -> tuple:
+        """
+        Returns:
+            tuple: (список препаратов, источник "local" или "live", статус "ok" | "timeout" | "error")
+        """
+        local = self._search_local(inn)
+        if local is not None and not self.live_check:
+            return local, "local", "ok"
+        return self._fresher(inn, local, *self._search_live(inn, deadline))
+    
+    def _search_local(self, inn: str) -> list:
+        """
+        Препараты из локального снимка реестра (None, если снимка нет)
+        """
+        if not self.store:
+            return None
+        
+        results = self.store.search(inn)
+        logger.info(f"Найдено {len(results)} препаратов в локальном снимке ГРЛС")
+        return results
+    
+    def _fresher(self, inn: str, local: list, live: list, status: str) -> tuple:
+        """
+        Сверка снимка с сайтом: если на сайте больше регистраций, снимок устарел
+        """
+        if local is None:
+            return live, "live", status
+        if len(live) > len(local):
+            logger.warning(f"⚠️ Снимок ГРЛС устарел для {inn}: {len(local)} в снимке, {len(live)} на сайте")
+            return live, "live", status
+        return local, "local", "ok"
+    
+    def _search_live(self, inn: str, deadline: float = None) -> tuple:
+        """
+        Поиск на сайте ГРЛС
+        
+        Первая страница дает ссылки навигации (postback ASP.NET); остальные
+        страницы загружаются окнами навигации: страницы окна - параллельно
+        (не больше GRLS_PAGE_CONCURRENCY запросов к сайту от всех поисков
+        процесса, см. get_grls_page_limiter), следующее окно - по
+        ссылке "..." из формы ее страницы. Все - до общего срока deadline
+        (time.monotonic(), по умолчанию через GRLS_TIMEOUT секунд); не
+        успевшие к сроку страницы пропускаются.
+        
+        Форма для postback (__VIEWSTATE) берется только из ответа сайта:
+        если первая страница взята из свежей записи HTTP кэша без запроса и
+        страниц несколько, она проверяется условным GET.
+        
+        Returns:
+            tuple: (список препаратов, статус: "ok", "timeout" - не все страницы
+                   получены к сроку, "error" - сайт не ответил)
+        """
+        deadline = deadline or time.monotonic() + self.timeout
         
         try:
             logger.info(f"Поиск в ГРЛС: {inn}")
-            response = requests.get(
-                self.search_url,
-                params=params,
-                headers=self.headers,
-                timeout=15
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            first, cached = self._first_page(inn, deadline)
+            if self.pagination and first["pages"] and cached == "hit":
+                first, _ = self._first_page(inn, deadline, revalidate=True)
             
-            # Парсинг результатов поиска
-            results = []
+            known = {1}
+            fetched = {}
+            form_page = first
+            while True:
+                pages = self._window_pages(inn, form_page, known)
+                if not pages:
+                    break
+                known.update(pages)
+                fetched.update(self._fetch_pages(inn, form_page, pages, deadline))
+                # Следующее окно навигации - по форме последней страницы окна
+                form_page = fetched.get(pages[-1])
             
-            # Поиск таблицы с результатами
-            table = soup.find('table', class_='grid')
-            
-            if table:
-                rows = table.find_all('tr')[1:]  # Пропускаем заголовок
-                
-                for row in rows:
-                    cols = row.find_all('td')
-                    if len(cols) >= 3:
-                        drug_name = cols[0].get_text(strip=True)
-                        dosage_form = cols[1].get_text(strip=True)
-                        manufacturer = cols[2].get_text(strip=True)
-                        
-                        results.append({
-                            "name": drug_name,
-                            "dosage_form": dosage_form,
-                            "manufacturer": manufacturer
-                        })
+            rows = first["rows"] + self._merge_pages(inn, sorted(known - {1}), fetched)
             
+            results = self._results_from_rows(rows)
             logger.info(f"Найдено {len(results)} препаратов в ГРЛС")
-            return results
+            return results, self._pages_status(known, fetched, deadline)
             
         except Exception as e:
             logger.error(f"Ошибка поиска в ГРЛС: {e}")
+            return [], "error"
+    
+    @staticmethod
+    def _pages_status(known: set, fetched: dict, deadline: float) -> str:
+        """
+        Статус поиска по загруженным страницам (первая загружена всегда)
+        """
+        if len(fetched) == len(known) - 1:
+            return "ok"
+        return "timeout" if time.monotonic() >= deadline else "error"
+    
+    def _first_page(self, inn: str, deadline: float, revalidate: bool = False) -> tuple:
+        """
+        Returns:
+            tuple: (разобранная страница, "hit" | "revalidated" | "miss", см. fetch_parsed_status)
+        """
+        with self.page_limiter.slot(self._request_timeout(deadline)):
+            return fetch_parsed_status(
+                self.session,
+                self.http_cache,
+                "grls",
+                self.search_url,
+                self._grid_page,
+                "grls.page",
+                params=self._search_params(inn),
+                headers=self.headers,
+                timeout=self._request_timeout(deadline),
+                revalidate=revalidate
+            )
+    
+    def _request_timeout(self, deadline: float) -> float:
+        return max(0.1, min(self.timeout, deadline - time.monotonic()))
+    
+    def _fetch_page(self, inn: str, form_page: dict, page: int, deadline: float) -> dict:
+        """
+        Страница page: postback формы form_page с аргументом Page$N
+        """
+        with self.page_limiter.slot(self._request_timeout(deadline)):
+            response = self.session.post(
+                self.search_url,
+                params=self._search_params(inn),
+                data=self._page_form(form_page, page),
+                headers=self.headers,
+                timeout=self._request_timeout(deadline)
+            )
+        response.raise_for_status()
+        return self._grid_page(response.content)
+    
+    def _fetch_pages(self, inn: str, form_page: dict, pages: list, deadline: float) -> dict:
+        """
+        Параллельная загрузка страниц; не успевшие к сроку страницы не ждем
+        
+        Returns:
+            dict: {номер страницы: разобранная страница}
+        """
+        if not pages or time.monotonic() >= deadline:
+            return {}
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.page_concurrency, len(pages)))
+        futures = {executor.submit(self._fetch_page, inn, form_page, page, deadline): page for page in pages}
+        done, _ = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        fetched = {}
+        for future in done:
+            if future.exception():
+                logger.warning(f"⚠️ ГРЛС, страница {futures[future]}: {future.exception()}")
+            else:
+                fetched[futures[future]] = future.result()
+        return fetched
+    
+    def _window_pages(self, inn: str, form_page: dict, known: set) -> list:
+        """
+        Еще не загруженные страницы, на которые есть ссылки навигации form_page
+        (вместе с "..." - первой страницей следующего окна)
+        """
+        if not self.pagination or form_page is None:
             return []
+        pages = sorted(int(page) for page in form_page["pages"] if int(page) not in known)
+        room = self.max_pages - len(known)
+        if len(pages) > room:
+            logger.warning(f"⚠️ ГРЛС: больше {self.max_pages} страниц для {inn}, загружаются первые {self.max_pages}")
+            pages = pages[:max(room, 0)]
+        return pages
+    
+    def _page_form(self, form_page: dict, page: int) -> dict:
+        target, argument = form_page["pages"][str(page)]
+        return dict(form_page["form"], __EVENTTARGET=target, __EVENTARGUMENT=argument)
     
-    def get_be_studies(self, inn: str) -> dict:
+    def _merge_pages(self, inn: str, pages: list, fetched: dict) -> list:
         """
-        Попытка найти информацию о ранее проведенных BE исследованиях
+        Строки загруженных страниц в порядке страниц
         """
-        drugs = self.search_drug(inn)
+        missing = [page for page in pages if page not in fetched]
+        if missing:
+            logger.warning(f"⏱️ ГРЛС: для {inn} не получены страницы {missing}")
         
+        rows = []
+        for page in pages:
+            if page in fetched:
+                rows.extend(fetched[page]["rows"])
+        return rows
+    
+    def _search_params(self, inn: str) -> dict:
+        return {
+            "searchKey": inn,
+            "t": ""
+        }
+    
+    @staticmethod
+    def _grid_page(content: bytes) -> dict:
+        """
+        Строки таблицы результатов и число страниц
+        """
+        if LXML_AVAILABLE:
+            return extract_grid_page(content)
+        return GRLSScraper._grid_page_soup(content)
+    
+    def _results_from_rows(self, rows: list) -> list:
+        """
+        Препараты из строк таблицы результатов поиска
+        """
+        # Парсинг результатов поиска
+        results = []
+        for cols in rows:
+            if len(cols) >= 3:
+                results.append({
+                    "name": cols[0],
+                    "dosage_form": cols[1],
+                    "manufacturer": cols[2]
+                })
+        
+        return results
+    
+    @staticmethod
+    def _grid_rows_soup(content: bytes) -> list:
+        """
+        Разбор через BeautifulSoup (без lxml)
+        """
+        return GRLSScraper._soup_rows(BeautifulSoup(content, 'html.parser'))
+    
+    @staticmethod
+    def _grid_page_soup(content: bytes) -> dict:
+        """
+        Разбор через BeautifulSoup (без lxml)
+        """
+        soup = BeautifulSoup(content, 'html.parser')
+        links = [
+            (link.get_text(strip=True), link['href'])
+            for pager in soup.find_all(class_='pager')
+            for link in pager.find_all('a', href=True)
+        ]
+        return {
+            "rows": GRLSScraper._soup_rows(soup),
+            "pages": postback_pages(links),
+            "form": {field['name']: field.get('value', '') for field in soup.find_all('input', type='hidden', attrs={'name': True})}
+        }
+    
+    @staticmethod
+    def _soup_rows(soup) -> list:
+        # Поиск таблицы с результатами
+        table = soup.find('table', class_='grid')
+        if not table:
+            return []
+        
+        # Строки самой таблицы, без навигации и вложенных в нее таблиц
+        rows = [
+            row for row in table.find_all('tr')
+            if 'pager' not in row.get('class', []) and row.find_parent('table') is table
+        ][1:]  # Пропускаем заголовок
+        return [[col.get_text(strip=True) for col in row.find_all('td')] for row in rows]
+    
+    def get_be_studies(self, inn: str, deadline: float = None) -> dict:
+        """
+        Попытка найти информацию о ранее проведенных BE исследованиях
+        
+        Args:
+            deadline: срок ответа (time.monotonic()), например общий срок полного анализа
+        """
+        drugs, source, status = self._search(inn, deadline)
+        return self._be_studies_result(inn, drugs, source, status)
+    
+    def _be_studies_result(self, inn: str, drugs: list, source: str = "live", status: str = "ok") -> dict:
         return {
             "inn": inn,
             "registered_drugs": drugs,
             "count": len(drugs),
+            "source": source,
+            "status": status,
             "search_url": "https://grls.rosminzdrav.ru/",
             "message": f"Найдено {len(drugs)} препаратов в ГРЛС для {inn}",
             "be_studies": []  # В ГРЛС обычно нет публичных данных BE исследований
-        }
\ No newline at end of file
+        }
+
+
+# Singleton instance
+_page_limiter_instance = None
+_page_limiter_lock = threading.Lock()
+
+def get_grls_page_limiter() -> ConcurrencyLimiter:
+    """
+    Лимит одновременных запросов к сайту ГРЛС, общий для синхронных
+    и асинхронных скраперов процесса (GRLS_PAGE_CONCURRENCY)
+    """
+    global _page_limiter_instance
+    if _page_limiter_instance is None:
+        with _page_limiter_lock:
+            if _page_limiter_instance is None:
+                try:
+                    from config import Config
+                    limit = Config.GRLS_PAGE_CONCURRENCY
+                except ImportError:
+                    limit = 4
+                _page_limiter_instance = ConcurrencyLimiter(limit)
+    return _page_limiter_instance
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Локальный снимок Государственного реестра лекарственных средств (SQLite)
+
+Выгрузка реестра с сайта ГРЛС (XLSX, обычно в ZIP архиве, или CSV)
+читается потоково: строки листа XLSX разбираются через lxml.iterparse,
+в памяти одновременно находится одна строка (и общая таблица строк XLSX).
+Поиск идет по триграммному индексу FTS5 по МНН, торговому наименованию
+и владельцу РУ - подстрока ищется за миллисекунды без запроса к сайту.
+
+Снимок заменяется целиком при каждой загрузке.
+
+Загрузка выгрузки (из корня проекта):
+    python -m scrapers.grls_store --db data/grls.sqlite3 grls_export.zip
+    python -m scrapers.grls_store --db data/grls.sqlite3 --url <ссылка на выгрузку реестра>
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.pubmed_xml import LXML_AVAILABLE
+
+if LXML_AVAILABLE:
+    from lxml import etree
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+# Поля снимка и фрагменты заголовков столбцов выгрузки (без учета регистра).
+# Порядок важен: "Страна держателя РУ" должна попасть в country раньше,
+# чем столбец держателя будет искаться по слову "держател".
+COLUMN_ALIASES = [
+    ("reg_number", ("регистрационный номер", "номер ру")),
+    ("reg_date", ("дата регистрации",)),
+    ("country", ("страна",)),
+    ("trade_name", ("торговое наименование",)),
+    ("inn", ("международное непатентованное", "мнн")),
+    ("dosage_form", ("формы выпуска", "форма выпуска", "лекарственная форма")),
+    ("manufacturer", ("держател", "владел", "производител")),
+]
+FIELDS = [field for field, _ in COLUMN_ALIASES]
+REQUIRED_FIELDS = ("trade_name", "inn")
+
+
+def header_columns(cells: list) -> dict:
+    """
+    Номера столбцов полей снимка по строке заголовков (None, если это не заголовок)
+    """
+    columns = {}
+    for index, cell in enumerate(cells):
+        title = " ".join(str(cell or "").split()).casefold()
+        if not title:
+            continue
+        for field, aliases in COLUMN_ALIASES:
+            if field not in columns and any(alias in title for alias in aliases):
+                columns[field] = index
+                break
+    if not all(field in columns for field in REQUIRED_FIELDS):
+        return None
+    return columns
+
+
+def _column_index(reference: str) -> int:
+    """
+    Номер столбца по ссылке на ячейку XLSX ("C12" -> 2)
+    """
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def _shared_strings(archive: zipfile.ZipFile) -> list:
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as source:
+        for _, element in etree.iterparse(source, events=("end",), tag=XLSX_NS + "si"):
+            strings.append("".join(element.itertext(XLSX_NS + "t")))
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    return strings
+
+
+def iter_xlsx_rows(archive: zipfile.ZipFile):
+    """
+    Генератор строк первого листа XLSX (списки значений ячеек)
+    """
+    if not LXML_AVAILABLE:
+        raise RuntimeError("Для чтения XLSX выгрузки ГРЛС нужен lxml: pip install lxml")
+
+    strings = _shared_strings(archive)
+    sheets = sorted(name for name in archive.namelist() if re.match(r"xl/worksheets/sheet\d+\.xml$", name))
+    if not sheets:
+        raise ValueError("В файле XLSX нет листов")
+
+    with archive.open(sheets[0]) as source:
+        for _, row in etree.iterparse(source, events=("end",), tag=XLSX_NS + "row", huge_tree=True):
+            cells = []
+            for position, cell in enumerate(row.iterfind(XLSX_NS + "c")):
+                index = _column_index(cell.get("r", "")) if cell.get("r") else position
+                cell_type = cell.get("t")
+                if cell_type == "inlineStr":
+                    value = "".join(cell.itertext(XLSX_NS + "t"))
+                else:
+                    value = cell.findtext(XLSX_NS + "v") or ""
+                    if cell_type == "s" and value:
+                        value = strings[int(value)]
+                cells.extend([""] * (index - len(cells) + 1))
+                cells[index] = value
+            yield cells
+
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+
+
+def iter_csv_rows(source):
+    """
+    Генератор строк CSV выгрузки (UTF-8 или cp1251, разделитель ; , или табуляция)
+    """
+    source = io.BufferedReader(source, buffer_size=64 * 1024)
+    head = source.peek(64 * 1024)
+    encoding = "utf-8-sig"
+    try:
+        head.decode(encoding)
+    except UnicodeDecodeError as e:
+        # Обрезанный на границе буфера символ UTF-8 - не повод менять кодировку
+        if e.start < len(head) - 4:
+            encoding = "cp1251"
+
+    first_line = head.split(b"\n", 1)[0].decode(encoding, errors="ignore")
+    delimiter = max(";,\t", key=first_line.count)
+    text = io.TextIOWrapper(source, encoding=encoding, errors="replace", newline="")
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def _iter_rows(path: str):
+    """
+    Строки выгрузки: .xlsx, .csv или .zip с одним из них внутри
+    """
+    if not zipfile.is_zipfile(path):
+        with open(path, "rb") as source:
+            yield from iter_csv_rows(source)
+        return
+
+    archive = zipfile.ZipFile(path)
+    names = archive.namelist()
+    if "xl/workbook.xml" in names:
+        yield from iter_xlsx_rows(archive)
+        return
+
+    csv_names = [name for name in names if name.lower().endswith(".csv")]
+    if csv_names:
+        with archive.open(csv_names[0]) as source:
+            yield from iter_csv_rows(source)
+        return
+
+    xlsx_names = [name for name in names if name.lower().endswith(".xlsx")]
+    if not xlsx_names:
+        raise ValueError(f"В архиве {path} нет XLSX или CSV файла")
+    # XLSX сам является ZIP архивом и требует произвольного доступа - распаковываем во временный каталог
+    with tempfile.TemporaryDirectory() as directory:
+        yield from iter_xlsx_rows(zipfile.ZipFile(archive.extract(xlsx_names[0], directory)))
+
+
+def iter_registrations(path: str):
+    """
+    Генератор регистраций из выгрузки реестра
+
+    Строки до заголовка (название реестра, дата выгрузки) пропускаются.
+    """
+    columns = None
+    for cells in _iter_rows(path):
+        if columns is None:
+            columns = header_columns(cells)
+            continue
+        registration = {
+            field: " ".join(str(cells[index]).split()) if index < len(cells) else ""
+            for field, index in columns.items()
+        }
+        if registration["trade_name"] or registration["inn"]:
+            yield registration
+
+    if columns is None:
+        raise ValueError(f"В выгрузке {path} не найдена строка заголовков (МНН, торговое наименование)")
+
+
+def _match_query(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _match_tier(registration: dict, key: str) -> int:
+    """
+    0 - совпадение по МНН, 1 - по торговому наименованию, 2 - по владельцу РУ
+    """
+    for tier, field in enumerate(("inn", "trade_name", "manufacturer")):
+        if key in registration[field].casefold():
+            return tier
+    return None
+
+
+class GRLSStore:
+    """
+    Снимок реестра ГРЛС с триграммным поиском
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS registrations (
+                id INTEGER PRIMARY KEY,
+                reg_number TEXT NOT NULL,
+                reg_date TEXT NOT NULL,
+                country TEXT NOT NULL,
+                trade_name TEXT NOT NULL,
+                inn TEXT NOT NULL,
+                dosage_form TEXT NOT NULL,
+                manufacturer TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS registrations_fts USING fts5(
+                inn, trade_name, manufacturer,
+                content='registrations', content_rowid='id', tokenize='trigram'
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                name TEXT NOT NULL,
+                registrations INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def ingest_file(self, path: str, batch_size: int = 5000) -> int:
+        """
+        Загрузить выгрузку реестра вместо текущего снимка
+
+        Returns:
+            int: количество загруженных регистраций
+        """
+        registrations = 0
+        batch = []
+        with self._lock:
+            # Одна транзакция: другие процессы видят старый снимок до завершения загрузки
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM registrations")
+                for registration in iter_registrations(path):
+                    batch.append(tuple(registration.get(field, "") for field in FIELDS))
+                    if len(batch) >= batch_size:
+                        self._write(batch)
+                        registrations += len(batch)
+                        batch = []
+                        logger.info(f"  Загружено {registrations} регистраций")
+                self._write(batch)
+                registrations += len(batch)
+
+                self._conn.execute("INSERT INTO registrations_fts (registrations_fts) VALUES ('rebuild')")
+                self._conn.execute(
+                    "INSERT INTO snapshots (name, registrations, ingested_at) VALUES (?, ?, ?)",
+                    (os.path.basename(path), registrations, time.time())
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        logger.info(f"📥 {os.path.basename(path)}: {registrations} регистраций")
+        return registrations
+
+    def _write(self, batch: list):
+        if batch:
+            self._conn.executemany(
+                f"INSERT INTO registrations ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                batch
+            )
+
+    def search(self, query: str, limit: int = 500) -> list:
+        """
+        Регистрации, где МНН, торговое наименование или владелец РУ содержат query
+
+        Сначала совпадения по МНН, затем по торговому наименованию и владельцу;
+        внутри группы - в порядке реестра.
+
+        Returns:
+            list: [{"name", "dosage_form", "manufacturer", "inn", "reg_number", "reg_date", "country"}, ...]
+        """
+        query = " ".join(query.split())
+        if not query:
+            return []
+
+        if len(query) >= 3:
+            sql = f"""
+                SELECT {', '.join('r.' + field for field in FIELDS)}
+                FROM registrations_fts f JOIN registrations r ON r.id = f.rowid
+                WHERE registrations_fts MATCH ?
+                ORDER BY r.id LIMIT ?
+            """
+            params = (_match_query(query), limit * 10)
+        else:
+            # Триграммный индекс не ищет строки короче трех символов
+            sql = f"""
+                SELECT {', '.join(FIELDS)} FROM registrations
+                WHERE inn LIKE ?1 OR trade_name LIKE ?1 OR manufacturer LIKE ?1
+                ORDER BY id LIMIT ?2
+            """
+            params = (f"%{query}%", limit * 10)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        # LIKE в SQLite не учитывает регистр только для латиницы - сверяем через casefold
+        key = query.casefold()
+        registrations = [dict(zip(FIELDS, row)) for row in rows]
+        registrations = [
+            registration for registration in registrations
+            if _match_tier(registration, key) is not None
+        ]
+        registrations.sort(key=lambda registration: _match_tier(registration, key))
+
+        return [
+            {
+                "name": registration["trade_name"],
+                "dosage_form": registration["dosage_form"],
+                "manufacturer": registration["manufacturer"],
+                "inn": registration["inn"],
+                "reg_number": registration["reg_number"],
+                "reg_date": registration["reg_date"],
+                "country": registration["country"]
+            }
+            for registration in registrations[:limit]
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = self._conn.execute(
+                "SELECT name, registrations, ingested_at FROM snapshots ORDER BY ingested_at DESC LIMIT 1"
+            ).fetchone()
+        if snapshot is None:
+            return {"registrations": 0, "snapshot": None, "ingested_at": None}
+        return {"registrations": snapshot[1], "snapshot": snapshot[0], "ingested_at": snapshot[2]}
+
+
+def download_export(url: str, directory: str) -> str:
+    """
+    Скачать выгрузку реестра потоково (без чтения в память)
+
+    Returns:
+        str: путь к скачанному файлу
+    """
+    from scrapers.http_session import get_http_session
+
+    name = os.path.basename(url.split("?", 1)[0]) or "grls_export"
+    path = os.path.join(directory, name)
+    with get_http_session().get(url, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+    logger.info(f"⬇️ Выгрузка ГРЛС: {os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+    return path
+
+
+# Singleton instance
+_store_instance = None
+_store_lock = threading.Lock()
+
+def get_grls_store() -> GRLSStore:
+    """
+    Получить снимок реестра ГРЛС (None, если он не настроен или не создан)
+    """
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                from config import Config
+                if not Config.GRLS_STORE_PATH or not os.path.exists(Config.GRLS_STORE_PATH):
+                    return None
+                _store_instance = GRLSStore(Config.GRLS_STORE_PATH)
+                logger.info(f"📋 Локальный снимок ГРЛС: {Config.GRLS_STORE_PATH}")
+    return _store_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка выгрузки реестра ГРЛС в локальный снимок")
+    parser.add_argument("file", nargs="?", help="выгрузка реестра (.xlsx, .csv или .zip)")
+    parser.add_argument("--url", default=None, help="скачать выгрузку по ссылке вместо локального файла")
+    parser.add_argument("--db", default=None, help="путь к базе (по умолчанию GRLS_STORE_PATH)")
+    args = parser.parse_args()
+    if not args.file and not args.url:
+        parser.error("нужен файл выгрузки или --url")
+
+    db_path = args.db
+    if not db_path:
+        from config import Config
+        db_path = Config.GRLS_STORE_PATH or "data/grls.sqlite3"
+
+    store = GRLSStore(db_path)
+    started = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        path = download_export(args.url, directory) if args.url else args.file
+        store.ingest_file(path)
+    logger.info(f"✅ Готово за {time.time() - started:.0f} сек: {store.stats()['registrations']} регистраций")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Быстрое извлечение нужных фрагментов страниц DrugBank и ГРЛС через lxml
+
+Скраперам нужны только ссылка a.search-result-title, секция
+section#pharmacology, пара dt/dd "Half Life", таблица table.grid,
+ее навигация по страницам (.pager) и скрытые поля формы ASP.NET.
+Страница разбирается парсером libxml2 (C, без удержания GIL на время
+разбора), нужные элементы выбираются XPath, остальное дерево не
+обходится. Результат совпадает с BeautifulSoup(..., 'html.parser')
+и get_text(strip=True): текст <script>, <style>, <template> и
+комментарии не учитываются.
+
+Сравнение с BeautifulSoup: python -m benchmarks.bench_html_parsing
+"""
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+import re
+
+from bs4.dammit import UnicodeDammit
+
+# Теги, текст которых BeautifulSoup не включает в get_text()
+_SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+if LXML_AVAILABLE:
+    _SEARCH_RESULT_LINK = etree.XPath(
+        "(//a[contains(concat(' ', normalize-space(@class), ' '), ' search-result-title ')])[1]"
+    )
+    _PHARMACOLOGY_SECTION = etree.XPath("(//section[@id='pharmacology'])[1]")
+    _DEFINITION_TERMS = etree.XPath("//dt")
+    _NEXT_DEFINITION = etree.XPath("(descendant::dd | following::dd)[1]")
+    _GRID_TABLE = etree.XPath("(//table[contains(concat(' ', normalize-space(@class), ' '), ' grid ')])[1]")
+    _PAGER_LINKS = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' pager ')]//a[@href]")
+    _HIDDEN_INPUTS = etree.XPath("//input[@type='hidden'][@name]")
+
+# Ссылка навигации GridView: javascript:__doPostBack('ctl00$plate$gr','Page$2')
+_POSTBACK = re.compile(r"__doPostBack\('([^']*)','([^']*)'\)")
+_PAGE_ARGUMENT = re.compile(r"^Page\$(\d+)$")
+
+
+def parse_html(content):
+    """
+    Дерево страницы; кодировка определяется так же, как в BeautifulSoup
+    """
+    if isinstance(content, bytes):
+        content = UnicodeDammit(content, is_html=True).unicode_markup
+    return lxml.html.document_fromstring(content)
+
+
+def _strings(element):
+    if element.tag in _SKIP_TEXT_TAGS:
+        return
+    if element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def get_text(element) -> str:
+    """
+    Аналог Tag.get_text(strip=True) из BeautifulSoup
+    """
+    return "".join(text.strip() for text in _strings(element))
+
+
+def _single_string(element):
+    """
+    Аналог Tag.string: текст элемента, если он единственный потомок
+    """
+    children = list(element)
+    if not children:
+        return element.text
+    if len(children) == 1 and not element.text and not children[0].tail and isinstance(children[0].tag, str):
+        return _single_string(children[0])
+    return None
+
+
+def extract_search_result_href(content) -> str:
+    """
+    href первой ссылки a.search-result-title (None, если ссылки нет)
+    """
+    links = _SEARCH_RESULT_LINK(parse_html(content))
+    return links[0].get("href") if links else None
+
+
+def extract_drug_page(content) -> dict:
+    """
+    Текст секции фармакологии и период полувыведения со страницы препарата
+
+    Returns:
+        dict: {"pharmacokinetics": ..., "half_life": ...} (пустые строки, если не найдено)
+    """
+    doc = parse_html(content)
+    result = {"pharmacokinetics": "", "half_life": ""}
+
+    sections = _PHARMACOLOGY_SECTION(doc)
+    if sections:
+        result["pharmacokinetics"] = get_text(sections[0])
+
+    for dt in _DEFINITION_TERMS(doc):
+        if _single_string(dt) == "Half Life":
+            dd = _NEXT_DEFINITION(dt)
+            if dd:
+                result["half_life"] = get_text(dd[0])
+            break
+
+    return result
+
+
+def extract_grid_rows(content) -> list:
+    """
+    Ячейки строк первой таблицы table.grid без строки заголовка
+
+    Строки навигации (tr.pager) и вложенных в нее таблиц не включаются.
+
+    Returns:
+        list: [[текст ячейки, ...], ...]
+    """
+    return _grid_rows(parse_html(content))
+
+
+def _grid_rows(doc) -> list:
+    tables = _GRID_TABLE(doc)
+    if not tables:
+        return []
+
+    table = tables[0]
+    rows = [
+        row for row in table.iter("tr")
+        if "pager" not in row.get("class", "").split() and next(row.iterancestors("table")) is table
+    ][1:]
+    return [[get_text(cell) for cell in row.iter("td")] for row in rows]
+
+
+def postback_pages(links) -> dict:
+    """
+    Страницы из ссылок навигации GridView
+
+    Args:
+        links: пары (текст ссылки, href)
+
+    Ссылка "..." ведет к следующему (или предыдущему) окну навигации -
+    ее номер страницы берется из аргумента Page$N.
+
+    Returns:
+        dict: {"2": [__EVENTTARGET, __EVENTARGUMENT], ...} - только ссылки с номером страницы
+    """
+    pages = {}
+    for label, href in links:
+        match = _POSTBACK.search(href or "")
+        if not match:
+            continue
+        argument = _PAGE_ARGUMENT.match(match.group(2))
+        page = label if label.isdigit() else argument and argument.group(1)
+        if page and page not in pages:
+            pages[page] = [match.group(1), match.group(2)]
+    return pages
+
+
+def extract_grid_page(content) -> dict:
+    """
+    Строки таблицы table.grid и все, что нужно для запроса остальных страниц
+    (страница разбирается один раз)
+
+    Returns:
+        dict: {"rows": [[...], ...], "pages": {"2": [target, argument], ...}, "form": {скрытые поля}}
+    """
+    doc = parse_html(content)
+    return {
+        "rows": _grid_rows(doc),
+        "pages": postback_pages((get_text(link), link.get("href")) for link in _PAGER_LINKS(doc)),
+        "form": {field.get("name"): field.get("value", "") for field in _HIDDEN_INPUTS(doc)}
+    }
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BodyEvicted(LookupError):
+    """Тело страницы удалено очисткой кэша после lookup"""
+
+
+def cache_key(url: str, params: dict = None) -> str:
+    """
+    Полный URL запроса - ключ кэша (параметры в стабильном порядке)
+    """
+    if not params:
+        return url
+    separator = "&" if "?" in url else "?"
+    return url + separator + urlencode(sorted(params.items()))
+
+
+class HTTPCache:
+    """
+    Дисковый HTTP кэш страниц DrugBank и ГРЛС (SQLite) с условными запросами
+
+    Для каждого URL хранятся тело ответа и валидаторы (ETag, Last-Modified).
+    Запись моложе max_age отдается без запроса (hit); старше - проверяется
+    запросом с If-None-Match / If-Modified-Since, и ответ 304 (revalidated)
+    не скачивает страницу заново. Результаты разбора хранятся по хэшу тела:
+    если страница не изменилась, BeautifulSoup/lxml не запускаются вовсе.
+    Полная загрузка считается промахом (miss).
+
+    Размер ограничен: не чаще раза в prune_interval секунд (при сохранении
+    страницы) удаляются страницы, не проверявшиеся retention секунд, и самые
+    давно проверенные сверх max_entries, а затем тела и результаты разбора,
+    на которые больше не ссылается ни одна страница (старые версии страниц,
+    например ГРЛС с новым __VIEWSTATE в каждом ответе).
+    """
+
+    def __init__(self, path: str, max_age: int = 24 * 3600, max_entries: int = 10000,
+                 retention: int = 30 * 24 * 3600, prune_interval: int = 3600):
+        """
+        Args:
+            path: путь к файлу SQLite
+            max_age: сколько секунд запись используется без проверки на сервере
+            max_entries: максимум страниц (0 - без ограничения)
+            retention: через сколько секунд без проверки страница удаляется (0 - не удалять)
+            prune_interval: как часто, сек, выполнять очистку
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._counters = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                validated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bodies (
+                body_hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS parsed (
+                body_hash TEXT NOT NULL,
+                parser TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (body_hash, parser)
+            );
+            CREATE INDEX IF NOT EXISTS responses_body_hash ON responses (body_hash);
+            CREATE INDEX IF NOT EXISTS responses_validated_at ON responses (validated_at);
+            """
+        )
+        self._conn.commit()
+        logger.info(f"HTTP кэш страниц: {path} (max-age {max_age} сек)")
+
+    def _count(self, source: str, outcome: str):
+        with self._lock:
+            counters = self._counters.setdefault(source, {"hits": 0, "revalidated": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def lookup(self, url: str) -> dict:
+        """
+        Запись кэша для URL или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, validated_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body_hash, validated_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "fresh": time.time() - validated_at < self.max_age
+        }
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """
+        Заголовки условного запроса для проверки записи на сервере
+        """
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def from_cache(self, source: str, url: str, entry: dict, parse, parser: str, revalidated: bool = False):
+        """
+        Результат разбора сохраненной страницы (hit или ответ 304)
+        """
+        if revalidated:
+            with self._lock:
+                self._conn.execute("UPDATE responses SET validated_at = ? WHERE url = ?", (time.time(), url))
+                self._conn.commit()
+        self._count(source, "revalidated" if revalidated else "hits")
+        return self._parsed(entry["body_hash"], parse, parser)
+
+    def store(self, source: str, url: str, response_headers, content: bytes, parse, parser: str):
+        """
+        Сохранить полный ответ 200 и вернуть результат разбора
+
+        Если тело совпало с уже известным (сервер без валидаторов),
+        разбор берется из кэша.
+        """
+        body_hash = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO bodies (body_hash, body) VALUES (?, ?)",
+                (body_hash, zlib.compress(content))
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body_hash, validated_at) VALUES (?, ?, ?, ?, ?)",
+                (url, response_headers.get("ETag"), response_headers.get("Last-Modified"), body_hash, time.time())
+            )
+            self._conn.commit()
+        self._count(source, "misses")
+        result = self._parsed(body_hash, parse, parser, content)
+        if time.time() - self._pruned_at >= self.prune_interval:
+            self.prune()
+        return result
+
+    def prune(self) -> dict:
+        """
+        Удалить устаревшие и лишние страницы, затем тела и результаты разбора без ссылок
+
+        Returns:
+            dict: {"responses", "bodies", "parsed"} - сколько записей удалено
+        """
+        with self._lock:
+            self._pruned_at = time.time()
+            removed = {"responses": 0}
+            if self.retention:
+                removed["responses"] += self._conn.execute(
+                    "DELETE FROM responses WHERE validated_at < ?", (self._pruned_at - self.retention,)
+                ).rowcount
+            if self.max_entries:
+                removed["responses"] += self._conn.execute(
+                    "DELETE FROM responses WHERE url NOT IN "
+                    "(SELECT url FROM responses ORDER BY validated_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                ).rowcount
+            removed["bodies"] = self._conn.execute(
+                "DELETE FROM bodies WHERE body_hash NOT IN (SELECT body_hash FROM responses)"
+            ).rowcount
+            removed["parsed"] = self._conn.execute(
+                "DELETE FROM parsed WHERE body_hash NOT IN (SELECT body_hash FROM responses)"
+            ).rowcount
+            self._conn.commit()
+        if any(removed.values()):
+            logger.info(f"🧹 HTTP кэш: удалено страниц {removed['responses']}, тел {removed['bodies']}, "
+                        f"разборов {removed['parsed']}")
+        return removed
+
+    def _parsed(self, body_hash: str, parse, parser: str, content: bytes = None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM parsed WHERE body_hash = ? AND parser = ?",
+                (body_hash, parser)
+            ).fetchone()
+            if row is None and content is None:
+                body = self._conn.execute("SELECT body FROM bodies WHERE body_hash = ?", (body_hash,)).fetchone()
+                if body is None:
+                    raise BodyEvicted(body_hash)
+                content = zlib.decompress(body[0])
+        if row is not None:
+            return json.loads(row[0])
+
+        result = parse(content)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed (body_hash, parser, result) VALUES (?, ?, ?)",
+                (body_hash, parser, json.dumps(result, ensure_ascii=False))
+            )
+            self._conn.commit()
+        return result
+
+    def stats(self) -> dict:
+        """
+        Счетчики по источникам: hits (без запроса), revalidated (304), misses (полная загрузка)
+        """
+        with self._lock:
+            return {source: dict(counters) for source, counters in self._counters.items()}
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript("DELETE FROM responses; DELETE FROM bodies; DELETE FROM parsed;")
+            self._conn.commit()
+
+
+def fetch_parsed(session, cache: HTTPCache, source: str, url: str, parse, parser: str,
+                 params: dict = None, headers: dict = None, timeout: float = 10,
+                 revalidate: bool = False):
+    """
+    GET через HTTP кэш: результат parse(content) для страницы
+
+    Args:
+        session: requests.Session
+        cache: HTTPCache или None (без кэша - обычный запрос и разбор)
+        source: источник для счетчиков ("drugbank", "grls")
+        parse: функция разбора тела ответа (результат должен сериализоваться в JSON)
+        parser: имя разбора с версией - при изменении разбора старые результаты не используются
+        revalidate: не отдавать свежую запись без запроса (условный GET и при свежей записи)
+    """
+    return fetch_parsed_status(session, cache, source, url, parse, parser,
+                               params, headers, timeout, revalidate)[0]
+
+
+def fetch_parsed_status(session, cache: HTTPCache, source: str, url: str, parse, parser: str,
+                        params: dict = None, headers: dict = None, timeout: float = 10,
+                        revalidate: bool = False) -> tuple:
+    """
+    То же, что fetch_parsed, вместе с тем, откуда взят результат
+
+    Returns:
+        tuple: (результат разбора, "hit" - свежая запись кэша без запроса,
+               "revalidated" - ответ 304, "miss" - страница загружена)
+    """
+    url = cache_key(url, params)
+    if cache is None:
+        response = session.get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return parse(response.content), "miss"
+
+    entry = cache.lookup(url)
+    try:
+        if entry and entry["fresh"] and not revalidate:
+            return cache.from_cache(source, url, entry, parse, parser), "hit"
+
+        request_headers = dict(headers or {}, **cache.conditional_headers(entry))
+        response = session.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            return cache.from_cache(source, url, entry, parse, parser, revalidated=True), "revalidated"
+    except BodyEvicted:
+        # Страница вытеснена между lookup и чтением - загружаем целиком
+        response = session.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return cache.store(source, url, response.headers, response.content, parse, parser), "miss"
+
+
+async def fetch_parsed_async(client, cache: HTTPCache, source: str, url: str, parse, parser: str,
+                             params: dict = None, headers: dict = None, timeout: float = 10,
+                             revalidate: bool = False):
+    """
+    То же, что fetch_parsed, для httpx.AsyncClient
+    """
+    return (await fetch_parsed_status_async(client, cache, source, url, parse, parser,
+                                            params, headers, timeout, revalidate))[0]
+
+
+async def fetch_parsed_status_async(client, cache: HTTPCache, source: str, url: str, parse, parser: str,
+                                    params: dict = None, headers: dict = None, timeout: float = 10,
+                                    revalidate: bool = False) -> tuple:
+    """
+    То же, что fetch_parsed_status, для httpx.AsyncClient
+    """
+    url = cache_key(url, params)
+    if cache is None:
+        response = await client.get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return parse(response.content), "miss"
+
+    entry = cache.lookup(url)
+    try:
+        if entry and entry["fresh"] and not revalidate:
+            return cache.from_cache(source, url, entry, parse, parser), "hit"
+
+        request_headers = dict(headers or {}, **cache.conditional_headers(entry))
+        response = await client.get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            return cache.from_cache(source, url, entry, parse, parser, revalidated=True), "revalidated"
+    except BodyEvicted:
+        # Страница вытеснена между lookup и чтением - загружаем целиком
+        response = await client.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return cache.store(source, url, response.headers, response.content, parse, parser), "miss"
+
+
+# Singleton instance
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+def get_http_cache() -> HTTPCache:
+    """
+    Получить общий для процесса HTTP кэш (None, если кэш отключен в конфиге)
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                from config import Config
+                if not Config.HTTP_CACHE_PATH:
+                    return None
+                _cache_instance = HTTPCache(Config.HTTP_CACHE_PATH, Config.HTTP_CACHE_MAX_AGE,
+                                            Config.HTTP_CACHE_MAX_ENTRIES, Config.HTTP_CACHE_RETENTION)
+    return _cache_instance
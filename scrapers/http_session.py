@@ -0,0 +1,127 @@
+"""
+Общая для процесса HTTP сессия скраперов (requests.Session)
+
+Соединения с источниками держатся в пуле и переиспользуются (keep-alive):
+повторный запрос к тому же хосту не тратит время на TCP и TLS рукопожатие.
+Ответы 429 и 5xx, а также ошибки соединения повторяются с экспоненциальной
+задержкой (Config.MAX_RETRIES, Config.RETRY_DELAY), заголовок Retry-After
+учитывается.
+
+Повторы запросов к E-utilities (Config.NCBI_EUTILS_URL) тоже проходят через
+общий лимит NCBI (scrapers/rate_limiter.py): повтор на 429 не превышает лимит.
+"""
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimitedRetry(Retry):
+    """
+    Retry, который перед каждым повтором запроса берет токен у лимитера
+    """
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.rate_limiter = self.rate_limiter
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+
+def create_http_adapter(max_retries: int = 3, retry_delay: float = 2, pool_size: int = 10,
+                        rate_limiter=None) -> HTTPAdapter:
+    """
+    Адаптер с пулом соединений и повторами на 429/5xx
+
+    Args:
+        max_retries: число повторов запроса
+        retry_delay: базовая задержка повтора, сек (далее удваивается)
+        pool_size: соединений в пуле на один хост
+        rate_limiter: лимитер, через который проходит каждый повтор (None - без лимита)
+    """
+    retry = RateLimitedRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=retry_delay,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        rate_limiter=rate_limiter
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+
+def create_http_session(max_retries: int = 3, retry_delay: float = 2, pool_size: int = 10,
+                        user_agent: str = None) -> requests.Session:
+    """
+    Сессия с пулом соединений и повторами на 429/5xx
+
+    Args:
+        max_retries: число повторов запроса
+        retry_delay: базовая задержка повтора, сек (далее удваивается)
+        pool_size: соединений в пуле на один хост
+        user_agent: заголовок User-Agent по умолчанию
+    """
+    adapter = create_http_adapter(max_retries, retry_delay, pool_size)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    return session
+
+
+# Singleton instance
+_session_instance = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """
+    Получить общую HTTP сессию (настройки из Config)
+    """
+    global _session_instance
+    if _session_instance is None:
+        with _session_lock:
+            if _session_instance is None:
+                try:
+                    from config import Config
+                    _session_instance = create_http_session(
+                        max_retries=Config.MAX_RETRIES,
+                        retry_delay=Config.RETRY_DELAY,
+                        pool_size=Config.HTTP_POOL_SIZE,
+                        user_agent=Config.USER_AGENT
+                    )
+                    # Запросы к E-utilities: повторы через общий лимит NCBI
+                    from scrapers.rate_limiter import get_ncbi_rate_limiter
+                    _session_instance.mount(Config.NCBI_EUTILS_URL, create_http_adapter(
+                        max_retries=Config.MAX_RETRIES,
+                        retry_delay=Config.RETRY_DELAY,
+                        pool_size=Config.HTTP_POOL_SIZE,
+                        rate_limiter=get_ncbi_rate_limiter()
+                    ))
+                    logger.info(
+                        f"HTTP сессия: пул {Config.HTTP_POOL_SIZE} соединений, "
+                        f"повторов {Config.MAX_RETRIES}, задержка {Config.RETRY_DELAY} сек"
+                    )
+                except ImportError:
+                    _session_instance = create_http_session()
+    return _session_instance
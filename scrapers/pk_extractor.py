@@ -0,0 +1,311 @@
+"""
+Движок извлечения PK параметров из заголовков и абстрактов статей
+
+Шаблоны компилируются один раз при импорте. Текст статьи переводится
+в нижний регистр один раз, а шаблоны компилируются без re.IGNORECASE:
+с этим флагом sre не может использовать быстрый поиск по литеральному
+префиксу шаблона ("cv", "cmax", "auc", ...) и проверяет каждую позицию
+текста. Объединение всех шаблонов в одну альтернативу с именованными
+группами на CPython оказалось в несколько раз медленнее отдельных
+шаблонов с литеральным префиксом (см. benchmarks/bench_pk_extraction.py),
+поэтому каждое семейство проверяется своими шаблонами по приоритету,
+а семейства, уже найденные в предыдущих статьях, не проверяются вовсе.
+
+Перед regex работает дешевый фильтр по ключевым словам: семейство
+проверяется, только если в тексте есть хотя бы один из его терминов
+(см. TRIGGER_TERMS). Термины - подстроки, обязательные для любого шаблона
+семейства, поэтому фильтр не меняет результат. Для десятка терминов
+проверка "term in text" (поиск подстроки в C) не медленнее автомата
+Aho-Corasick, поэтому внешняя зависимость не нужна. Шаблоны с литеральным
+префиксом сами отбрасывают текст без него почти так же быстро, поэтому
+фильтр выигрывает только на семействах из нескольких шаблонов и только
+если термины редки: "intra" и "within" встречаются в абстрактах без PK
+("intravenous", "within 24 h"), а "cv" и "coefficient" - нет.
+"""
+import logging
+import re
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Шаблоны в порядке приоритета внутри семейства.
+# Группа 1 - значение, группа 2 (если есть) - единица измерения.
+PK_PATTERNS = {
+    # Извлечение CVintra (внутрисубъектная вариабельность)
+    "cvintra": [
+        r'cv\s*intra[-\s]?subject[:\s]+(\d+\.?\d*)\s*%',
+        r'intra[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
+        r'cv\s*intra[:\s]+(\d+\.?\d*)\s*%',
+        r'intra[-\s]?individual\s+cv[:\s]+(\d+\.?\d*)\s*%',
+        r'within[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
+        r'cv\s*intra[-\s]?subject\s*[=:]\s*(\d+\.?\d*)\s*%',
+        r'intra[-\s]?subject\s+coefficient\s+of\s+variation[:\s]+(\d+\.?\d*)\s*%',
+        r'cv\s*intra[:\s]*(\d+\.?\d*)\s*%',
+        r'cv\s*intra[-\s]?subject[:\s]*(\d+\.?\d*)',  # без % в конце
+        r'intra[-\s]?subject\s+cv[:\s]*(\d+\.?\d*)',  # без % в конце
+    ],
+    "cmax": [
+        r'cmax[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
+        r'maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
+        r'c\s*max[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
+        r'peak\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
+    ],
+    "auc": [
+        r'auc[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml|ng·h·ml[-1]|mg·h·l[-1])',
+        r'area\s+under\s+curve[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml)',
+        r'auc0[-\s]?t[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
+        r'auc0[-\s]?∞[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
+        r'auc\s*\(0[-\s]?t\)[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml)',
+    ],
+    "tmax": [
+        r'tmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+        r'time\s+to\s+cmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+        r'time\s+to\s+maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        r't\s*max[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+    ],
+    # Извлечение T1/2
+    "t_half": [
+        r't1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+        r't\s*1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        r'hal[fv][-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
+        r'elimination\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        r'terminal\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+        r'apparent\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
+    ],
+}
+
+PK_FAMILIES = tuple(PK_PATTERNS)
+
+# Семейства, для которых сохраняется единица измерения из текста
+UNIT_FAMILIES = ("cmax", "auc")
+
+# Разумный диапазон CVintra, %
+CV_RANGE = (5, 100)
+
+# Термины-триггеры: каждый шаблон семейства содержит хотя бы один из них
+TRIGGER_TERMS = {
+    "cvintra": ("cv", "coefficient"),
+    "cmax": ("max", "peak"),
+    "auc": ("auc", "area"),
+    "tmax": ("max",),
+    "t_half": ("1/2", "half", "halv"),
+}
+
+
+# Плоская таблица (термин, семейство): один проход без вложенных генераторов
+_TRIGGER_TABLE = tuple(
+    (term, family) for family, terms in TRIGGER_TERMS.items() for term in terms
+)
+
+
+class PrefilterStats:
+    """
+    Счетчики фильтра по ключевым словам
+
+    checked - сколько раз семейство нужно было искать в тексте,
+    skipped - сколько раз из них фильтр позволил не запускать regex.
+    Вызовы извлечения считают свои счетчики сами и добавляют их
+    одним merge() в конце, без блокировки на каждую статью.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.texts = 0
+            self.checked = {family: 0 for family in TRIGGER_TERMS}
+            self.skipped = {family: 0 for family in TRIGGER_TERMS}
+
+    def merge(self, texts: int, checked: dict, skipped: dict):
+        with self._lock:
+            self.texts += texts
+            for family, count in checked.items():
+                self.checked[family] += count
+            for family, count in skipped.items():
+                self.skipped[family] += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "families": {
+                    family: {
+                        "checked": self.checked[family],
+                        "skipped": self.skipped[family],
+                        "skip_rate": round(self.skipped[family] / self.checked[family], 3)
+                        if self.checked[family] else 0.0
+                    }
+                    for family in TRIGGER_TERMS
+                }
+            }
+
+
+prefilter_stats = PrefilterStats()
+
+
+def route_families(text: str) -> set:
+    """
+    Семейства шаблонов, чьи термины-триггеры встречаются в тексте
+
+    Args:
+        text: текст в нижнем регистре
+    """
+    return {family for term, family in _TRIGGER_TABLE if term in text}
+
+
+def get_prefilter_stats() -> dict:
+    """
+    Доля пропущенных фильтром проверок по семействам (с момента запуска)
+    """
+    return prefilter_stats.snapshot()
+
+
+def _compile(pattern: str):
+    # Без IGNORECASE "μ" больше не совпадает со знаком микро "µ" (U+00B5),
+    # который не меняется при lower() и часто встречается в абстрактах
+    return re.compile(pattern.replace("μ", "[μµ]"))
+
+
+COMPILED_PATTERNS = {
+    family: [_compile(pattern) for pattern in patterns]
+    for family, patterns in PK_PATTERNS.items()
+}
+
+
+def _search(family: str, text: str):
+    """
+    Первое совпадение шаблона с наивысшим приоритетом
+    """
+    for pattern in COMPILED_PATTERNS[family]:
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+
+def _search_cvintra(text: str) -> float:
+    """
+    Первый по приоритету шаблон, давший значение в разумном диапазоне
+    """
+    for pattern in COMPILED_PATTERNS["cvintra"]:
+        match = pattern.search(text)
+        if match:
+            value = float(match.group(1))
+            if CV_RANGE[0] <= value <= CV_RANGE[1]:
+                return value
+    return None
+
+
+def empty_pk_data() -> dict:
+    """
+    Пустая структура PK параметров (формат ответа get_drug_pk_data)
+    """
+    return {
+        "cmax": {"value": None, "unit": "ng/mL", "sources": []},
+        "auc": {"value": None, "unit": "ng·h/mL", "sources": []},
+        "tmax": {"value": None, "unit": "h", "sources": []},
+        "t_half": {"value": None, "unit": "h", "sources": []},
+        "cvintra": {"value": None, "unit": "%", "sources": []}
+    }
+
+
+class PKAccumulator:
+    """
+    Инкрементальное извлечение PK параметров
+
+    Статьи подаются по одной через add(), поэтому поток из тысяч статей
+    (глубокий поиск PubMed) обрабатывается без хранения их в памяти.
+    """
+
+    def __init__(self, prefilter: bool = True):
+        """
+        Args:
+            prefilter: пропускать семейства шаблонов без терминов-триггеров в тексте
+        """
+        self.prefilter = prefilter
+        self.pk_data = empty_pk_data()
+        self.articles_seen = 0
+        self._cv_sum = 0.0
+        self._cv_count = 0
+        # Счетчики фильтра этого вызова, добавляются в prefilter_stats в result()
+        self._texts = 0
+        self._checked = dict.fromkeys(TRIGGER_TERMS, 0)
+        self._skipped = dict.fromkeys(TRIGGER_TERMS, 0)
+
+    def add(self, article: dict):
+        """
+        Обработать одну статью (title, abstract, url)
+        """
+        pk_data = self.pk_data
+        self.articles_seen += 1
+        full_text = f"{article.get('title', '')} {article.get('abstract', '')}".lower()
+
+        # Параметры, уже найденные в предыдущих статьях, больше не ищем
+        needed = tuple(
+            family for family in PK_FAMILIES
+            if family == "cvintra" or not pk_data[family]["value"]
+        )
+        if self.prefilter:
+            routed = route_families(full_text)
+            self._texts += 1
+            for family in needed:
+                self._checked[family] += 1
+                if family not in routed:
+                    self._skipped[family] += 1
+        else:
+            routed = set(needed)
+
+        if "cvintra" in routed:
+            cv_value = _search_cvintra(full_text)
+            if cv_value is not None:
+                self._cv_sum += cv_value
+                self._cv_count += 1
+                pk_data["cvintra"]["sources"].append(article["url"])
+
+        for family in needed:
+            if family == "cvintra" or family not in routed:
+                continue
+
+            match = _search(family, full_text)
+            if match:
+                pk_data[family]["value"] = float(match.group(1))
+                if family in UNIT_FAMILIES:
+                    pk_data[family]["unit"] = match.group(2)
+                pk_data[family]["sources"].append(article["url"])
+
+    def result(self) -> dict:
+        """
+        Итоговые PK параметры (CVintra - среднее по всем найденным значениям)
+        """
+        if self._texts:
+            prefilter_stats.merge(self._texts, self._checked, self._skipped)
+            self._texts = 0
+            self._checked = dict.fromkeys(TRIGGER_TERMS, 0)
+            self._skipped = dict.fromkeys(TRIGGER_TERMS, 0)
+
+        # Вычисляем среднее CVintra если найдено несколько значений
+        if self._cv_count:
+            self.pk_data["cvintra"]["value"] = round(self._cv_sum / self._cv_count, 2)
+            logger.info(f"📊 Извлечено {self._cv_count} значений CVintra, среднее: {self.pk_data['cvintra']['value']}%")
+
+        return self.pk_data
+
+
+def extract_pk_parameters(articles: list, prefilter: bool = True) -> dict:
+    """
+    Извлечение PK параметров из абстрактов статей
+
+    CVintra усредняется по всем статьям, остальные параметры берутся из
+    первой статьи, где они найдены.
+
+    Args:
+        articles: статьи (title, abstract, url)
+        prefilter: пропускать семейства шаблонов без терминов-триггеров в тексте
+    """
+    accumulator = PKAccumulator(prefilter=prefilter)
+    for article in articles:
+        accumulator.add(article)
+    return accumulator.result()
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PubMedArticleCache:
+    """
+    Постоянный локальный кэш статей PubMed (SQLite), ключ - PMID
+
+    Хранит уже разобранный словарь статьи (title, abstract, authors, ...),
+    поэтому при повторных анализах efetch не нужен. Записи старше TTL
+    считаются устаревшими и загружаются заново.
+    """
+
+    def __init__(self, path: str, ttl: int = 30 * 24 * 3600):
+        """
+        Args:
+            path: путь к файлу SQLite
+            ttl: время жизни записи в секундах
+        """
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                pmid TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        logger.info(f"Кэш статей PubMed: {path} (TTL {ttl} сек)")
+
+    def get(self, pmid: str) -> dict:
+        """
+        Получить статью из кэша или None, если ее нет или запись устарела
+        """
+        return self.get_many([pmid]).get(str(pmid))
+
+    def get_many(self, pmids: list) -> dict:
+        """
+        Получить сразу несколько статей
+
+        Returns:
+            dict: {pmid: статья} только для найденных и свежих записей
+        """
+        pmids = [str(pmid) for pmid in pmids]
+        if not pmids:
+            return {}
+
+        min_fetched_at = time.time() - self.ttl
+        found = {}
+
+        with self._lock:
+            # SQLite ограничивает число параметров запроса, поэтому читаем пачками
+            for start in range(0, len(pmids), 500):
+                chunk = pmids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT pmid, record FROM articles WHERE pmid IN ({placeholders}) AND fetched_at >= ?",
+                    (*chunk, min_fetched_at)
+                ).fetchall()
+                for pmid, record in rows:
+                    found[pmid] = json.loads(record)
+
+            self.hits += len(found)
+            self.misses += len(set(pmids)) - len(found)
+
+        return found
+
+    def put(self, article: dict):
+        """
+        Сохранить статью в кэш
+        """
+        self.put_many([article])
+
+    def put_many(self, articles: list):
+        """
+        Сохранить несколько статей одной транзакцией
+        """
+        now = time.time()
+        rows = [
+            (str(article["pmid"]), json.dumps(article, ensure_ascii=False), now)
+            for article in articles
+            if article and article.get("pmid")
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (pmid, record, fetched_at) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Удалить устаревшие записи
+
+        Returns:
+            int: количество удаленных записей
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM articles WHERE fetched_at < ?",
+                (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        """
+        Счетчики попаданий/промахов и размер кэша
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": size,
+                "ttl": self.ttl
+            }
+
+
+# Singleton instance
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+def get_article_cache() -> PubMedArticleCache:
+    """
+    Получить общий для процесса кэш статей (None, если кэш отключен в конфиге)
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                from config import Config
+                if not Config.PUBMED_CACHE_PATH:
+                    return None
+                _cache_instance = PubMedArticleCache(Config.PUBMED_CACHE_PATH, Config.PUBMED_CACHE_TTL)
+    return _cache_instance
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Локальное зеркало PubMed (SQLite FTS5 по заголовку и абстракту)
+
+Строится из файлов ежегодного baseline и ежедневных update
+(https://ftp.ncbi.nlm.nih.gov/pubmed/baseline/, .../updatefiles/)
+потоковым разбором .xml.gz - память не зависит от размера файла.
+После загрузки запрос вида "{inn} AND (pharmacokinetics OR Cmax)"
+выполняется локально за миллисекунды, без обращения к NCBI.
+
+Загрузка файлов (из корня проекта):
+    python -m scrapers.pubmed_mirror --db data/pubmed_mirror.sqlite3 pubmed24n0001.xml.gz ...
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.pubmed_xml import LXML_AVAILABLE, PUBMED_URL, iter_pubmed_updates
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Лексемы запроса в синтаксисе PubMed: скобки, фразы в кавычках, слова
+_QUERY_TOKEN = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+# Теги полей PubMed ([tiab], [Title/Abstract], ...) - в зеркале поиск идет по title+abstract
+_FIELD_TAG = re.compile(r'\[[^\]]*\]$')
+# Вложенная разметка заголовков и абстрактов (<i>, <sub>, <mml:math>, ...) без атрибутов
+_MARKUP_TAG = re.compile(r'</?[A-Za-z{][\w:.{}/-]*>')
+
+_OPERATORS = ("AND", "OR", "NOT")
+
+
+def strip_markup(text: str) -> str:
+    """
+    Текст без вложенной разметки: "Cmax<sub>ss</sub>" -> "Cmaxss"
+    """
+    return _MARKUP_TAG.sub("", text)
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Перевод запроса PubMed в синтаксис FTS5
+
+    AND/OR/NOT и скобки совпадают, каждое слово и фраза берутся в кавычки,
+    чтобы дефисы, точки и слэши не трактовались как операторы FTS5. Соседние
+    слова и группы соединяются явным AND (как в PubMed). Операторы без
+    операнда слева или справа ("NOT foo", "foo AND", "(OR foo)"), пустые и
+    непарные скобки отбрасываются - FTS5 считает их синтаксической ошибкой.
+
+    Returns:
+        str: запрос FTS5 (пустая строка, если искать нечего)
+    """
+    parts = []
+    depth = 0
+
+    def follows_operand():
+        return bool(parts) and (parts[-1] == ")" or parts[-1].startswith('"'))
+
+    def close_group():
+        while parts and parts[-1] in _OPERATORS:
+            parts.pop()
+        if parts and parts[-1] == "(":
+            parts.pop()
+        else:
+            parts.append(")")
+
+    for token in _QUERY_TOKEN.findall(query):
+        if token == "(":
+            if follows_operand():
+                parts.append("AND")
+            parts.append("(")
+            depth += 1
+        elif token == ")":
+            if depth:
+                close_group()
+                depth -= 1
+        elif token.upper() in _OPERATORS:
+            if follows_operand():
+                parts.append(token.upper())
+        else:
+            term = _FIELD_TAG.sub("", token.strip('"')).strip()
+            if term:
+                if follows_operand():
+                    parts.append("AND")
+                parts.append('"' + term.replace('"', '""') + '"')
+
+    for _ in range(depth):
+        close_group()
+    while parts and parts[-1] in _OPERATORS:
+        parts.pop()
+    return " ".join(parts)
+
+
+class PubMedMirror:
+    """
+    Локальное хранилище статей PubMed с полнотекстовым индексом
+    """
+
+    def __init__(self, path: str, base_url: str = PUBMED_URL):
+        self.path = path
+        self.base_url = base_url
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                pmid INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                year TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                name TEXT PRIMARY KEY,
+                articles INTEGER NOT NULL,
+                deleted INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            """
+        )
+        self._create_index()
+        self._conn.commit()
+
+    def _create_index(self):
+        """
+        Индекс FTS5 без собственного содержимого (content='')
+
+        В articles хранится текст как его отдает разбор XML (с вложенной
+        разметкой, как у Entrez.read), а в индекс попадает текст без
+        разметки, поэтому индекс не может ссылаться на articles как на
+        внешнее содержимое. Индекс прежнего формата (content='articles'
+        с триггерами) перестраивается из articles один раз.
+        """
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'articles_fts'"
+        ).fetchone()
+        if row and "content=''" in row[0]:
+            return
+        self._conn.executescript(
+            """
+            DROP TRIGGER IF EXISTS articles_ai;
+            DROP TRIGGER IF EXISTS articles_ad;
+            DROP TABLE IF EXISTS articles_fts;
+            CREATE VIRTUAL TABLE articles_fts USING fts5(
+                title, abstract,
+                content='',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        rows = self._conn.execute("SELECT pmid, title, abstract FROM articles")
+        self._conn.executemany(
+            "INSERT INTO articles_fts(rowid, title, abstract) VALUES (?, ?, ?)",
+            ((pmid, strip_markup(title), strip_markup(abstract)) for pmid, title, abstract in rows)
+        )
+
+    def _unindex(self, pmids: list) -> int:
+        """
+        Удалить статьи из articles и из индекса (вызывать под self._lock)
+
+        Индекс без содержимого удаляет запись только по тем же значениям,
+        что были проиндексированы, поэтому они вычисляются из articles.
+
+        Returns:
+            int: сколько статей было удалено
+        """
+        removed = 0
+        for start in range(0, len(pmids), 500):
+            chunk = pmids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT pmid, title, abstract FROM articles WHERE pmid IN ({placeholders})",
+                chunk
+            ).fetchall()
+            self._conn.executemany(
+                "INSERT INTO articles_fts(articles_fts, rowid, title, abstract) VALUES ('delete', ?, ?, ?)",
+                [(pmid, strip_markup(title), strip_markup(abstract)) for pmid, title, abstract in rows]
+            )
+            self._conn.execute(f"DELETE FROM articles WHERE pmid IN ({placeholders})", chunk)
+            removed += len(rows)
+        return removed
+
+    def is_ingested(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM ingested_files WHERE name = ?", (name,)).fetchone()
+            return row is not None
+
+    def ingest_file(self, path: str, batch_size: int = 2000) -> dict:
+        """
+        Загрузить файл baseline/update (.xml или .xml.gz)
+
+        Статьи пишутся пачками по batch_size в одной транзакции; повторно
+        присланные PMID заменяются, DeleteCitation удаляет записи.
+
+        Returns:
+            dict: {"articles": загружено, "deleted": удалено}
+        """
+        if not LXML_AVAILABLE:
+            raise RuntimeError("Для загрузки зеркала нужен lxml: pip install lxml")
+
+        opener = gzip.open if path.endswith(".gz") else open
+        articles, deleted = 0, 0
+        batch = []
+
+        with opener(path, "rb") as source:
+            for kind, payload in iter_pubmed_updates(source, self.base_url):
+                if kind == "delete":
+                    self._write(batch)
+                    articles += len(batch)
+                    batch = []
+                    deleted += self._delete(payload)
+                    continue
+
+                if payload.get("pmid"):
+                    batch.append(payload)
+                if len(batch) >= batch_size:
+                    self._write(batch)
+                    articles += len(batch)
+                    batch = []
+
+        self._write(batch)
+        articles += len(batch)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (name, articles, deleted, ingested_at) VALUES (?, ?, ?, ?)",
+                (os.path.basename(path), articles, deleted, time.time())
+            )
+            self._conn.commit()
+
+        logger.info(f"📥 {os.path.basename(path)}: {articles} статей, удалено {deleted}")
+        return {"articles": articles, "deleted": deleted}
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        # PMID, присланный в пачке дважды, берется из последней записи
+        rows = list({
+            int(a["pmid"]): (int(a["pmid"]), a["title"], a["abstract"],
+                             json.dumps(a["authors"], ensure_ascii=False), a["year"])
+            for a in batch
+        }.values())
+        with self._lock:
+            # Повторно присланные PMID сначала удаляются из индекса
+            self._unindex([row[0] for row in rows])
+            self._conn.executemany(
+                "INSERT INTO articles (pmid, title, abstract, authors, year) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            # Разметка не индексируется: "<i>metformin</i>" ищется как "metformin"
+            self._conn.executemany(
+                "INSERT INTO articles_fts(rowid, title, abstract) VALUES (?, ?, ?)",
+                [(row[0], strip_markup(row[1]), strip_markup(row[2])) for row in rows]
+            )
+            self._conn.commit()
+
+    def _delete(self, pmids: list) -> int:
+        with self._lock:
+            removed = self._unindex([int(pmid) for pmid in pmids])
+            self._conn.commit()
+            return removed
+
+    def search(self, query: str, retmax: int = 20) -> dict:
+        """
+        Полнотекстовый поиск, аналог esearch
+
+        Returns:
+            dict: {"count": всего найдено, "pmids": первые retmax PMID по релевантности (bm25)}
+        """
+        fts_query = to_fts_query(query)
+        if not fts_query:
+            return {"count": 0, "pmids": []}
+        with self._lock:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH ?",
+                (fts_query,)
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT rowid FROM articles_fts WHERE articles_fts MATCH ? ORDER BY rank LIMIT ?",
+                (fts_query, retmax)
+            ).fetchall()
+        return {"count": count, "pmids": [str(row[0]) for row in rows]}
+
+    def get_articles(self, pmids: list) -> dict:
+        """
+        Статьи по списку PMID
+
+        Returns:
+            dict: {pmid: статья} для найденных в зеркале
+        """
+        found = {}
+        numeric = [int(pmid) for pmid in pmids if str(pmid).isdigit()]
+        with self._lock:
+            for start in range(0, len(numeric), 500):
+                chunk = numeric[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT pmid, title, abstract, authors, year FROM articles WHERE pmid IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for pmid, title, abstract, authors, year in rows:
+                    found[str(pmid)] = {
+                        "pmid": str(pmid),
+                        "title": title,
+                        "abstract": abstract,
+                        "authors": json.loads(authors),
+                        "year": year,
+                        "url": f"{self.base_url}/{pmid}"
+                    }
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "articles": self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0],
+                "files": self._conn.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0]
+            }
+
+
+# Singleton instance
+_mirror_instance = None
+_mirror_lock = threading.Lock()
+
+def get_pubmed_mirror() -> PubMedMirror:
+    """
+    Получить локальное зеркало PubMed (None, если зеркало не настроено или не создано)
+    """
+    global _mirror_instance
+    if _mirror_instance is None:
+        with _mirror_lock:
+            if _mirror_instance is None:
+                from config import Config
+                if not Config.PUBMED_MIRROR_PATH or not os.path.exists(Config.PUBMED_MIRROR_PATH):
+                    return None
+                _mirror_instance = PubMedMirror(Config.PUBMED_MIRROR_PATH)
+                logger.info(f"📚 Локальное зеркало PubMed: {Config.PUBMED_MIRROR_PATH}")
+    return _mirror_instance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Загрузка файлов PubMed baseline/update в локальное зеркало")
+    parser.add_argument("files", nargs="+", help="файлы .xml.gz или каталоги с ними")
+    parser.add_argument("--db", default=None, help="путь к базе (по умолчанию PUBMED_MIRROR_PATH)")
+    parser.add_argument("--force", action="store_true", help="загрузить повторно уже загруженные файлы")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        from config import Config
+        db_path = Config.PUBMED_MIRROR_PATH or "data/pubmed_mirror.sqlite3"
+
+    paths = []
+    for item in args.files:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.xml.gz"))))
+        else:
+            paths.append(item)
+
+    mirror = PubMedMirror(db_path)
+    started = time.time()
+    for path in paths:
+        if not args.force and mirror.is_ingested(os.path.basename(path)):
+            logger.info(f"⏭️ {os.path.basename(path)} уже загружен")
+            continue
+        mirror.ingest_file(path)
+
+    stats = mirror.stats()
+    logger.info(f"✅ Готово за {time.time() - started:.0f} сек: {stats['articles']} статей из {stats['files']} файлов")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
 import requests
 from bs4 import BeautifulSoup
-import time
+import io
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from scrapers.http_session import get_http_session
+from scrapers.pk_extractor import PKAccumulator, extract_pk_parameters
+from scrapers.pubmed_cache import get_article_cache
+from scrapers.pubmed_mirror import get_pubmed_mirror
+from scrapers.pubmed_triage import rank_summaries
+from scrapers.pubmed_xml import LXML_AVAILABLE, iter_pubmed_articles
+from scrapers.rate_limiter import get_ncbi_rate_limiter
 
 try:
     from Bio import Entrez
@@ -15,6 +24,23 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Объединение нескольких ранжированных списков (Reciprocal Rank Fusion)
+    
+    Каждый элемент получает сумму 1 / (k + позиция) по всем спискам, где он
+    встречается, дубли схлопываются. При равенстве выше тот, кто встретился раньше.
+    
+    Returns:
+        list: элементы по убыванию суммарного веса
+    """
+    scores = {}
+    for ranking in rankings:
+        for position, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + position)
+    return sorted(scores, key=lambda item: -scores[item])
+
+
 class PubMedScraper:
     def __init__(self, email: str = None, api_key: str = None):
         """
@@ -33,10 +59,28 @@ class PubMedScraper:
             from config import Config
             self.email = email or Config.NCBI_EMAIL
             self.api_key = api_key or Config.NCBI_API_KEY
+            self.fetch_limit = Config.PUBMED_FETCH_LIMIT
+            self.batch_size = Config.PUBMED_EFETCH_BATCH_SIZE
+            self.deep_max_articles = Config.PUBMED_DEEP_MAX_ARTICLES
+            self.fanout = Config.PUBMED_FANOUT
+            self.triage = Config.PUBMED_TRIAGE
+            self.triage_candidates = Config.PUBMED_TRIAGE_CANDIDATES
+            self.fanout_queries = Config.PUBMED_FANOUT_QUERIES
+            self.eutils_url = Config.NCBI_EUTILS_URL
+            self.timeout = Config.REQUEST_TIMEOUT
         except ImportError:
             # Если конфиг недоступен, используем значения по умолчанию
             self.email = email or os.getenv("NCBI_EMAIL", "your.email@example.com")
             self.api_key = api_key or os.getenv("NCBI_API_KEY", "")
+            self.fetch_limit = int(os.getenv("PUBMED_FETCH_LIMIT", 10))
+            self.batch_size = int(os.getenv("PUBMED_EFETCH_BATCH_SIZE", 200))
+            self.deep_max_articles = int(os.getenv("PUBMED_DEEP_MAX_ARTICLES", 2000))
+            self.fanout = False
+            self.triage = False
+            self.triage_candidates = 100
+            self.fanout_queries = ["{inn} AND (pharmacokinetics OR bioequivalence OR Cmax OR AUC)"]
+            self.eutils_url = os.getenv("NCBI_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+            self.timeout = 30
         
         # Устанавливаем email и API ключ для Entrez
         Entrez.email = self.email
@@ -47,22 +91,92 @@ class PubMedScraper:
             logger.warning("⚠️ PubMed API ключ не установлен. Лимит запросов: 3 запроса/сек")
         
         self.base_url = "https://pubmed.ncbi.nlm.nih.gov"
+        
+        # Общая HTTP сессия скраперов (пул соединений, повторы на 429/5xx)
+        self.session = get_http_session()
+        
+        # Общий для процесса лимитер: все запросы к E-utilities идут через него
+        self.rate_limiter = get_ncbi_rate_limiter(self.api_key)
+        
+        # Локальный кэш разобранных статей (None если отключен)
+        try:
+            self.cache = get_article_cache()
+        except Exception as e:
+            logger.warning(f"⚠️ Кэш статей PubMed недоступен: {e}")
+            self.cache = None
+        
+        # Локальное зеркало PubMed: если настроено, поиск и статьи берутся из него
+        try:
+            self.mirror = get_pubmed_mirror()
+        except Exception as e:
+            logger.warning(f"⚠️ Локальное зеркало PubMed недоступно: {e}")
+            self.mirror = None
+    
+    def _eutils_request(self, endpoint: str, params: dict) -> tuple:
+        """
+        Метод, URL и параметры запроса к E-utilities (esearch, efetch, esummary)
+        
+        Длинные списки PMID уходят POST-запросом, как в Bio.Entrez.
+        """
+        params = dict(params, tool="biopython", email=self.email)
+        if self.api_key:
+            params["api_key"] = self.api_key
+        method = "POST" if str(params.get("id", "")).count(",") >= 200 else "GET"
+        return method, f"{self.eutils_url}/{endpoint}.fcgi", params
     
-    def search_drug(self, inn: str, keywords: list = None) -> list:
+    def _eutils(self, endpoint: str, **params):
+        """
+        Запрос к E-utilities через общую HTTP сессию с учетом общего лимита запросов
+        
+        Returns:
+            бинарный file-like объект с телом ответа (для Entrez.read и потокового парсера)
+        """
+        method, url, params = self._eutils_request(endpoint, params)
+        self.rate_limiter.acquire()
+        if method == "POST":
+            response = self.session.post(url, data=params, timeout=self.timeout)
+        else:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return io.BytesIO(response.content)
+    
+    def _build_query(self, inn: str, keywords: list = None) -> str:
+        if keywords is None:
+            keywords = ["pharmacokinetics", "bioequivalence", "Cmax", "AUC"]
+        
+        return f"{inn} AND ({' OR '.join(keywords)})"
+    
+    def _esearch(self, query: str, retmax: int) -> dict:
+        """
+        Запрос esearch с сохранением результата на history сервере NCBI
+        """
+        handle = self._eutils("esearch", **self._esearch_params(query, retmax))
+        record = Entrez.read(handle)
+        handle.close()
+        return record
+    
+    def _esearch_params(self, query: str, retmax: int) -> dict:
+        return {
+            "db": "pubmed",
+            "term": query,
+            "retmax": retmax,
+            "sort": "relevance",
+            "usehistory": "y"  # Используем history для более эффективных запросов
+        }
+    
+    def search_drug(self, inn: str, keywords: list = None, retmax: int = 20) -> list:
         """
         Поиск статей о препарате в PubMed
         
         Args:
             inn: International Nonproprietary Name препарата
             keywords: дополнительные ключевые слова (pharmacokinetics, bioequivalence, etc.)
+            retmax: максимум PMID в ответе
         
         Returns:
             list: список PMID статей
         """
-        if keywords is None:
-            keywords = ["pharmacokinetics", "bioequivalence", "Cmax", "AUC"]
-        
-        query = f"{inn} AND ({' OR '.join(keywords)})"
+        query = self._build_query(inn, keywords)
         
         if not BIO_AVAILABLE:
             logger.warning("Bio.Entrez не доступен. Установите biopython для работы с PubMed API.")
@@ -70,29 +184,182 @@ class PubMedScraper:
         
         try:
             logger.info(f"Поиск в PubMed: {query}")
+            return self._search_query(query, retmax=retmax)
             
-            # Используем API ключ если доступен (увеличивает лимит запросов)
-            search_params = {
-                "db": "pubmed",
-                "term": query,
-                "retmax": 20,  # максимум 20 статей
-                "sort": "relevance",
-                "usehistory": "y"  # Используем history для более эффективных запросов
-            }
+        except Exception as e:
+            logger.error(f"Ошибка поиска в PubMed: {e}")
+            return []
+    
+    def _search_query(self, query: str, retmax: int) -> list:
+        """
+        PMID по запросу: из локального зеркала, если оно есть, иначе через esearch
+        """
+        if self.mirror:
+            return self._search_mirror(query, retmax)
+        
+        return self._pmids_from_record(self._esearch(query, retmax=retmax))
+    
+    def _search_mirror(self, query: str, retmax: int) -> list:
+        result = self.mirror.search(query, retmax=retmax)
+        pmids, total_found = result["pmids"], result["count"]
+        logger.info(f"Найдено {len(pmids)} статей в локальном зеркале (всего найдено: {total_found})")
+        return pmids
+    
+    def _pmids_from_record(self, record) -> list:
+        pmids = record["IdList"]
+        total_found = record.get("Count", len(pmids))
+        logger.info(f"Найдено {len(pmids)} статей (всего найдено: {total_found})")
+        
+        return pmids
+    
+    def search_drug_fanout(self, inn: str, queries: list = None, retmax: int = 20) -> list:
+        """
+        Параллельный поиск несколькими целевыми запросами
+        
+        Запросы выполняются одновременно (общий лимитер NCBI не дает превысить
+        лимит), списки PMID объединяются без дублей через reciprocal rank fusion.
+        
+        Args:
+            inn: МНН препарата
+            queries: шаблоны запросов с {inn} (по умолчанию из конфига)
+            retmax: PMID на каждый запрос
+        
+        Returns:
+            list: PMID, отсортированные по объединенному рангу
+        """
+        if not BIO_AVAILABLE:
+            logger.warning("Bio.Entrez не доступен. Установите biopython для работы с PubMed API.")
+            return []
+        
+        queries = [template.format(inn=inn) for template in (queries or self.fanout_queries)]
+        logger.info(f"Параллельный поиск в PubMed: {len(queries)} запросов")
+        
+        def run(query):
+            try:
+                return self._search_query(query, retmax=retmax)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Запрос '{query}' не выполнен: {str(e)[:60]}")
+                return []
+        
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            rankings = list(executor.map(run, queries))
+        
+        pmids = reciprocal_rank_fusion(rankings)
+        logger.info(f"Объединено {len(pmids)} уникальных PMID из {sum(len(r) for r in rankings)}")
+        return pmids
+    
+    def search_history(self, inn: str, keywords: list = None) -> dict:
+        """
+        Поиск без загрузки списка PMID: результат остается на history сервере NCBI
+        
+        Returns:
+            dict: {"count": всего найдено, "webenv": ..., "query_key": ...}
+        """
+        query = self._build_query(inn, keywords)
+        logger.info(f"Глубокий поиск в PubMed: {query}")
+        
+        record = self._esearch(query, retmax=0)
+        
+        return {
+            "count": int(record.get("Count", 0)),
+            "webenv": record["WebEnv"],
+            "query_key": record["QueryKey"]
+        }
+    
+    def iter_history_articles(self, webenv: str, query_key: str, total: int):
+        """
+        Постраничная загрузка статей с history сервера пачками по batch_size
+        
+        Генератор: в памяти одновременно находится не больше одной пачки.
+        
+        Args:
+            webenv, query_key: результат search_history
+            total: сколько статей загрузить
+        
+        Yields:
+            dict: статья в формате fetch_article_details
+        """
+        for retstart in range(0, total, self.batch_size):
+            retmax = min(self.batch_size, total - retstart)
+            try:
+                handle = self._eutils(
+                    "efetch",
+                    db="pubmed",
+                    query_key=query_key,
+                    WebEnv=webenv,
+                    retstart=retstart,
+                    retmax=retmax,
+                    rettype="abstract",
+                    retmode="xml"
+                )
+                articles = self._read_articles(handle)
+                handle.close()
+            except Exception as e:
+                logger.error(f"Ошибка загрузки статей {retstart}-{retstart + retmax}: {e}")
+                continue
             
-            handle = Entrez.esearch(**search_params)
-            record = Entrez.read(handle)
-            handle.close()
+            logger.info(f"  Загружено {retstart + len(articles)}/{total} статей")
+            if self.cache:
+                self.cache.put_many(articles)
             
-            pmids = record["IdList"]
-            total_found = record.get("Count", len(pmids))
-            logger.info(f"Найдено {len(pmids)} статей (всего найдено: {total_found})")
+            yield from articles
+    
+    def fetch_summaries(self, pmids: list) -> list:
+        """
+        Облегченные записи esummary (заголовок, тип публикации, год) без абстрактов
+        
+        Returns:
+            list: [{"pmid", "title", "pub_types", "year", "has_abstract"}, ...]
+        """
+        summaries = []
+        for start in range(0, len(pmids), self.batch_size):
+            chunk = pmids[start:start + self.batch_size]
+            try:
+                handle = self._eutils("esummary", db="pubmed", id=",".join(chunk))
+                records = Entrez.read(handle)
+                handle.close()
+            except Exception as e:
+                logger.error(f"Ошибка загрузки esummary ({len(chunk)} PMID): {e}")
+                continue
             
+            summaries.extend(self._parse_summaries(records))
+        return summaries
+    
+    def _parse_summaries(self, records) -> list:
+        """
+        Записи DocSum (результат Entrez.read ответа esummary) в словари
+        """
+        return [
+            {
+                "pmid": str(record["Id"]),
+                "title": str(record.get("Title", "")),
+                "pub_types": [str(pub_type) for pub_type in record.get("PubTypeList", [])],
+                "year": str(record.get("PubDate", ""))[:4],
+                "has_abstract": bool(int(record.get("HasAbstract", 1)))
+            }
+            for record in records
+        ]
+    
+    def triage_pmids(self, pmids: list) -> list:
+        """
+        Ранжирование кандидатов по записям esummary (см. scrapers/pubmed_triage.py)
+        
+        Returns:
+            list: PMID по убыванию оценки, затем PMID без записи esummary
+                  в исходном порядке; если esummary не удался - исходный список
+        """
+        return self._rank_triaged(pmids, self.fetch_summaries(pmids))
+    
+    def _rank_triaged(self, pmids: list, summaries: list) -> list:
+        if not summaries:
             return pmids
-            
-        except Exception as e:
-            logger.error(f"Ошибка поиска в PubMed: {e}")
-            return []
+        
+        ranked = rank_summaries(summaries)
+        # PMID без записи esummary (пачка не загрузилась, запись не вернулась) - после оцененных
+        scored = set(ranked)
+        ranked += [pmid for pmid in pmids if pmid not in scored]
+        logger.info(f"Отбор по esummary: {len(summaries)} кандидатов, лучшие: {ranked[:self.fetch_limit]}")
+        return ranked
     
     def fetch_article_details(self, pmid: str) -> dict:
         """
@@ -101,184 +368,166 @@ class PubMedScraper:
         if not BIO_AVAILABLE:
             return {}
         
+        local = self._lookup_local([pmid])
+        if local:
+            return local[str(pmid)]
+        
         try:
-            handle = Entrez.efetch(
+            handle = self._eutils(
+                "efetch",
                 db="pubmed",
                 id=pmid,
                 rettype="abstract",
                 retmode="xml"
             )
             
-            record = Entrez.read(handle)
+            articles = self._read_articles(handle)
             handle.close()
             
-            article = record['PubmedArticle'][0]
-            medline = article['MedlineCitation']
-            
-            title = medline['Article']['ArticleTitle']
-            abstract = ""
-            
-            if 'Abstract' in medline['Article']:
-                abstract_texts = medline['Article']['Abstract']['AbstractText']
-                abstract = ' '.join([str(text) for text in abstract_texts])
-            
-            authors = []
-            if 'AuthorList' in medline['Article']:
-                for author in medline['Article']['AuthorList']:
-                    if 'LastName' in author and 'Initials' in author:
-                        authors.append(f"{author['LastName']} {author['Initials']}")
-            
-            year = ""
-            if 'PubDate' in medline['Article']['Journal']['JournalIssue']:
-                pub_date = medline['Article']['Journal']['JournalIssue']['PubDate']
-                year = pub_date.get('Year', '')
-            
-            return {
-                "pmid": pmid,
-                "title": title,
-                "abstract": abstract,
-                "authors": authors,
-                "year": year,
-                "url": f"{self.base_url}/{pmid}"
-            }
+            article = articles[0]
+            if self.cache:
+                self.cache.put(article)
+            return article
             
         except Exception as e:
             logger.error(f"Ошибка получения статьи {pmid}: {e}")
             return {}
     
-    def extract_pk_parameters(self, articles: list) -> dict:
-        """
-        Извлечение PK параметров из абстрактов статей
-        Использует regex для базового извлечения
+    def fetch_articles_batch(self, pmids: list) -> list:
         """
-        import re
+        Получить детали нескольких статей пакетными запросами efetch
         
-        pk_data = {
-            "cmax": {"value": None, "unit": "ng/mL", "sources": []},
-            "auc": {"value": None, "unit": "ng·h/mL", "sources": []},
-            "tmax": {"value": None, "unit": "h", "sources": []},
-            "t_half": {"value": None, "unit": "h", "sources": []},
-            "cvintra": {"value": None, "unit": "%", "sources": []}
-        }
+        Вместо одного HTTP запроса на каждый PMID отправляет PMID пачками
+        (до batch_size штук через запятую) и разбирает XML со множеством статей.
+        Статьи, которые уже есть в локальном кэше, не запрашиваются.
         
-        cvintra_values = []
+        Args:
+            pmids: список PMID
         
-        for article in articles:
-            abstract = article.get("abstract", "").lower()
-            title = article.get("title", "").lower()
-            full_text = f"{title} {abstract}"
-            
-            # Извлечение CVintra (внутрисубъектная вариабельность)
-            # Улучшенные паттерны для более точного извлечения
-            cv_patterns = [
-                r'cv\s*intra[-\s]?subject[:\s]+(\d+\.?\d*)\s*%',
-                r'intra[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
-                r'cv\s*intra[:\s]+(\d+\.?\d*)\s*%',
-                r'intra[-\s]?individual\s+cv[:\s]+(\d+\.?\d*)\s*%',
-                r'within[-\s]?subject\s+cv[:\s]+(\d+\.?\d*)\s*%',
-                r'cv\s*intra[-\s]?subject\s*[=:]\s*(\d+\.?\d*)\s*%',
-                r'intra[-\s]?subject\s+coefficient\s+of\s+variation[:\s]+(\d+\.?\d*)\s*%',
-                r'cv\s*intra[:\s]*(\d+\.?\d*)\s*%',
-                r'cv\s*intra[-\s]?subject[:\s]*(\d+\.?\d*)',  # без % в конце
-                r'intra[-\s]?subject\s+cv[:\s]*(\d+\.?\d*)',  # без % в конце
-            ]
-            
-            for pattern in cv_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE)
-                if match:
-                    try:
-                        cv_value = float(match.group(1))
-                        if 5 <= cv_value <= 100:  # Разумный диапазон
-                            cvintra_values.append(cv_value)
-                            pk_data["cvintra"]["sources"].append(article["url"])
-                            break
-                    except ValueError:
-                        continue
-            
-            # Извлечение Cmax
-            cmax_patterns = [
-                r'cmax[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
-                r'maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml|ng·ml[-1]|mg·l[-1])',
-                r'c\s*max[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
-                r'peak\s+concentration[:\s]*(\d+\.?\d*)\s*(ng/ml|mg/l|μg/ml|mcg/ml)',
-            ]
-            for pattern in cmax_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE)
-                if match and not pk_data["cmax"]["value"]:
-                    try:
-                        pk_data["cmax"]["value"] = float(match.group(1))
-                        pk_data["cmax"]["unit"] = match.group(2)
-                        pk_data["cmax"]["sources"].append(article["url"])
-                        break
-                    except (ValueError, IndexError):
-                        continue
-            
-            # Извлечение AUC
-            auc_patterns = [
-                r'auc[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml|ng·h·ml[-1]|mg·h·l[-1])',
-                r'area\s+under\s+curve[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l|μg·h/ml|mcg·h/ml)',
-                r'auc0[-\s]?t[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
-                r'auc0[-\s]?∞[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml|mg·h/l)',
-                r'auc\s*\(0[-\s]?t\)[:\s]*(\d+\.?\d*)\s*(ng·h/ml|ng\s*h/ml)',
-            ]
-            for pattern in auc_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE)
-                if match and not pk_data["auc"]["value"]:
-                    try:
-                        pk_data["auc"]["value"] = float(match.group(1))
-                        pk_data["auc"]["unit"] = match.group(2)
-                        pk_data["auc"]["sources"].append(article["url"])
-                        break
-                    except (ValueError, IndexError):
-                        continue
+        Returns:
+            list: статьи в порядке исходного списка PMID (ненайденные пропускаются)
+        """
+        if not BIO_AVAILABLE or not pmids:
+            return []
+        
+        by_pmid = self._lookup_local(pmids)
+        missing = [pmid for pmid in pmids if pmid not in by_pmid]
+        if by_pmid:
+            logger.info(f"Из зеркала/кэша: {len(by_pmid)} статей, загружаю: {len(missing)}")
+        
+        for start in range(0, len(missing), self.batch_size):
+            chunk = missing[start:start + self.batch_size]
+            try:
+                handle = self._eutils(
+                    "efetch",
+                    db="pubmed",
+                    id=",".join(chunk),
+                    rettype="abstract",
+                    retmode="xml"
+                )
+                fetched = self._read_articles(handle)
+                handle.close()
+            except Exception as e:
+                logger.error(f"Ошибка пакетной загрузки статей ({len(chunk)} PMID): {e}")
+                continue
             
-            # Извлечение Tmax
-            tmax_patterns = [
-                r'tmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
-                r'time\s+to\s+cmax[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
-                r'time\s+to\s+maximum\s+concentration[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-                r't\s*max[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-            ]
-            for pattern in tmax_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE)
-                if match and not pk_data["tmax"]["value"]:
-                    try:
-                        pk_data["tmax"]["value"] = float(match.group(1))
-                        pk_data["tmax"]["sources"].append(article["url"])
-                        break
-                    except (ValueError, IndexError):
-                        continue
+            for article in fetched:
+                by_pmid[article["pmid"]] = article
             
-            # Извлечение T1/2
-            t_half_patterns = [
-                r't1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
-                r't\s*1/2[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-                r'hal[fv][-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr|hour)',
-                r'elimination\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-                r'terminal\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-                r'apparent\s+half[-\s]?life[:\s]*(\d+\.?\d*)\s*(h|hours|hr)',
-            ]
-            for pattern in t_half_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE)
-                if match and not pk_data["t_half"]["value"]:
-                    try:
-                        pk_data["t_half"]["value"] = float(match.group(1))
-                        pk_data["t_half"]["sources"].append(article["url"])
-                        break
-                    except (ValueError, IndexError):
-                        continue
-        
-        # Вычисляем среднее CVintra если найдено несколько значений
-        if cvintra_values:
-            pk_data["cvintra"]["value"] = round(sum(cvintra_values) / len(cvintra_values), 2)
-            logger.info(f"📊 Извлечено {len(cvintra_values)} значений CVintra, среднее: {pk_data['cvintra']['value']}%")
-        
-        return pk_data
+            if self.cache:
+                self.cache.put_many(fetched)
+        
+        return [by_pmid[pmid] for pmid in pmids if pmid in by_pmid]
+    
+    def _lookup_local(self, pmids: list) -> dict:
+        """
+        Статьи из локального зеркала и кэша (без обращения к NCBI)
+        
+        Returns:
+            dict: {pmid: статья}
+        """
+        found = self.mirror.get_articles(pmids) if self.mirror else {}
+        missing = [pmid for pmid in pmids if pmid not in found]
+        if self.cache and missing:
+            found.update(self.cache.get_many(missing))
+        return found
     
-    def get_drug_pk_data(self, inn: str) -> dict:
+    def _read_articles(self, handle) -> list:
+        """
+        Разбор ответа efetch в список статей
+        
+        С lxml используется потоковый парсер (scrapers/pubmed_xml.py),
+        без него - Entrez.read с построением полного дерева.
+        """
+        if LXML_AVAILABLE:
+            return list(iter_pubmed_articles(handle, self.base_url))
+        
+        record = Entrez.read(handle)
+        articles = []
+        for pubmed_article in record.get('PubmedArticle', []):
+            try:
+                articles.append(self._parse_article(pubmed_article))
+            except Exception as e:
+                logger.warning(f"Не удалось разобрать статью: {str(e)[:50]}")
+        return articles
+    
+    def _parse_article(self, article) -> dict:
+        """
+        Преобразует запись PubmedArticle (результат Entrez.read) в словарь статьи
+        """
+        medline = article['MedlineCitation']
+        pmid = str(medline['PMID'])
+        
+        title = medline['Article']['ArticleTitle']
+        abstract = ""
+        
+        if 'Abstract' in medline['Article']:
+            abstract_texts = medline['Article']['Abstract']['AbstractText']
+            abstract = ' '.join([str(text) for text in abstract_texts])
+        
+        authors = []
+        if 'AuthorList' in medline['Article']:
+            for author in medline['Article']['AuthorList']:
+                if 'LastName' in author and 'Initials' in author:
+                    authors.append(f"{author['LastName']} {author['Initials']}")
+        
+        year = ""
+        if 'PubDate' in medline['Article']['Journal']['JournalIssue']:
+            pub_date = medline['Article']['Journal']['JournalIssue']['PubDate']
+            year = pub_date.get('Year', '')
+        
+        return {
+            "pmid": pmid,
+            "title": title,
+            "abstract": abstract,
+            "authors": authors,
+            "year": year,
+            "url": f"{self.base_url}/{pmid}"
+        }
+    
+    def extract_pk_parameters(self, articles: list) -> dict:
+        """
+        Извлечение PK параметров из абстрактов статей
+        Использует предкомпилированные regex (см. scrapers/pk_extractor.py)
+        """
+        return extract_pk_parameters(articles)
+    
+    def get_drug_pk_data(self, inn: str, fanout: bool = None, triage: bool = None) -> dict:
         """
         Полный цикл: поиск + извлечение PK параметров
+        
+        Args:
+            inn: МНН препарата
+            fanout: искать несколькими целевыми запросами параллельно
+                    (по умолчанию Config.PUBMED_FANOUT)
+            triage: сначала оценить ~100 кандидатов по esummary и загрузить
+                    абстракты только лучших (по умолчанию Config.PUBMED_TRIAGE)
         """
+        if fanout is None:
+            fanout = getattr(self, "fanout", False)
+        if triage is None:
+            triage = getattr(self, "triage", False)
+        
         if not BIO_AVAILABLE:
             logger.warning("Bio.Entrez не доступен. Установите biopython для работы с PubMed API.")
             return {
@@ -292,58 +541,142 @@ class PubMedScraper:
             }
         
         try:
-            pmids = self.search_drug(inn)
+            # С локальным зеркалом абстракты и так доступны без сети - отбор не нужен
+            triage = triage and not self.mirror
+            retmax = self.triage_candidates if triage else 20
+            if fanout:
+                pmids = self.search_drug_fanout(inn, retmax=retmax)
+            else:
+                pmids = self.search_drug(inn, retmax=retmax)
             
-            if not pmids:
-                logger.info(f"Статьи не найдены для {inn}")
-                return {
-                    "articles": [],
-                    "count": 0,
-                    "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
-                    "message": f"Статьи о {inn} не найдены на PubMed",
-                    "pk_parameters": {}
-                }
+            if pmids and triage:
+                pmids = self.triage_pmids(pmids)
             
-            articles = []
-            # С API ключом можно делать больше запросов (10 req/sec вместо 3 req/sec)
-            delay = 0.1 if self.api_key else 0.5
+            if not pmids:
+                return self._not_found_result(inn)
             
-            logger.info(f"Загружаю детали {min(len(pmids), 10)} статей...")
-            for i, pmid in enumerate(pmids[:10], 1):  # Берем топ 10
-                try:
-                    article = self.fetch_article_details(pmid)
-                    if article:
-                        articles.append(article)
-                        logger.debug(f"  [{i}/{min(len(pmids), 10)}] Загружена статья {pmid}")
-                    else:
-                        logger.warning(f"  [{i}/{min(len(pmids), 10)}] Не удалось загрузить статью {pmid}")
-                except Exception as e:
-                    logger.warning(f"  [{i}/{min(len(pmids), 10)}] Ошибка загрузки статьи {pmid}: {str(e)[:50]}")
-                
-                if i < min(len(pmids), 10):  # Не ждем после последней статьи
-                    time.sleep(delay)  # Rate limiting
+            top_pmids = pmids[:self.fetch_limit]
+            logger.info(f"Загружаю детали {len(top_pmids)} статей одним пакетом...")
+            articles = self.fetch_articles_batch(top_pmids)
             
             logger.info(f"Загружено {len(articles)} статей из {len(pmids)} найденных")
+            return self._pk_result(inn, articles)
+            
+        except Exception as e:
+            logger.error(f"Ошибка в get_drug_pk_data для {inn}: {e}", exc_info=True)
+            return self._error_result(inn, e)
+    
+    def _not_found_result(self, inn: str) -> dict:
+        logger.info(f"Статьи не найдены для {inn}")
+        return {
+            "articles": [],
+            "count": 0,
+            "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
+            "message": f"Статьи о {inn} не найдены на PubMed",
+            "pk_parameters": {}
+        }
+    
+    def _pk_result(self, inn: str, articles: list) -> dict:
+        # Извлекаем PK параметры
+        pk_data = self.extract_pk_parameters(articles)
+        
+        return {
+            "articles": articles,
+            "count": len(articles),
+            "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
+            "message": f"Найдено {len(articles)} статей о {inn}",
+            "pk_parameters": pk_data
+        }
+    
+    def _error_result(self, inn: str, error: Exception) -> dict:
+        return {
+            "articles": [],
+            "count": 0,
+            "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
+            "message": f"Ошибка поиска статей о {inn}",
+            "pk_parameters": {},
+            "status": "error",
+            "error": str(error)
+        }
+    
+    def _iter_mirror_articles(self, pmids: list):
+        """
+        Статьи из локального зеркала пачками по batch_size
+        """
+        for start in range(0, len(pmids), self.batch_size):
+            chunk = pmids[start:start + self.batch_size]
+            found = self.mirror.get_articles(chunk)
+            for pmid in chunk:
+                if pmid in found:
+                    yield found[pmid]
+    
+    def get_drug_pk_data_deep(self, inn: str, max_articles: int = None) -> dict:
+        """
+        Глубокий режим: извлечение PK параметров из сотен/тысяч статей
+        
+        Используется history сервер NCBI (WebEnv/query_key) вместо списка PMID,
+        статьи загружаются пачками и сразу проходят через извлечение PK
+        параметров. В ответе сохраняются только первые fetch_limit статей,
+        поэтому память не зависит от числа обработанных статей.
+        
+        Args:
+            inn: МНН препарата
+            max_articles: максимум статей для обработки (по умолчанию из конфига)
+        """
+        search_url = f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)"
+        
+        if not BIO_AVAILABLE:
+            logger.warning("Bio.Entrez не доступен. Установите biopython для работы с PubMed API.")
+            return {
+                "articles": [],
+                "count": 0,
+                "search_url": search_url,
+                "message": f"Поиск статей о {inn} на PubMed (biopython не установлен)",
+                "pk_parameters": {},
+                "status": "error",
+                "error": "biopython not installed"
+            }
+        
+        max_articles = max_articles or self.deep_max_articles
+        
+        try:
+            if self.mirror:
+                found = self.mirror.search(self._build_query(inn), retmax=max_articles)
+                total_found = found["count"]
+                articles = self._iter_mirror_articles(found["pmids"])
+            else:
+                history = self.search_history(inn)
+                total_found = history["count"]
+                articles = self.iter_history_articles(
+                    history["webenv"], history["query_key"], min(total_found, max_articles)
+                )
+            logger.info(f"Найдено {total_found} статей, обрабатываю до {max_articles}")
             
-            # Извлекаем PK параметры
-            pk_data = self.extract_pk_parameters(articles)
+            accumulator = PKAccumulator()
+            sample = []
+            for article in articles:
+                accumulator.add(article)
+                if len(sample) < self.fetch_limit:
+                    sample.append(article)
             
             return {
-                "articles": articles,
-                "count": len(articles),
-                "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
-                "message": f"Найдено {len(articles)} статей о {inn}",
-                "pk_parameters": pk_data
+                "articles": sample,
+                "count": accumulator.articles_seen,
+                "total_found": total_found,
+                "search_url": search_url,
+                "message": f"Обработано {accumulator.articles_seen} статей о {inn} (найдено {total_found})",
+                "pk_parameters": accumulator.result(),
+                "mode": "deep"
             }
             
         except Exception as e:
-            logger.error(f"Ошибка в get_drug_pk_data для {inn}: {e}", exc_info=True)
+            logger.error(f"Ошибка в get_drug_pk_data_deep для {inn}: {e}", exc_info=True)
             return {
                 "articles": [],
                 "count": 0,
-                "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
+                "search_url": search_url,
                 "message": f"Ошибка поиска статей о {inn}",
                 "pk_parameters": {},
                 "status": "error",
                 "error": str(e)
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,75 @@
+"""
+Оценка релевантности статей PubMed по облегченным записям esummary
+
+Перед загрузкой полных абстрактов (efetch) статьи-кандидаты ранжируются
+по заголовку, типу публикации и наличию абстракта: полные данные
+загружаются только для тех, где вероятнее всего есть PK параметры.
+"""
+
+# Термины в заголовке и их вес
+TITLE_TERMS = {
+    "bioequivalence": 3.0,
+    "bioavailability": 2.0,
+    "pharmacokinetic": 2.0,
+    "intra-subject": 3.0,
+    "within-subject": 3.0,
+    "replicate": 2.0,
+    "crossover": 1.5,
+    "cross-over": 1.5,
+    "healthy volunteers": 1.5,
+    "healthy subjects": 1.5,
+    "generic": 1.0,
+    "formulation": 1.0,
+    "fasting": 0.5,
+    "food effect": 0.5,
+}
+
+# Типы публикаций PubMed и их вес
+PUBLICATION_TYPE_WEIGHTS = {
+    "Clinical Trial": 2.0,
+    "Clinical Trial, Phase I": 2.5,
+    "Randomized Controlled Trial": 1.5,
+    "Equivalence Trial": 3.0,
+    "Comparative Study": 0.5,
+    "Review": -1.0,
+    "Systematic Review": -1.0,
+    "Meta-Analysis": -0.5,
+    "Case Reports": -2.0,
+    "Editorial": -3.0,
+    "Comment": -3.0,
+    "Letter": -2.0,
+}
+
+# Без абстракта извлекать нечего
+NO_ABSTRACT_PENALTY = -5.0
+
+
+def score_summary(summary: dict) -> float:
+    """
+    Оценка релевантности статьи для извлечения PK параметров
+
+    Args:
+        summary: {"title": ..., "pub_types": [...], "has_abstract": bool}
+
+    Returns:
+        float: чем больше, тем вероятнее в абстракте есть PK данные
+    """
+    title = summary.get("title", "").lower()
+    score = sum(weight for term, weight in TITLE_TERMS.items() if term in title)
+    score += sum(PUBLICATION_TYPE_WEIGHTS.get(pub_type, 0.0) for pub_type in summary.get("pub_types", []))
+    if not summary.get("has_abstract", True):
+        score += NO_ABSTRACT_PENALTY
+    return score
+
+
+def rank_summaries(summaries: list) -> list:
+    """
+    Сортировка кандидатов по оценке; при равной оценке сохраняется
+    исходный порядок (релевантность поиска PubMed)
+
+    Returns:
+        list: PMID в порядке убывания оценки
+    """
+    scored = [(score_summary(summary), index, summary["pmid"]) for index, summary in enumerate(summaries)]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [pmid for _, _, pmid in scored]
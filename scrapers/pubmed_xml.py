@@ -0,0 +1,133 @@
+"""
+Потоковый разбор PubMed XML (efetch, файлы baseline/update) через lxml.iterparse
+
+В отличие от Entrez.read не строит полное валидированное дерево объектов:
+из каждого PubmedArticle берутся только PMID, заголовок, абстракт, авторы
+и год, после чего элемент сразу очищается. Память не растет с числом
+статей в ответе.
+"""
+import logging
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PUBMED_URL = "https://pubmed.ncbi.nlm.nih.gov"
+
+
+def _inner_xml(element) -> str:
+    """
+    Текст элемента вместе с вложенной разметкой (<i>, <sup>, ...),
+    как его возвращает Entrez.read
+    """
+    if element is None:
+        return ""
+    parts = [element.text or ""]
+    for child in element:
+        parts.append(f"<{child.tag}>{_inner_xml(child)}</{child.tag}>")
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def article_from_element(element, base_url: str = PUBMED_URL) -> dict:
+    """
+    Словарь статьи из элемента PubmedArticle (тот же формат, что у fetch_article_details)
+    """
+    citation = element.find("MedlineCitation")
+    pmid = citation.findtext("PMID", default="").strip()
+    article = citation.find("Article")
+
+    abstract = " ".join(
+        _inner_xml(text) for text in article.iterfind("Abstract/AbstractText")
+    )
+
+    authors = []
+    for author in article.iterfind("AuthorList/Author"):
+        last_name = author.findtext("LastName")
+        initials = author.findtext("Initials")
+        if last_name is not None and initials is not None:
+            authors.append(f"{last_name} {initials}")
+
+    year = article.findtext("Journal/JournalIssue/PubDate/Year", default="")
+
+    return {
+        "pmid": pmid,
+        "title": _inner_xml(article.find("ArticleTitle")),
+        "abstract": abstract,
+        "authors": authors,
+        "year": year,
+        "url": f"{base_url}/{pmid}"
+    }
+
+
+def _iterparse(source, tags: tuple):
+    """
+    Потоковый обход элементов с заданными тегами с очисткой памяти
+    """
+    # Текстовые обертки (TextIOWrapper) отдаем lxml как байты
+    source = getattr(source, "buffer", source)
+
+    context = etree.iterparse(
+        source,
+        events=("end",),
+        tag=tags,
+        load_dtd=False,
+        no_network=True,
+        resolve_entities=False,
+        huge_tree=True
+    )
+
+    for _, element in context:
+        try:
+            yield element
+        finally:
+            # Освобождаем разобранный элемент и уже пройденных соседей
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    del context
+
+
+def iter_pubmed_articles(source, base_url: str = PUBMED_URL):
+    """
+    Генератор статей из PubMed XML
+
+    Args:
+        source: путь к файлу или бинарный file-like объект
+                (ответ Entrez.efetch, gzip.open(...), ...)
+        base_url: базовый URL для ссылки на статью
+
+    Yields:
+        dict: статья в формате fetch_article_details
+    """
+    for element in _iterparse(source, ("PubmedArticle",)):
+        try:
+            yield article_from_element(element, base_url)
+        except Exception as e:
+            logger.warning(f"Не удалось разобрать статью: {str(e)[:50]}")
+
+
+def iter_pubmed_updates(source, base_url: str = PUBMED_URL):
+    """
+    Генератор записей файла PubMed baseline/update
+
+    Кроме статей, файлы обновлений содержат DeleteCitation - список PMID,
+    которые нужно удалить.
+
+    Yields:
+        tuple: ("article", dict статьи) или ("delete", [PMID, ...])
+    """
+    for element in _iterparse(source, ("PubmedArticle", "DeleteCitation")):
+        if element.tag == "DeleteCitation":
+            yield "delete", [pmid.text.strip() for pmid in element.iterfind("PMID") if pmid.text]
+            continue
+        try:
+            yield "article", article_from_element(element, base_url)
+        except Exception as e:
+            logger.warning(f"Не удалось разобрать статью: {str(e)[:50]}")
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TokenBucketRateLimiter:
+    """
+    Потокобезопасный token bucket
+
+    Каждый вызов acquire() резервирует один токен и ждет ровно столько,
+    сколько нужно до его появления. Токены могут уходить в минус - так
+    конкурирующие потоки получают свои слоты по очереди, без гонок.
+
+    Если указан lock_file, состояние ведра хранится в файле под flock,
+    и лимит делится между всеми процессами (например, воркерами gunicorn).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1, lock_file: str = None):
+        """
+        Args:
+            rate: токенов в секунду
+            capacity: размер ведра (максимальный всплеск запросов)
+            lock_file: файл для координации между процессами (None - только внутри процесса)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.lock_file = lock_file
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        if self.lock_file and fcntl is None:
+            logger.warning("⚠️ fcntl недоступен, межпроцессный лимит отключен")
+            self.lock_file = None
+
+        if self.lock_file:
+            directory = os.path.dirname(self.lock_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def reserve(self) -> float:
+        """
+        Зарезервировать токен
+
+        Returns:
+            float: сколько секунд нужно подождать перед запросом
+        """
+        with self._lock:
+            if self.lock_file:
+                return self._reserve_shared()
+
+            now = time.monotonic()
+            self._tokens, wait = self._take(self._tokens, now - self._updated)
+            self._updated = now
+            return wait
+
+    def acquire(self) -> float:
+        """
+        Дождаться разрешения на запрос
+
+        Returns:
+            float: сколько секунд пришлось ждать
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def raise_rate(self, rate: float):
+        """
+        Повысить лимит (ниже текущего не опускается)
+        """
+        with self._lock:
+            self.rate = max(self.rate, float(rate))
+
+    def _take(self, tokens: float, elapsed: float) -> tuple:
+        tokens = min(self.capacity, tokens + elapsed * self.rate) - 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, wait
+
+    def _reserve_shared(self) -> float:
+        # Общее состояние: "<токены> <время обновления>", время - wall clock,
+        # так как monotonic не сравним между процессами
+        with open(self.lock_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                now = time.time()
+                try:
+                    tokens, updated = (float(x) for x in f.read().split())
+                except ValueError:
+                    tokens, updated = self.capacity, now
+
+                tokens, wait = self._take(tokens, max(0.0, now - updated))
+
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens} {now}")
+                f.flush()
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничение числа одновременных запросов к одному сайту
+
+    Один семафор на процесс для потоков и циклов событий: синхронный код
+    ждет слот в slot(), асинхронный - в async_slot(), опрашивая семафор
+    без блокировки цикла событий, поэтому отмененная задача не оставляет
+    занятых слотов.
+    """
+
+    def __init__(self, limit: int, poll_interval: float = 0.005):
+        """
+        Args:
+            limit: одновременных запросов
+            poll_interval: шаг опроса свободного слота в async_slot(), сек
+        """
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """
+        Занять слот (TimeoutError, если он не освободился за timeout секунд)
+        """
+        if not self._semaphore.acquire(timeout=timeout):
+            raise TimeoutError(f"нет свободного слота за {timeout:.1f} сек")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """
+        Занять слот из корутины (ожидание ограничивается отменой задачи)
+        """
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+# Singleton instance
+_ncbi_limiter = None
+_ncbi_limiter_lock = threading.Lock()
+
+def get_ncbi_rate_limiter(api_key: str = None) -> TokenBucketRateLimiter:
+    """
+    Общий лимитер для всех запросов к NCBI E-utilities
+
+    NCBI разрешает 3 запроса/сек без API ключа и 10 запросов/сек с ключом.
+    Ключ - из Config.NCBI_API_KEY или переданный скрапером
+    (PubMedScraper(api_key=...)): с ним лимит повышается и у уже созданного
+    лимитера. Явный Config.NCBI_RATE_LIMIT не меняется.
+    """
+    global _ncbi_limiter
+    from config import Config
+    rate = Config.NCBI_RATE_LIMIT or (10 if api_key or Config.NCBI_API_KEY else 3)
+    if _ncbi_limiter is None:
+        with _ncbi_limiter_lock:
+            if _ncbi_limiter is None:
+                _ncbi_limiter = TokenBucketRateLimiter(
+                    rate=rate,
+                    capacity=Config.NCBI_RATE_BURST,
+                    lock_file=Config.NCBI_RATE_LIMIT_FILE or None
+                )
+                logger.info(f"Лимит запросов к NCBI: {rate} req/sec")
+                return _ncbi_limiter
+    if rate > _ncbi_limiter.rate:
+        _ncbi_limiter.raise_rate(rate)
+        logger.info(f"Лимит запросов к NCBI повышен по API ключу: {rate} req/sec")
+    return _ncbi_limiter
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест асинхронных скраперов на локальном тестовом сервере (без сети)
+Сравнивает результат с синхронными скраперами
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.fake_sources import FakeSourcesServer
+from config import Config
+
+
+def fake_sources_config(server: FakeSourcesServer):
+    """Адреса источников на тестовом сервере, без кэшей и зеркала PubMed, новые скраперы пула"""
+    return [
+        patch.multiple(
+            Config,
+            NCBI_EUTILS_URL=server.eutils_url,
+            DRUGBANK_BASE_URL=server.url,
+            GRLS_BASE_URL=server.url,
+            PUBMED_CACHE_PATH="",
+            PUBMED_MIRROR_PATH="",
+            HTTP_CACHE_PATH=""
+        ),
+        patch("scrapers.pubmed_cache._cache_instance", None),
+        patch("scrapers.http_cache._cache_instance", None),
+        patch("scrapers.pubmed_mirror._mirror_instance", None),
+        patch("utils.source_executor._executor_instance", None),
+    ]
+
+
+def test_async_scrapers_match_sync():
+    """DrugBank и ГРЛС возвращают те же словари, что и синхронные скраперы"""
+    from scrapers.async_scrapers import AsyncDrugBankScraper, AsyncGRLSScraper, open_async_client
+    from scrapers.drugbank_scraper import DrugBankScraper
+    from scrapers.grls_scraper import GRLSScraper
+
+    async def collect():
+        async with open_async_client() as client:
+            return await asyncio.gather(
+                AsyncDrugBankScraper(client).get_drug_info("metformin"),
+                AsyncGRLSScraper(client).get_be_studies("metformin")
+            )
+
+    with FakeSourcesServer() as server:
+        patches = fake_sources_config(server)
+        for p in patches:
+            p.start()
+        try:
+            drugbank, grls = asyncio.run(collect())
+            assert drugbank == DrugBankScraper().get_drug_info("metformin")
+            assert grls == GRLSScraper().get_be_studies("metformin")
+            assert drugbank["half_life"].endswith("hours")
+            assert grls["count"] == server.grls_rows
+        finally:
+            for p in reversed(patches):
+                p.stop()
+
+
+def test_full_analysis_async():
+    """Асинхронный анализ собирает все три источника и уточняет CVintra из PubMed"""
+    from utils.analysis import run_full_analysis_async
+
+    with FakeSourcesServer() as server:
+        patches = fake_sources_config(server)
+        for p in patches:
+            p.start()
+        try:
+            result = asyncio.run(run_full_analysis_async({"inn": "metformin"}))
+        finally:
+            for p in reversed(patches):
+                p.stop()
+
+    pubmed = result["literature"]["pubmed"]
+    assert pubmed["count"] == Config.PUBMED_FETCH_LIMIT
+    assert all(article["pmid"] for article in pubmed["articles"])
+    assert result["pk_parameters"]["cvintra"]["value"] is not None
+    assert result["design_recommendation"]["cvintra_source"] == "pubmed"
+    assert result["literature"]["drugbank"]["half_life"]
+    assert result["literature"]["grls"]["count"] > 0
+    assert result["sample_size"]["final_sample_size"]
+
+
+def test_analyses_reuse_scrapers():
+    """Анализы берут состояние долгоживущих скраперов пула, __init__ скраперов не повторяется"""
+    from scrapers.drugbank_scraper import DrugBankScraper
+    from scrapers.grls_scraper import GRLSScraper
+    from scrapers.pubmed_scraper import PubMedScraper
+    from utils.analysis import run_full_analysis_async
+
+    calls = {}
+
+    def counted(cls):
+        init = cls.__init__
+
+        def wrapper(self, *args, **kwargs):
+            calls[cls.__name__] = calls.get(cls.__name__, 0) + 1
+            init(self, *args, **kwargs)
+        return patch.object(cls, "__init__", wrapper)
+
+    with FakeSourcesServer() as server:
+        patches = fake_sources_config(server) + [counted(cls) for cls in (PubMedScraper, DrugBankScraper, GRLSScraper)]
+        for p in patches:
+            p.start()
+        try:
+            for inn in ("metformin", "omeprazole", "aspirin"):
+                result = asyncio.run(run_full_analysis_async({"inn": inn}))
+                assert result["literature"]["grls"]["count"] > 0
+        finally:
+            for p in reversed(patches):
+                p.stop()
+
+    assert calls == {"PubMedScraper": 1, "DrugBankScraper": 1, "GRLSScraper": 1}
+
+
+def test_inherited_sync_methods():
+    """Унаследованные синхронные методы асинхронного скрапера ходят в E-utilities синхронно"""
+    from scrapers.async_scrapers import AsyncPubMedScraper, open_async_client
+    from scrapers.pubmed_scraper import PubMedScraper
+
+    async def make_scraper():
+        async with open_async_client() as client:
+            return AsyncPubMedScraper(client)
+
+    with FakeSourcesServer(total_found=30) as server:
+        patches = fake_sources_config(server)
+        for p in patches:
+            p.start()
+        try:
+            scraper = asyncio.run(make_scraper())
+            deep = scraper.get_drug_pk_data_deep("metformin", max_articles=25)
+            article = scraper.fetch_article_details(deep["articles"][0]["pmid"])
+            expected = PubMedScraper().get_drug_pk_data_deep("metformin", max_articles=25)
+        finally:
+            for p in reversed(patches):
+                p.stop()
+
+    assert "status" not in deep and deep["count"] == 25
+    assert deep == expected
+    assert article == deep["articles"][0]
+
+
+if __name__ == '__main__':
+    test_async_scrapers_match_sync()
+    test_full_analysis_async()
+    test_analyses_reuse_scrapers()
+    test_inherited_sync_methods()
+    print("✅ Все тесты пройдены")
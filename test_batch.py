@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест пакетного анализа портфеля (без сети)
+Строки NDJSON по мере готовности, ограничение параллельности, продолжение пакета по batch_id
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import analysis, batch
+from utils.batch import BatchRunner, BatchStore
+
+DELAYS = {"metformin": 0.3, "ibuprofen": 0.05, "aspirin": 0.1, "warfarin": 0.05, "paracetamol": 0.05}
+
+
+class FakeAnalysis:
+    """run_analysis с задержкой по МНН и подсчетом одновременных вызовов"""
+
+    def __init__(self, partial: set = (), not_found: set = ()):
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.partial = set(partial)
+        self.not_found = set(not_found)
+        self._lock = threading.Lock()
+
+    def __call__(self, data):
+        with self._lock:
+            self.calls.append(data["inn"])
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(DELAYS[data["inn"]])
+            if data["inn"] == "warfarin":
+                raise RuntimeError("ГРЛС недоступен")
+            status = "timeout" if data["inn"] in self.partial else "ok"
+            drugbank = "not_found" if data["inn"] in self.not_found else "ok"
+            return {"inn": data["inn"], "sources": {"pubmed": {"status": "ok"}, "drugbank": {"status": drugbank},
+                                                    "grls": {"status": status}}}, "miss"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_ndjson_stream():
+    """Строка на препарат в порядке готовности, не больше concurrency анализов одновременно"""
+    import app as app_module
+
+    fake = FakeAnalysis(partial={"aspirin"})
+    with tempfile.TemporaryDirectory() as directory, patch.object(analysis, "run_analysis", fake):
+        runner = BatchRunner(BatchStore(os.path.join(directory, "batches.sqlite3")), concurrency=2)
+        with patch.object(batch, "_batch_instance", runner):
+            client = app_module.app.test_client()
+            assert client.post("/api/batch/full-analysis", json={"drugs": []}).status_code == 400
+            assert client.post("/api/batch/full-analysis", json={"drugs": [{"dosage": "5 мг"}]}).status_code == 400
+            assert client.post("/api/batch/full-analysis", json={"batch_id": "unknown"}).status_code == 404
+
+            drugs = [{"inn": inn} for inn in ("metformin", "ibuprofen", "aspirin", "warfarin")]
+            response = client.post("/api/batch/full-analysis", json={"drugs": drugs})
+            assert response.mimetype == "application/x-ndjson"
+            batch_id = response.headers["X-Batch-Id"]
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+            summary = client.get(f"/api/batch/{batch_id}").get_json()
+        runner.shutdown()
+
+    assert fake.peak == 2
+    assert [line["inn"] for line in lines] == ["ibuprofen", "aspirin", "warfarin", "metformin"]
+    by_inn = {line["inn"]: line for line in lines}
+    assert by_inn["metformin"]["status"] == "done" and by_inn["metformin"]["result"]["inn"] == "metformin"
+    assert by_inn["aspirin"]["status"] == "partial"
+    assert by_inn["warfarin"]["status"] == "error" and by_inn["warfarin"]["error"] == "ГРЛС недоступен"
+    assert {line["batch_id"] for line in lines} == {batch_id} and by_inn["metformin"]["index"] == 0
+    assert summary == dict(summary, total=4, done=2, partial=1, error=1, pending=0)
+
+
+def test_resume_after_disconnect():
+    """Готовые препараты не анализируются заново; неполные и не начатые - анализируются"""
+    fake = FakeAnalysis(partial={"aspirin"})
+    with tempfile.TemporaryDirectory() as directory, patch.object(analysis, "run_analysis", fake):
+        store = BatchStore(os.path.join(directory, "batches.sqlite3"))
+        runner = BatchRunner(store, concurrency=1)
+        batch_id = store.create([{"inn": inn} for inn in ("ibuprofen", "aspirin", "metformin", "paracetamol")])
+
+        # Клиент получил две строки и отключился
+        stream = runner.run(batch_id)
+        assert [next(stream)["inn"], next(stream)["inn"]] == ["ibuprofen", "aspirin"]
+        stream.close()
+        time.sleep(0.4)
+        summary = store.summary(batch_id)
+        assert summary["done"] + summary["partial"] < 4 and summary["pending"] >= 1
+
+        fake.partial.clear()
+        calls_before = len(fake.calls)
+        lines = list(runner.run(batch_id))
+        runner.shutdown()
+
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert lines[0]["index"] == 0 and lines[0]["status"] == "done"
+    resumed = fake.calls[calls_before:]
+    assert "ibuprofen" not in resumed and "aspirin" in resumed and "paracetamol" in resumed
+    assert all(line["status"] == "done" for line in lines)
+    assert store.summary(batch_id)["done"] == 4
+
+
+def test_not_found_is_done():
+    """Ответ "не найдено" - окончательный: препарат готов и при продолжении не анализируется"""
+    fake = FakeAnalysis(not_found={"paracetamol"})
+    with tempfile.TemporaryDirectory() as directory, patch.object(analysis, "run_analysis", fake):
+        store = BatchStore(os.path.join(directory, "batches.sqlite3"))
+        runner = BatchRunner(store, concurrency=1)
+        batch_id = store.create([{"inn": "paracetamol"}, {"inn": "ibuprofen"}])
+
+        assert [line["status"] for line in runner.run(batch_id)] == ["done", "done"]
+        list(runner.run(batch_id))
+        runner.shutdown()
+
+    assert fake.calls == ["paracetamol", "ibuprofen"]
+
+
+if __name__ == '__main__':
+    test_ndjson_stream()
+    test_resume_after_disconnect()
+    test_not_found_is_done()
+    print("✅ Все тесты пройдены")
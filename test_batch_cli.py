@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест пакетного анализа из CSV (без сети)
+Чтение CSV, запись JSONL по строкам, продолжение с контрольной точки после сбоя,
+Parquet со строками error и done
+"""
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils import analysis, batch_cli, source_executor
+
+CSV = (
+    "МНН;Форма выпуска;Дозировка;Режим;CVintra\n"
+    "metformin;таблетки;500 мг;натощак;\n"
+    ";таблетки;;;\n"
+    "ibuprofen;капсулы;200 мг;после еды;22,5\n"
+    "warfarin;таблетки;5 мг;;\n"
+)
+
+
+def fetch_pubmed(inn):
+    return {"articles": [], "count": 0}
+
+
+def fetch_drugbank(inn):
+    return {"name": inn}
+
+
+def fetch_grls(inn, deadline=None):
+    if inn == "warfarin":
+        raise RuntimeError("ГРЛС недоступен")
+    return {"registered_drugs": [], "count": 0}
+
+
+def patched_sources():
+    # Процессы пула создаются fork-ом и наследуют подмены
+    return [
+        patch.object(Config, "FULL_ANALYSIS_DEADLINE", 5),
+        patch.object(source_executor, "_executor_instance", None),
+        patch.object(analysis, "fetch_pubmed", fetch_pubmed),
+        patch.object(analysis, "fetch_drugbank", fetch_drugbank),
+        patch.object(analysis, "fetch_grls", fetch_grls)
+    ]
+
+
+def write_csv(directory: str) -> str:
+    path = os.path.join(directory, "drugs.csv")
+    with open(path, "wb") as f:
+        f.write(CSV.encode("cp1251"))
+    return path
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_read_specs():
+    """Русские заголовки, cp1251, пустые поля не передаются, строки без МНН пропускаются"""
+    with tempfile.TemporaryDirectory() as directory:
+        specs = list(batch_cli.read_specs(write_csv(directory)))
+    assert [number for number, _ in specs] == [1, 3, 4]
+    assert specs[0][1] == {"inn": "metformin", "dosage_form": "таблетки", "dosage": "500 мг",
+                           "administration_mode": "натощак"}
+    assert specs[1][1]["cvintra"] == 22.5
+    assert "administration_mode" not in specs[2][1]
+
+
+def test_run_and_resume():
+    """Запись на строку по порядку; после сбоя готовые строки не анализируются заново"""
+    patches = patched_sources()
+    for p in patches:
+        p.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = write_csv(directory)
+            output = os.path.join(directory, "out", "portfolio.jsonl")
+
+            counts = batch_cli.run_batch(csv_path, output, workers=2, synopsis_format="markdown")
+            assert counts == {"done": 2, "partial": 1, "error": 0, "skipped": 0}
+            records = read_jsonl(output)
+            assert [record["row"] for record in records] == [1, 3, 4]
+            metformin, ibuprofen, warfarin = records
+            assert metformin["status"] == "done" and metformin["final_sample_size"]
+            assert metformin["synopsis"] and os.path.exists(metformin["synopsis_file"])
+            assert ibuprofen["cvintra"] == 22.5 and ibuprofen["cvintra_source"] == "user_input"
+            assert warfarin["status"] == "partial"
+
+            # Сбой посреди записи: оборванная строка и потерянный результат metformin
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(json.dumps(ibuprofen, ensure_ascii=False) + "\n")
+                f.write('{"row": 1, "status": "do')
+
+            counts = batch_cli.run_batch(csv_path, output, workers=2)
+            assert counts == {"done": 1, "partial": 1, "error": 0, "skipped": 1}
+            records = read_jsonl(output)
+            assert [(record["row"], record["status"]) for record in records] == [
+                (1, "done"), (3, "done"), (4, "partial")]
+            assert records[1]["elapsed"] == ibuprofen["elapsed"]
+    finally:
+        for p in patches:
+            p.stop()
+
+
+ERROR_RECORD = {"row": 2, "status": "error", "inn": "warfarin", "dosage_form": None, "dosage": None,
+                "administration_mode": None, "cvintra": None, "error": "ГРЛС недоступен", "elapsed": 0.1}
+DONE_RECORD = {"row": 1, "status": "done", "inn": "metformin", "dosage_form": "таблетки", "dosage": "500 мг",
+               "administration_mode": None, "cvintra": 25, "recommended_design": "2x2 crossover",
+               "cvintra_source": "database", "final_sample_size": 24, "synopsis_file": None, "elapsed": 1.5,
+               "analysis": {"inn": "metformin", "sources": {}}, "synopsis": {"title": "Синопсис"}}
+
+
+def write_checkpoint(path: str, lines: list):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(lines))
+
+
+def test_checkpoint_scan():
+    """Статусы из начала записей и из записей в старом порядке полей; оборванная запись отрезается"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "portfolio.jsonl")
+        old_order = {key: value for key, value in DONE_RECORD.items() if key != "status"}
+        old_order.update(row=3, status="partial")
+        write_checkpoint(path, [
+            json.dumps(ERROR_RECORD, ensure_ascii=False) + "\n",
+            json.dumps(DONE_RECORD, ensure_ascii=False) + "\n",
+            json.dumps(old_order, ensure_ascii=False) + "\n",
+            json.dumps(dict(ERROR_RECORD, status="done"), ensure_ascii=False) + "\n",
+            '{"row": 4, "status": "done", "inn": "ibupro'
+        ])
+
+        entries = batch_cli.read_checkpoint(path)
+        assert {row: status for row, (status, _) in entries.items()} == {1: "done", 2: "done", 3: "partial"}
+
+        batch_cli.Checkpoint(path).close()
+        with open(path, "rb") as f:
+            assert f.read().endswith(b'"elapsed": 0.1}\n')
+
+        assert batch_cli.compact(path) == 3
+        records = read_jsonl(path)
+        assert [(record["row"], record["status"]) for record in records] == [(1, "done"), (2, "done"), (3, "partial")]
+        assert records[0] == DONE_RECORD
+
+
+def test_parquet_mixed_statuses():
+    """Первая запись - error без итогов анализа: столбцы по схеме, а не по первой записи"""
+    row = batch_cli.parquet_row(ERROR_RECORD)
+    assert list(row) == [name for name, _ in batch_cli.PARQUET_COLUMNS]
+    assert row["final_sample_size"] is None and row["analysis"] is None
+    assert batch_cli.parquet_row(DONE_RECORD)["cvintra"] == 25.0
+
+    if not batch_cli.PARQUET_AVAILABLE:
+        print("⚠️  pyarrow не установлен, тест пропущен")
+        return
+
+    import pyarrow.parquet
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = os.path.join(directory, "portfolio.parquet.checkpoint.jsonl")
+        write_checkpoint(checkpoint, [json.dumps(record, ensure_ascii=False) + "\n"
+                                      for record in (ERROR_RECORD, DONE_RECORD, ERROR_RECORD)])
+        output = os.path.join(directory, "portfolio.parquet")
+        batch_cli.write_parquet(checkpoint, output, batch_size=2)
+
+        table = pyarrow.parquet.read_table(output)
+        assert table.column_names == [name for name, _ in batch_cli.PARQUET_COLUMNS]
+        rows = table.to_pylist()
+        assert [row["status"] for row in rows] == ["error", "done", "error"]
+        assert rows[0]["final_sample_size"] is None and rows[1]["final_sample_size"] == 24
+        assert json.loads(rows[1]["analysis"]) == DONE_RECORD["analysis"]
+
+
+def test_parquet_requires_pyarrow():
+    if batch_cli.PARQUET_AVAILABLE:
+        return
+    try:
+        batch_cli.run_batch("drugs.csv", "portfolio.parquet")
+        assert False, "нужен pyarrow"
+    except ImportError:
+        pass
+
+
+if __name__ == '__main__':
+    test_read_specs()
+    test_run_and_resume()
+    test_checkpoint_scan()
+    test_parquet_mixed_statuses()
+    test_parquet_requires_pyarrow()
+    print("✅ Все тесты пройдены")
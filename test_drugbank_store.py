@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест локального хранилища DrugBank (без сети)
+Загружает фикстуру XML выгрузки и проверяет поиск по названиям и синонимам
+"""
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.drugbank_store import LXML_AVAILABLE, DrugBankStore
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "drugbank_sample.xml")
+
+
+def test_ingest_and_lookup():
+    """Препараты ищутся по названию и синонимам, вложенные <drug> не загружаются"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DrugBankStore(os.path.join(directory, "drugbank.sqlite3"))
+        assert store.ingest_file(FIXTURE) == 2
+
+        metformin = store.find("METFORMIN")
+        assert metformin["drugbank_id"] == "DB00331"
+        assert metformin["half_life"] == "Approximately 6.2 hours in plasma."
+        assert metformin["absorption"].startswith("Oral bioavailability")
+        assert "Route of elimination: Excreted unchanged in the urine." in metformin["pharmacology"]
+        assert store.find("dimethylbiguanide")["drugbank_id"] == "DB00331"
+        assert store.find("Метформин")["drugbank_id"] == "DB00331"
+        assert store.find("Nested Pathway Drug") is None
+        assert store.find("unknown") is None
+
+        # Повторная загрузка заменяет записи, а не дублирует
+        store.ingest_file(FIXTURE)
+        assert store.stats()["drugs"] == 2
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            store.find("ibuprofeno")
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+def test_scraper_answers_from_store():
+    """get_drug_info отвечает из хранилища и не обращается к сайту"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    from scrapers.drugbank_scraper import DrugBankScraper
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DrugBankStore(os.path.join(directory, "drugbank.sqlite3"))
+        store.ingest_file(FIXTURE)
+
+        scraper = DrugBankScraper()
+        scraper.store = store
+        with patch.object(scraper.session, "get", side_effect=AssertionError("network call")):
+            info = scraper.get_drug_info("Ibuprofen")
+
+        assert info["source"] == "local"
+        assert info["half_life"] == "2-4 hours."
+        assert info["url"].endswith("/drugs/DB01050")
+        assert set(info) >= {"name", "url", "search_url", "message", "description", "pharmacokinetics", "half_life", "absorption"}
+
+
+if __name__ == '__main__':
+    test_ingest_and_lookup()
+    test_scraper_answers_from_store()
+    print("✅ Все тесты пройдены")
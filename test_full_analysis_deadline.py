@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест общего срока полного анализа (без сети)
+Зависший источник не задерживает ответ: он помечается "timeout", остальные результаты сохраняются
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils import analysis
+
+RELEASE = threading.Event()
+
+
+def hung_grls(inn, deadline=None):
+    RELEASE.wait(10)
+    return {"inn": inn, "registered_drugs": [], "count": 0}
+
+
+def fast_pubmed(inn):
+    return {"articles": [], "count": 3}
+
+
+def fast_drugbank(inn):
+    return {"name": inn, "half_life": "6 hours"}
+
+
+def test_sync_returns_at_deadline():
+    """Ответ через ~0.5 сек при зависшем ГРЛС, а не после его завершения"""
+    RELEASE.clear()
+    try:
+        with patch.object(Config, "FULL_ANALYSIS_DEADLINE", 0.5), \
+                patch.object(analysis, "fetch_pubmed", fast_pubmed), \
+                patch.object(analysis, "fetch_drugbank", fast_drugbank), \
+                patch.object(analysis, "fetch_grls", hung_grls):
+            started = time.perf_counter()
+            result = analysis.run_full_analysis({"inn": "metformin", "cvintra": 25})
+            elapsed = time.perf_counter() - started
+    finally:
+        RELEASE.set()
+
+    assert elapsed < 1.5
+    assert result["sources"]["grls"]["status"] == "timeout"
+    assert result["sources"]["pubmed"]["status"] == "ok" and result["sources"]["drugbank"]["status"] == "ok"
+    assert result["literature"]["pubmed"]["count"] == 3
+    assert result["literature"]["drugbank"]["half_life"] == "6 hours"
+    assert result["literature"]["grls"]["status"] == "timeout"
+    assert result["deadline"]["partial"] is True and result["deadline"]["budget"] == 0.5
+    assert result["sample_size"]["final_sample_size"]
+
+
+def test_async_returns_at_deadline():
+    """То же для асинхронного сбора: зависшая корутина отменяется"""
+    async def hung_grls_async(client, inn, deadline=None):
+        await asyncio.sleep(10)
+
+    async def fast_pubmed_async(client, inn):
+        return fast_pubmed(inn)
+
+    async def fast_drugbank_async(client, inn):
+        return fast_drugbank(inn)
+
+    with patch.object(Config, "FULL_ANALYSIS_DEADLINE", 0.5), \
+            patch.object(analysis, "fetch_pubmed_async", fast_pubmed_async), \
+            patch.object(analysis, "fetch_drugbank_async", fast_drugbank_async), \
+            patch.object(analysis, "fetch_grls_async", hung_grls_async):
+        started = time.perf_counter()
+        result = asyncio.run(analysis.run_full_analysis_async({"inn": "metformin", "cvintra": 25}, client=object()))
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.5
+    assert {source: report["status"] for source, report in result["sources"].items()} == \
+        {"pubmed": "ok", "drugbank": "ok", "grls": "timeout"}
+    assert result["deadline"]["partial"] is True
+
+
+if __name__ == '__main__':
+    test_sync_returns_at_deadline()
+    test_async_returns_at_deadline()
+    print("✅ Все тесты пройдены")
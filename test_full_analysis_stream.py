@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест потокового полного анализа (SSE, без сети)
+Расчетные разделы приходят сразу, источники - по мере ответа, в конце - уточненный расчет и результат
+"""
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils import analysis, result_cache
+from utils.result_cache import ResultCache
+
+PUBMED = {"articles": [], "count": 2, "pk_parameters": {"cvintra": {"value": 48, "unit": "%"}}}
+
+
+def slow(delay: float, result: dict):
+    def fetch(inn, deadline=None):
+        time.sleep(delay)
+        return result
+    return fetch
+
+
+def patched_sources():
+    return [
+        patch.object(Config, "FULL_ANALYSIS_DEADLINE", 2),
+        patch.object(analysis, "fetch_pubmed", slow(0.1, PUBMED)),
+        patch.object(analysis, "fetch_drugbank", slow(0.05, {"name": "metformin", "half_life": "6 hours"})),
+        patch.object(analysis, "fetch_grls", slow(0.3, {"registered_drugs": [], "count": 0}))
+    ]
+
+
+def parse_sse(text: str) -> list:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_order_and_timing():
+    """Расчет по CVintra из базы - до ответа источников; уточнение по PubMed меняет дизайн"""
+    patches = patched_sources()
+    for p in patches:
+        p.start()
+    try:
+        started = time.perf_counter()
+        events = []
+        for event, payload in analysis.stream_full_analysis({"inn": "metformin"}):
+            events.append((event, payload, time.perf_counter() - started))
+    finally:
+        for p in patches:
+            p.stop()
+
+    names = [event for event, _, _ in events]
+    assert names == ["cv_database", "sample_size", "drugbank", "pubmed", "grls", "refined", "final"]
+    payloads = {event: payload for event, payload, _ in events}
+    arrived = {event: at for event, _, at in events}
+    assert arrived["sample_size"] < 0.05 and arrived["grls"] >= 0.3
+
+    assert payloads["cv_database"]["cvintra_source"] == "database"
+    assert payloads["sample_size"]["sample_size"]["final_sample_size"]
+    assert payloads["pubmed"]["status"] == "ok" and payloads["pubmed"]["result"]["count"] == 2
+    assert payloads["refined"]["changed"] is True
+    assert payloads["refined"]["design_recommendation"]["cvintra"] == 48
+    assert payloads["refined"]["design_recommendation"]["cvintra_source"] == "pubmed"
+    assert payloads["final"]["sample_size"] == payloads["refined"]["sample_size"]
+    assert set(payloads["final"]["sources"]) == {"pubmed", "drugbank", "grls"}
+
+
+def test_sse_endpoint_and_cache():
+    """Ответ text/event-stream; повторный запрос - одно событие final из кэша"""
+    import app as app_module
+
+    patches = patched_sources() + [patch.object(result_cache, "_result_cache_instance", ResultCache(10, 60))]
+    for p in patches:
+        p.start()
+    try:
+        client = app_module.app.test_client()
+        assert client.post("/api/full-analysis/stream", json={}).status_code == 400
+
+        response = client.post("/api/full-analysis/stream", json={"inn": "metformin", "cvintra": 25})
+        assert response.mimetype == "text/event-stream"
+        events = parse_sse(response.get_data(as_text=True))
+        assert [event for event, _ in events][:2] == ["cv_database", "sample_size"]
+        assert events[-1][0] == "final" and events[-1][1]["cache"] == "miss"
+        # CVintra пользователя не уточняется
+        assert events[-2] == ("refined", dict(events[-2][1], changed=False))
+
+        cached = parse_sse(client.post("/api/full-analysis/stream", json={"inn": "Metformin", "cvintra": 25})
+                           .get_data(as_text=True))
+        assert [event for event, _ in cached] == ["final"]
+        assert cached[0][1]["cache"] == "hit" and cached[0][1]["inn"] == "Metformin"
+    finally:
+        for p in patches:
+            p.stop()
+
+
+if __name__ == '__main__':
+    test_stream_order_and_timing()
+    test_sse_endpoint_and_cache()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест постраничного поиска в ГРЛС на локальном тестовом сервере (без сети)
+Страницы после первой загружаются параллельно через postback и склеиваются по порядку,
+окна навигации - по ссылке "...", форма для postback - из свежего ответа сайта
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.fake_sources import FakeSourcesServer, grls_html
+from config import Config
+from scrapers.grls_scraper import GRLSScraper
+
+EXPECTED = [f"metformin {i}" for i in range(1, 46)]
+
+
+def grls_config(server: FakeSourcesServer, **settings):
+    return [
+        patch.multiple(Config, GRLS_BASE_URL=server.url, GRLS_STORE_PATH="", HTTP_CACHE_PATH="", **settings),
+        patch("scrapers.http_cache._cache_instance", None),
+        patch("scrapers.grls_store._store_instance", None),
+        patch("scrapers.grls_scraper._page_limiter_instance", None),
+    ]
+
+
+def run_patched(patches, function):
+    for p in patches:
+        p.start()
+    try:
+        return function()
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def test_pager_rows_excluded():
+    """Строка навигации и ее вложенная таблица не попадают в строки результатов"""
+    content = grls_html("metformin", rows=5, page=2, pages=9).encode("utf-8")
+    page = GRLSScraper._grid_page(content)
+    assert page == GRLSScraper._grid_page_soup(content)
+    assert [row[0] for row in page["rows"]] == EXPECTED[5:10]
+    assert sorted(page["pages"], key=int) == ["1", "3", "4", "5", "6", "7", "8", "9"]
+    assert page["pages"]["3"] == ["ctl00$plate$gr", "Page$3"]
+
+
+def test_all_pages_in_order():
+    """Все 9 страниц загружаются, не больше GRLS_PAGE_CONCURRENCY запросов одновременно"""
+    with FakeSourcesServer(latency=0.1, grls_rows=5, grls_pages=9) as server:
+        def search():
+            started = time.perf_counter()
+            drugs = GRLSScraper().search_drug("metformin")
+            return drugs, time.perf_counter() - started
+
+        drugs, elapsed = run_patched(grls_config(server, GRLS_PAGE_CONCURRENCY=4), search)
+
+        assert [drug["name"] for drug in drugs] == EXPECTED
+        assert server.requests["/Grls_View_v2.aspx"] == 9
+        assert server.peak_in_flight <= 4
+        # Первая страница + два "раунда" по 4 страницы, а не 9 последовательных запросов
+        assert elapsed < 0.7
+
+
+def test_deadline_and_max_pages():
+    """По истечении срока возвращаются полученные страницы; GRLS_MAX_PAGES ограничивает загрузку"""
+    with FakeSourcesServer(latency=0.1, grls_rows=5, grls_pages=9) as server:
+        def search():
+            scraper = GRLSScraper()
+            started = time.perf_counter()
+            partial = scraper._search_live("metformin", deadline=time.monotonic() + 0.15)
+            elapsed = time.perf_counter() - started
+
+            scraper.max_pages = 3
+            return partial, elapsed, scraper.search_drug("metformin")
+
+        partial, elapsed, limited = run_patched(grls_config(server), search)
+
+        # Не все страницы к сроку - статус "timeout", такой результат не кэшируется
+        assert [drug["name"] for drug in partial[0]] == EXPECTED[:5] and partial[1] == "timeout"
+        assert elapsed < 0.2
+        assert [drug["name"] for drug in limited] == EXPECTED[:15]
+
+
+def test_pager_window_links():
+    """Ссылки "..." дают номер первой страницы соседнего окна навигации"""
+    content = grls_html("metformin", rows=5, page=11, pages=25, window=10).encode("utf-8")
+    page = GRLSScraper._grid_page(content)
+    assert page == GRLSScraper._grid_page_soup(content)
+    assert sorted(page["pages"], key=int) == [str(number) for number in range(10, 22) if number != 11]
+    assert page["pages"]["21"] == ["ctl00$plate$gr", "Page$21"]
+
+
+def test_pages_past_pager_window():
+    """Страницы за окном навигации загружаются по "..." с формой страницы, на которой есть ссылка"""
+    expected = [f"metformin {i}" for i in range(1, 126)]
+    with FakeSourcesServer(grls_rows=5, grls_pages=25, grls_window=10) as server:
+        drugs = run_patched(grls_config(server, GRLS_MAX_PAGES=30), lambda: GRLSScraper().search_drug("metformin"))
+        assert [drug["name"] for drug in drugs] == expected
+        assert server.requests["/Grls_View_v2.aspx"] == 25
+
+        limited = run_patched(grls_config(server, GRLS_MAX_PAGES=15), lambda: GRLSScraper().search_drug("metformin"))
+        assert [drug["name"] for drug in limited] == expected[:75]
+
+
+def test_viewstate_from_fresh_page():
+    """С HTTP кэшем первая страница перезапрашивается: __VIEWSTATE из кэша сайт уже не принимает"""
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeSourcesServer(grls_rows=5, grls_pages=3) as server:
+        patches = grls_config(server)
+        patches[0] = patch.multiple(Config, GRLS_BASE_URL=server.url, GRLS_STORE_PATH="",
+                                    HTTP_CACHE_PATH=os.path.join(directory, "http.sqlite3"))
+
+        def search_twice():
+            first = GRLSScraper().search_drug("metformin")
+            server.grls_epoch += 1
+            return first, GRLSScraper().search_drug("metformin")
+
+        first, second = run_patched(patches, search_twice)
+        assert [drug["name"] for drug in first] == EXPECTED[:15]
+        assert [drug["name"] for drug in second] == EXPECTED[:15]
+
+
+def test_first_page_fetched_once():
+    """С HTTP кэшем первая страница загружается один раз; свежая запись проверяется условным GET"""
+    from scrapers.http_cache import get_http_cache
+
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeSourcesServer(grls_rows=5, grls_pages=3) as server:
+        patches = grls_config(server)
+        patches[0] = patch.multiple(Config, GRLS_BASE_URL=server.url, GRLS_STORE_PATH="",
+                                    HTTP_CACHE_PATH=os.path.join(directory, "http.sqlite3"))
+
+        def search_twice():
+            first = GRLSScraper().search_drug("metformin")
+            cold = dict(server.requests)
+            second = GRLSScraper().search_drug("metformin")
+            return first, cold, second, get_http_cache().stats()["grls"]
+
+        first, cold, second, stats = run_patched(patches, search_twice)
+        assert [drug["name"] for drug in first] == [drug["name"] for drug in second] == EXPECTED[:15]
+        assert cold["/Grls_View_v2.aspx"] == 3
+        # Повторный поиск: свежая запись + условный GET (304) + 2 postback
+        assert server.requests["/Grls_View_v2.aspx"] == 6 and server.not_modified == 1
+        assert stats == {"hits": 1, "revalidated": 1, "misses": 1}
+
+
+def test_page_limit_shared_between_searches():
+    """GRLS_PAGE_CONCURRENCY - общий лимит запросов для одновременных синхронного и асинхронного поисков"""
+    from scrapers.async_scrapers import HTTPX_AVAILABLE
+    if not HTTPX_AVAILABLE:
+        print("⚠️  httpx не установлен, тест пропущен")
+        return
+
+    from scrapers.async_scrapers import AsyncGRLSScraper, open_async_client
+
+    async def collect_async():
+        async with open_async_client() as client:
+            return await AsyncGRLSScraper(client).search_drug("metformin")
+
+    with FakeSourcesServer(latency=0.05, grls_rows=5, grls_pages=9) as server:
+        def search_concurrently():
+            results = {}
+            threads = [
+                threading.Thread(target=lambda: results.update(sync=GRLSScraper().search_drug("metformin"))),
+                threading.Thread(target=lambda: results.update(async_=asyncio.run(collect_async()))),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return results
+
+        results = run_patched(grls_config(server, GRLS_PAGE_CONCURRENCY=3), search_concurrently)
+        assert [drug["name"] for drug in results["sync"]] == EXPECTED
+        assert [drug["name"] for drug in results["async_"]] == EXPECTED
+        assert server.requests["/Grls_View_v2.aspx"] == 18
+        assert server.peak_in_flight == 3
+
+
+def test_page_timeout_within_deadline():
+    """Таймаут запроса страницы - не больше времени до срока"""
+    scraper = GRLSScraper()
+    deadline = time.monotonic() + 2
+    timeouts = []
+
+    class Response:
+        content = grls_html("metformin", rows=5, page=2, pages=3).encode("utf-8")
+
+        def raise_for_status(self):
+            pass
+
+    def post(url, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        return Response()
+
+    first = GRLSScraper._grid_page(grls_html("metformin", rows=5, pages=3).encode("utf-8"))
+    with patch.object(scraper.session, "post", post):
+        scraper._fetch_page("metformin", first, 2, deadline)
+    assert scraper.timeout > 2 and 1.5 < timeouts[0] <= 2
+
+
+def test_async_pages_match_sync():
+    """Асинхронный скрапер возвращает те же строки в том же порядке"""
+    from scrapers.async_scrapers import HTTPX_AVAILABLE
+    if not HTTPX_AVAILABLE:
+        print("⚠️  httpx не установлен, тест пропущен")
+        return
+
+    from scrapers.async_scrapers import AsyncGRLSScraper, open_async_client
+
+    async def collect():
+        async with open_async_client() as client:
+            return await AsyncGRLSScraper(client).get_be_studies("metformin")
+
+    with FakeSourcesServer(latency=0.05, grls_rows=5, grls_pages=9) as server:
+        result = run_patched(grls_config(server, GRLS_PAGE_CONCURRENCY=3), lambda: asyncio.run(collect()))
+        assert [drug["name"] for drug in result["registered_drugs"]] == EXPECTED
+        assert server.peak_in_flight <= 3
+
+    with FakeSourcesServer(grls_rows=5, grls_pages=25, grls_window=10) as server:
+        result = run_patched(grls_config(server, GRLS_MAX_PAGES=30), lambda: asyncio.run(collect()))
+        assert len(result["registered_drugs"]) == 125
+
+
+if __name__ == '__main__':
+    test_pager_rows_excluded()
+    test_all_pages_in_order()
+    test_deadline_and_max_pages()
+    test_pager_window_links()
+    test_pages_past_pager_window()
+    test_viewstate_from_fresh_page()
+    test_first_page_fetched_once()
+    test_page_limit_shared_between_searches()
+    test_page_timeout_within_deadline()
+    test_async_pages_match_sync()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест локального снимка реестра ГРЛС (без сети)
+Загружает фикстуру выгрузки (CSV в cp1251 и собранный из нее XLSX) и проверяет поиск
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.grls_store import LXML_AVAILABLE, GRLSStore
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "grls_registry_sample.csv")
+
+
+def build_xlsx(path: str):
+    """XLSX из фикстуры: заголовок в общей таблице строк, данные - inline строками"""
+    with open(FIXTURE, encoding="cp1251", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    header = rows[2]
+    shared = "".join(f"<si><t>{escape(title)}</t></si>" for title in header)
+    sheet_rows = []
+    for number, row in enumerate(rows, start=1):
+        cells = []
+        for column, value in enumerate(row):
+            if not value:
+                continue
+            reference = f"{chr(ord('A') + column)}{number}"
+            if number == 3:
+                cells.append(f'<c r="{reference}" t="s"><v>{column}</v></c>')
+            else:
+                cells.append(f'<c r="{reference}" t="inlineStr"><is><t>{escape(value)}</t></is></c>')
+        sheet_rows.append(f'<row r="{number}">{"".join(cells)}</row>')
+
+    main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("xl/workbook.xml", f'<workbook xmlns="{main}"><sheets/></workbook>')
+        archive.writestr("xl/sharedStrings.xml", f'<sst xmlns="{main}">{shared}</sst>')
+        archive.writestr("xl/worksheets/sheet1.xml",
+                         f'<worksheet xmlns="{main}"><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>')
+
+
+def check_search(store: GRLSStore):
+    metformin = store.search("метформ")
+    # Совпадение по владельцу РУ ("Метформ Фарма") - после совпадений по МНН
+    assert [drug["name"] for drug in metformin] == ["Глюкофаж®", "Метформин-Тева", "Метформин Лонг", "Аторвастатин МФ"]
+    assert metformin[0]["manufacturer"] == "Мерк Санте с.а.с."
+    assert metformin[0]["dosage_form"] == "таблетки, покрытые пленочной оболочкой"
+    assert metformin[0]["reg_number"] == "П N014600/01" and metformin[0]["country"] == "Франция"
+
+    assert [drug["name"] for drug in store.search("ТЕВА")] == ["Метформин-Тева", "Ибупрофен-Тева"]
+    assert [drug["name"] for drug in store.search("глюкофаж")] == ["Глюкофаж®"]
+    assert [drug["name"] for drug in store.search("МФ")] == ["Аторвастатин МФ"]
+    assert store.search("варфарин") == []
+
+
+def test_ingest_csv_and_search():
+    """Строки до заголовка пропускаются, поиск по подстроке МНН, названия и владельца"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = GRLSStore(os.path.join(directory, "grls.sqlite3"))
+        assert store.ingest_file(FIXTURE) == 5
+        check_search(store)
+
+        # Повторная загрузка заменяет снимок, а не дублирует
+        store.ingest_file(FIXTURE)
+        assert store.stats()["registrations"] == 5
+        assert len(store.search("метформин")) == 3
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            store.search("ибупрофен")
+        assert (time.perf_counter() - started) / 1000 < 0.005
+
+
+def test_ingest_xlsx_in_zip():
+    """XLSX в ZIP архиве читается так же, как CSV"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        xlsx = os.path.join(directory, "reestr.xlsx")
+        build_xlsx(xlsx)
+        export = os.path.join(directory, "grls_export.zip")
+        with zipfile.ZipFile(export, "w") as archive:
+            archive.write(xlsx, "reestr.xlsx")
+
+        store = GRLSStore(os.path.join(directory, "grls.sqlite3"))
+        assert store.ingest_file(export) == 5
+        check_search(store)
+
+
+def test_scraper_answers_from_store():
+    """get_be_studies отвечает из снимка и не обращается к сайту"""
+    from scrapers.grls_scraper import GRLSScraper
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = GRLSStore(os.path.join(directory, "grls.sqlite3"))
+        store.ingest_file(FIXTURE)
+
+        scraper = GRLSScraper()
+        scraper.store = store
+        scraper.live_check = False
+        with patch.object(scraper.session, "get", side_effect=AssertionError("network call")):
+            result = scraper.get_be_studies("Ибупрофен")
+
+        assert result["source"] == "local" and result["count"] == 1
+        assert result["registered_drugs"][0]["name"] == "Ибупрофен-Тева"
+
+        # Сверка с сайтом: на сайте больше регистраций - снимок считается устаревшим
+        scraper.live_check = True
+        live = [{"name": "Ибупрофен-Тева", "dosage_form": "", "manufacturer": ""},
+                {"name": "Нурофен", "dosage_form": "", "manufacturer": ""}]
+        with patch.object(scraper, "_search_live", return_value=(live, "ok")):
+            result = scraper.get_be_studies("Ибупрофен")
+        assert result["source"] == "live" and result["count"] == 2
+
+
+if __name__ == '__main__':
+    test_ingest_csv_and_search()
+    test_ingest_xlsx_in_zip()
+    test_scraper_answers_from_store()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест выборочного разбора HTML через lxml (без сети)
+Сравнивает результат с разбором через BeautifulSoup на сохраненных страницах
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.drugbank_scraper import DrugBankScraper
+from scrapers.grls_scraper import GRLSScraper
+from scrapers.html_extract import (
+    LXML_AVAILABLE, extract_drug_page, extract_grid_page, extract_grid_rows, extract_search_result_href
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "html")
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def test_fixtures_match_soup():
+    """На сохраненных страницах результат совпадает с BeautifulSoup"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    search = load_fixture("drugbank_search.html")
+    assert extract_search_result_href(search) == DrugBankScraper._search_href_soup(search) == "/drugs/DB00331"
+
+    drug = load_fixture("drugbank_drug.html")
+    fields = extract_drug_page(drug)
+    assert fields == DrugBankScraper._drug_page_fields_soup(drug)
+    assert fields["half_life"] == "Approximately6.2 hoursin plasma; 17.6 h in blood."
+
+    grls = load_fixture("grls_search.html")
+    rows = extract_grid_rows(grls)
+    assert rows == GRLSScraper._grid_rows_soup(grls)
+    assert len(rows) == 60 and rows[0][0] == "Метформин-Тева\xa00"
+
+    page = extract_grid_page(grls)
+    assert page == GRLSScraper._grid_page_soup(grls)
+    assert page["rows"] == rows
+    assert page["pages"] == {"2": ["ctl00$plate$gr", "Page$2"]} and "__VIEWSTATE" in page["form"]
+
+
+def test_text_rules_match_soup():
+    """Текст <script>/<style> и комментарии пропускаются, dt сравнивается как Tag.string"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    page = (
+        "<html><body><section id='pharmacology'><h2>Pharmacology</h2><!-- c -->"
+        "<script>var x = 1;</script><style>.a{}</style><p>A &amp; B</p>"
+        "<dl><dt>Half Life <b>note</b></dt><dd>wrong</dd>"
+        "<dt><span>Half Life</span></dt><dd> 6 <i>h</i> </dd></dl></section></body></html>"
+    ).encode("utf-8")
+    fields = extract_drug_page(page)
+    assert fields == DrugBankScraper._drug_page_fields_soup(page)
+    assert fields == {"pharmacokinetics": "PharmacologyA & BHalf LifenotewrongHalf Life6h", "half_life": "6h"}
+
+    assert extract_search_result_href(b"<html><body><a class='x'>no</a></body></html>") is None
+    assert extract_grid_rows(b"<html><body><table class='other'><tr><td>1</td></tr></table></body></html>") == []
+
+
+if __name__ == '__main__':
+    test_fixtures_match_soup()
+    test_text_rules_match_soup()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест HTTP кэша страниц DrugBank и ГРЛС на локальном тестовом сервере (без сети)
+Проверяет hit без запроса, 304 без повторного разбора и счетчики по источникам
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.fake_sources import FakeSourcesServer
+from scrapers import http_cache
+from scrapers.http_cache import HTTPCache, fetch_parsed
+from scrapers.http_session import create_http_session
+
+
+def test_hit_revalidate_miss():
+    """Свежая запись отдается без запроса, устаревшая проверяется через If-None-Match"""
+    parsed = []
+
+    def parse(content):
+        parsed.append(len(content))
+        return {"size": len(content)}
+
+    with FakeSourcesServer() as server, tempfile.TemporaryDirectory() as directory:
+        cache = HTTPCache(os.path.join(directory, "http.sqlite3"), max_age=3600)
+        session = create_http_session(max_retries=0, retry_delay=0)
+        url = f"{server.url}/drugs/DB00331"
+
+        first = fetch_parsed(session, cache, "drugbank", url, parse, "test")
+        second = fetch_parsed(session, cache, "drugbank", url, parse, "test")
+        assert first == second
+        assert server.requests["/drugs/DB00331"] == 1
+        assert len(parsed) == 1
+
+        # Запись устарела: условный запрос, сервер отвечает 304, разбор не повторяется
+        cache.max_age = 0
+        assert fetch_parsed(session, cache, "drugbank", url, parse, "test") == first
+        assert server.requests["/drugs/DB00331"] == 2
+        assert server.not_modified == 1
+        assert len(parsed) == 1
+
+        # Новая версия разбора - страница разбирается заново из сохраненного тела
+        assert fetch_parsed(session, cache, "drugbank", url, parse, "test.v2") == first
+        assert len(parsed) == 2
+
+        assert cache.stats() == {"drugbank": {"hits": 1, "revalidated": 2, "misses": 1}}
+
+
+def test_scrapers_use_cache():
+    """Повторный анализ отвечает из кэша; синхронные и асинхронные скраперы делят записи"""
+    from config import Config
+    from scrapers.async_scrapers import HTTPX_AVAILABLE
+    from scrapers.drugbank_scraper import DrugBankScraper
+    from scrapers.grls_scraper import GRLSScraper
+
+    with FakeSourcesServer() as server, tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "http.sqlite3")
+        with patch.multiple(Config, DRUGBANK_BASE_URL=server.url, GRLS_BASE_URL=server.url,
+                            HTTP_CACHE_PATH=path, HTTP_CACHE_MAX_AGE=3600), \
+                patch("scrapers.http_cache._cache_instance", None):
+            drugbank = DrugBankScraper()
+            drugbank.store = None
+            grls = GRLSScraper()
+
+            info = drugbank.get_drug_info("metformin")
+            studies = grls.get_be_studies("metformin")
+            requests_made = sum(server.requests.values())
+            assert info["half_life"] and studies["count"] == server.grls_rows
+
+            assert drugbank.get_drug_info("metformin") == info
+            assert grls.get_be_studies("metformin") == studies
+            assert sum(server.requests.values()) == requests_made
+
+            if HTTPX_AVAILABLE:
+                from scrapers.async_scrapers import AsyncDrugBankScraper, AsyncGRLSScraper, open_async_client
+
+                async def collect():
+                    async with open_async_client() as client:
+                        async_drugbank = AsyncDrugBankScraper(client)
+                        async_drugbank.store = None
+                        return await asyncio.gather(
+                            async_drugbank.get_drug_info("metformin"),
+                            AsyncGRLSScraper(client).get_be_studies("metformin")
+                        )
+
+                assert asyncio.run(collect()) == [info, studies]
+                assert sum(server.requests.values()) == requests_made
+
+            stats = drugbank.http_cache.stats()
+            assert stats["drugbank"]["misses"] == 2 and stats["grls"]["misses"] == 1
+            assert stats["drugbank"]["hits"] >= 2 and stats["grls"]["hits"] >= 1
+
+
+def count_rows(cache: HTTPCache) -> dict:
+    return {table: cache._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("responses", "bodies", "parsed")}
+
+
+def test_prune():
+    """Старые версии тел и их разборы удаляются; страницы - по сроку хранения и по лимиту числа"""
+    def store(url, body, at):
+        with patch.object(http_cache.time, "time", return_value=at):
+            cache.store("grls", url, {}, body, len, "grls.page")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = HTTPCache(os.path.join(directory, "http.sqlite3"), max_entries=2, retention=1000,
+                          prune_interval=3600)
+        # Первое сохранение сразу запускает очистку, дальше - раз в prune_interval
+        store("https://grls/1", b"viewstate-1", at=10000)
+        store("https://grls/1", b"viewstate-2", at=10100)
+        store("https://grls/2", b"page-2", at=10200)
+        store("https://grls/3", b"page-3", at=10300)
+        assert count_rows(cache) == {"responses": 3, "bodies": 4, "parsed": 4}
+
+        # Сверх max_entries вытесняется давно проверенная /1 вместе с обеими версиями тела
+        with patch.object(http_cache.time, "time", return_value=10400):
+            assert cache.prune() == {"responses": 1, "bodies": 2, "parsed": 2}
+        assert count_rows(cache) == {"responses": 2, "bodies": 2, "parsed": 2}
+        assert cache.lookup("https://grls/1") is None and cache.lookup("https://grls/3")
+
+        # Через prune_interval очистку запускает очередное сохранение: /2 и /3 не проверялись дольше retention
+        store("https://grls/4", b"page-4", at=10400 + 3600)
+        assert count_rows(cache) == {"responses": 1, "bodies": 1, "parsed": 1}
+        assert cache.lookup("https://grls/4")
+
+def test_evicted_body_refetched():
+    """Тело удалено между lookup и чтением - страница загружается заново, а не падает"""
+    with FakeSourcesServer() as server, tempfile.TemporaryDirectory() as directory:
+        cache = HTTPCache(os.path.join(directory, "http.sqlite3"), max_age=3600)
+        session = create_http_session(max_retries=0, retry_delay=0)
+        url = f"{server.url}/drugs/DB00331"
+
+        first = fetch_parsed(session, cache, "drugbank", url, len, "test")
+        cache._conn.executescript("DELETE FROM bodies; DELETE FROM parsed;")
+        assert fetch_parsed(session, cache, "drugbank", url, len, "test") == first
+        assert server.requests["/drugs/DB00331"] == 2
+
+
+if __name__ == '__main__':
+    test_hit_revalidate_miss()
+    test_scrapers_use_cache()
+    test_prune()
+    test_evicted_body_refetched()
+    print("✅ Все тесты пройдены")
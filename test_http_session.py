@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест общей HTTP сессии: повтор на 503 и переиспользование соединения (без сети)
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.http_session import create_http_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Первые failures запросов отвечает 503, дальше 200"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.client_ports.add(self.client_address[1])
+        status = 503 if server.requests <= server.failures else 200
+        body = b"ok" if status == 200 else b"busy"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(failures: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.failures = failures
+    server.requests = 0
+    server.client_ports = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_retries_on_503():
+    """503 повторяется, пока не исчерпаны повторы"""
+    server = start_server(failures=2)
+    try:
+        session = create_http_session(max_retries=3, retry_delay=0)
+        response = session.get(f"http://127.0.0.1:{server.server_address[1]}/", timeout=5)
+        assert response.status_code == 200
+        assert server.requests == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_connection_reused():
+    """Последовательные запросы к одному хосту идут по одному соединению"""
+    server = start_server(failures=0)
+    try:
+        session = create_http_session(max_retries=0, retry_delay=0)
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        for _ in range(3):
+            assert session.get(url, timeout=5).status_code == 200
+        assert len(server.client_ports) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    test_retries_on_503()
+    test_connection_reused()
+    print("✅ Все тесты пройдены")
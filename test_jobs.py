@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест фоновых задач (без сети)
+Задача возвращает id сразу, статус и результат читаются из SQLite, незавершенные
+задачи выполняются после перезапуска, прогресс по источникам, удаление старых задач
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils import analysis, jobs
+from utils.jobs import JobQueueFull, JobRunner, JobStore
+
+ANALYSIS = {"inn": "metformin", "sources": {}, "sample_size": {"final_sample_size": 24}}
+
+
+def wait_done(store: JobStore, job_id: str, timeout: float = 5) -> dict:
+    for _ in range(int(timeout / 0.02)):
+        job = store.get(job_id)
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"задача {job_id} не завершилась: {store.get(job_id)}")
+
+
+def test_analysis_job():
+    """POST возвращается до окончания анализа, результат и прогресс - в хранилище"""
+    release = threading.Event()
+
+    def slow_analysis(data, on_source=None):
+        release.wait(5)
+        return dict(ANALYSIS, inn=data["inn"]), "miss"
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(analysis, "run_analysis", slow_analysis):
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        runner = JobRunner(store, workers=1, queue_limit=1)
+
+        job_id = runner.submit("full_analysis", {"inn": "metformin"})
+        for _ in range(50):
+            if store.get(job_id)["stage"] == "analysis":
+                break
+            time.sleep(0.02)
+        job = store.get(job_id)
+        assert job["status"] == "running" and job["stage"] == "analysis" and job["result"] is None
+
+        # Вторая задача ждет в очереди, третья не помещается
+        queued = runner.submit("full_analysis", {"inn": "ibuprofen"})
+        try:
+            runner.submit("full_analysis", {"inn": "aspirin"})
+            assert False, "очередь заполнена"
+        except JobQueueFull:
+            pass
+
+        release.set()
+        job = wait_done(store, job_id)
+        assert job["progress"] == 1 and job["result"]["inn"] == "metformin"
+        assert wait_done(store, queued)["result"]["inn"] == "ibuprofen"
+        assert runner.stats()["done"] == 2
+        runner.shutdown()
+
+
+def test_failed_job():
+    """Ошибка обработчика сохраняется в задаче"""
+    def broken(data, on_source=None):
+        raise RuntimeError("PubMed недоступен")
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(analysis, "run_analysis", broken):
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        runner = JobRunner(store, workers=1)
+        job = wait_done(store, runner.submit("full_analysis", {"inn": "metformin"}))
+        assert job["status"] == "error" and job["error"] == "PubMed недоступен"
+        runner.shutdown()
+
+
+def test_resume_after_restart():
+    """Задачи из очереди и прерванные "running" выполняются новым процессом; выполняемые не трогаются"""
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(analysis, "run_analysis", lambda data, on_source=None: (dict(ANALYSIS, inn=data["inn"]), "miss")):
+        path = os.path.join(directory, "jobs.sqlite3")
+        store = JobStore(path)
+        queued = store.create("full_analysis", {"inn": "metformin"})
+        interrupted = store.create("full_analysis", {"inn": "ibuprofen"})
+        alive = store.create("full_analysis", {"inn": "aspirin"})
+        for job_id in (interrupted, alive):
+            assert store.claim(job_id)
+        store._execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 60, interrupted))
+
+        runner = JobRunner(JobStore(path), workers=2, heartbeat=1)
+        assert runner.sweep() == 2
+        assert wait_done(store, queued)["result"]["inn"] == "metformin"
+        assert wait_done(store, interrupted)["result"]["inn"] == "ibuprofen"
+        assert store.get(alive)["status"] == "running"
+        runner.shutdown()
+
+
+def test_source_progress():
+    """Прогресс полного анализа растет с каждым ответившим источником"""
+    def answer_after(delay: float, result: dict):
+        def fetch(inn, deadline=None):
+            time.sleep(delay)
+            return result
+        return fetch
+
+    stages = []
+    with patch.object(Config, "RESULT_CACHE_SIZE", 0), patch.object(Config, "ASYNC_SCRAPERS", False), \
+            patch("utils.result_cache._result_cache_instance", None), \
+            patch.object(analysis, "fetch_pubmed", answer_after(0, {"articles": [], "count": 0})), \
+            patch.object(analysis, "fetch_drugbank", answer_after(0.1, {"name": "metformin"})), \
+            patch.object(analysis, "fetch_grls", answer_after(0.2, {"registered_drugs": []})):
+        result, _ = jobs.run_analysis_job({"inn": "metformin", "cvintra": 25},
+                                          lambda stage, fraction: stages.append((stage, round(fraction, 2))))
+
+    assert stages == [("analysis", 0.1), ("pubmed", 0.37), ("drugbank", 0.63), ("grls", 0.9)]
+    assert set(result["sources"]) == {"pubmed", "drugbank", "grls"}
+
+
+def test_stale_refresh_keeps_job_done():
+    """Фоновое обновление устаревшего результата не меняет прогресс завершенной задачи"""
+    from utils.result_cache import ResultCache, result_key
+
+    def answer_after(delay: float, result: dict):
+        def fetch(inn, deadline=None):
+            time.sleep(delay)
+            return result
+        return fetch
+
+    data = {"inn": "metformin", "cvintra": 25}
+    cache = ResultCache(max_entries=10, ttl=0.05)
+    cache.put(result_key(analysis.analysis_params(data)), dict(ANALYSIS, sources={"pubmed": {"status": "ok"}}))
+    time.sleep(0.1)
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(Config, "ASYNC_SCRAPERS", False), \
+            patch("utils.result_cache._result_cache_instance", cache), \
+            patch.object(analysis, "fetch_pubmed", answer_after(0.1, {"articles": [], "count": 0})), \
+            patch.object(analysis, "fetch_drugbank", answer_after(0.15, {"name": "metformin"})), \
+            patch.object(analysis, "fetch_grls", answer_after(0.2, {"registered_drugs": []})):
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        runner = JobRunner(store, workers=1)
+        job_id = runner.submit("full_analysis", data)
+        assert wait_done(store, job_id)["status"] == "done"
+
+        for _ in range(100):
+            if cache.stats()["refreshing"] == 0:
+                break
+            time.sleep(0.02)
+        assert cache.stats()["refreshes"] == 1 and cache.stats()["refreshing"] == 0
+        job = store.get(job_id)
+        assert job["stage"] == "done" and job["progress"] == 1
+
+        # Запоздавший прогресс завершенной задачи не записывается
+        store.progress(job_id, "grls", 0.9)
+        assert store.get(job_id)["stage"] == "done"
+        runner.shutdown()
+
+
+def test_periodic_purge():
+    """Фоновая проверка удаляет завершенные задачи старше retention, не чаще purge_interval"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+
+        def old_done_job() -> str:
+            job_id = store.create("full_analysis", {"inn": "metformin"})
+            store.claim(job_id)
+            store.finish(job_id, {"inn": "metformin"})
+            store._execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 120, job_id))
+            return job_id
+
+        first = old_done_job()
+        fresh = store.create("full_analysis", {"inn": "ibuprofen"})
+        store.claim(fresh)
+        store.finish(fresh, {"inn": "ibuprofen"})
+
+        runner = JobRunner(store, workers=1, retention=60, purge_interval=3600)
+        runner.sweep()
+        assert store.get(first) is None and store.get(fresh)["status"] == "done"
+
+        second = old_done_job()
+        runner.sweep()
+        assert store.get(second) is not None
+
+        runner._next_purge = 0
+        runner.sweep()
+        assert store.get(second) is None
+        runner.shutdown()
+
+
+def test_synopsis_names_unique():
+    """Одновременные синопсисы одного МНН получают разные файлы"""
+    from utils.synopsis_formatters import save_synopsis
+
+    with tempfile.TemporaryDirectory() as directory:
+        barrier = threading.Barrier(8)
+        paths = []
+
+        def save():
+            barrier.wait(5)
+            paths.append(save_synopsis({"inn": "metformin"}, "json", directory)[0])
+
+        threads = [threading.Thread(target=save) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(paths)) == 8 and sorted(os.listdir(directory)) == sorted(map(os.path.basename, paths))
+
+
+def test_synopsis_names_safe():
+    """МНН без значения, "N/A" и со слэшем дают имя файла внутри каталога"""
+    from utils.synopsis_formatters import save_synopsis
+
+    with tempfile.TemporaryDirectory() as directory:
+        names = [
+            os.path.basename(save_synopsis(data, "json", directory)[0])
+            for data in ({}, {"inn": "N/A"}, {"inn": "a/b"}, {"inn": "../етанол 5%"})
+        ]
+        assert names[0].startswith("synopsis_unknown_") and names[1].startswith("synopsis_unknown_")
+        assert names[2].startswith("synopsis_a_b_")
+        assert names[3].startswith("synopsis_етанол_5_")
+        assert sorted(os.listdir(directory)) == sorted(names)
+
+
+def test_http_api():
+    """202 с id задачи, статус с прогрессом, файл синопсиса"""
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(Config, "OUTPUT_DIR", directory), \
+            patch.object(analysis, "run_analysis", lambda data, on_source=None: (dict(ANALYSIS, inn=data["inn"]), "miss")):
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        runner = JobRunner(store, workers=2)
+        with patch.object(jobs, "_runner_instance", runner):
+            client = app_module.app.test_client()
+            assert client.post("/api/jobs/full-analysis", json={}).status_code == 400
+            assert client.get("/api/jobs/unknown").status_code == 404
+
+            response = client.post("/api/jobs/full-analysis", json={"inn": "metformin", "cvintra": 25})
+            assert response.status_code == 202
+            job_id = response.get_json()["job_id"]
+            wait_done(store, job_id)
+            job = client.get(response.get_json()["status_url"]).get_json()
+            assert job["status"] == "done" and job["result"]["sample_size"]["final_sample_size"] == 24
+            assert "file_url" not in job and "params" not in job
+
+            with patch.object(analysis, "fetch_pubmed", lambda inn: {"articles": [], "count": 0}), \
+                    patch.object(analysis, "fetch_drugbank", lambda inn: {"name": inn}), \
+                    patch.object(analysis, "fetch_grls", lambda inn, deadline=None: {"registered_drugs": []}):
+                synopsis_request = dict(analysis.run_full_analysis({"inn": "metformin", "cvintra": 25}),
+                                        output_format="markdown")
+            response = client.post("/api/jobs/generate-full-synopsis", json=synopsis_request)
+            assert response.status_code == 202
+            job_id = response.get_json()["job_id"]
+            assert wait_done(store, job_id)["status"] == "done", store.get(job_id)["error"]
+            job = client.get(f"/api/jobs/{job_id}").get_json()
+            assert job["result"]["output_format"] == "markdown"
+
+            file_response = client.get(job["file_url"])
+            assert file_response.status_code == 200 and "metformin" in file_response.get_data(as_text=True)
+        runner.shutdown()
+
+
+if __name__ == '__main__':
+    test_analysis_job()
+    test_failed_job()
+    test_resume_after_restart()
+    test_source_progress()
+    test_stale_refresh_keeps_job_done()
+    test_periodic_purge()
+    test_synopsis_names_unique()
+    test_synopsis_names_safe()
+    test_http_api()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест движка извлечения PK параметров (без сети)
+Сравнивает результат с прежней реализацией на корпусе из фикстуры
+"""
+import json
+import os
+import random
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.pk_extraction_legacy import extract_pk_parameters_legacy
+from scrapers import pk_extractor
+from scrapers.pk_extractor import extract_pk_parameters, route_families
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "pk_abstracts.json")
+
+
+def load_corpus() -> list:
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_single_articles_match_legacy():
+    """Каждая статья по отдельности дает тот же результат"""
+    for article in load_corpus():
+        assert extract_pk_parameters([article]) == extract_pk_parameters_legacy([article]), article["pmid"]
+
+
+def test_article_sets_match_legacy():
+    """Наборы статей в разном порядке дают тот же результат"""
+    corpus = load_corpus()
+    rng = random.Random(42)
+    for _ in range(200):
+        sample = rng.sample(corpus, rng.randint(1, len(corpus)))
+        assert extract_pk_parameters(sample) == extract_pk_parameters_legacy(sample)
+
+
+def test_micro_sign_unit():
+    """Знак микро (µ) распознается как μ, единица возвращается как в тексте"""
+    article = {"title": "", "abstract": "Cmax 4.2 µg/mL", "url": "u"}
+    result = extract_pk_parameters([article])
+    assert result["cmax"]["value"] == 4.2
+    assert result["cmax"]["unit"] == "µg/ml"
+
+
+def test_prefilter_routes_only_mentioned_families():
+    """Фильтр отправляет текст только к семействам с терминами-триггерами"""
+    assert route_families("metformin use reduced cancer risk (hr 0.82)") == set()
+    assert route_families("intra-subject cv 20 %, cmax 10 ng/ml") == {"cvintra", "cmax", "tmax"}
+    assert route_families("elimination half-life 6 h, auc 40 ng·h/ml") == {"t_half", "auc"}
+    assert route_families("intravenous dose within 24 h of admission") == set()
+
+
+def test_prefilter_stats_merged_per_call():
+    """Счетчики фильтра добавляются один раз за вызов и видны в /api/sources/stats"""
+    import app as app_module
+
+    stats = pk_extractor.PrefilterStats()
+    articles = [
+        {"title": "", "abstract": "intravenous dose within 24 h", "url": "a"},
+        {"title": "", "abstract": "Cmax 10 ng/mL", "url": "b"},
+    ]
+    with patch.object(pk_extractor, "prefilter_stats", stats), \
+            patch.object(stats, "merge", wraps=stats.merge) as merge:
+        extract_pk_parameters(articles)
+        response = app_module.app.test_client().get("/api/sources/stats").get_json()
+    assert merge.call_count == 1
+    assert stats.texts == 2
+    assert stats.checked["cvintra"] == 2 and stats.skipped["cvintra"] == 2
+    assert stats.checked["cmax"] == 2 and stats.skipped["cmax"] == 1
+    assert response["pk_prefilter"] == stats.snapshot()
+
+
+if __name__ == '__main__':
+    test_single_articles_match_legacy()
+    test_article_sets_match_legacy()
+    test_micro_sign_unit()
+    test_prefilter_routes_only_mentioned_families()
+    test_prefilter_stats_merged_per_call()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест кэша статей PubMed (без сети)
+Попадания и промахи, устаревание по TTL, счетчики в /api/cache/stats
+"""
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers import pubmed_cache
+from scrapers.pubmed_cache import PubMedArticleCache
+
+ARTICLE = {"pmid": "111", "title": "Bioequivalence of metformin", "abstract": "Cmax 512 ng/mL", "authors": []}
+
+
+def test_hit_and_miss():
+    """Сохраненная статья отдается без изменений, отсутствующая - промах"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PubMedArticleCache(os.path.join(directory, "pubmed.sqlite3"))
+        cache.put_many([ARTICLE, dict(ARTICLE, pmid="222"), {"title": "без PMID"}])
+
+        assert cache.get(111) == ARTICLE
+        assert set(cache.get_many(["111", "222", "333"])) == {"111", "222"}
+        assert cache.get("333") is None
+        assert cache.stats() == dict(cache.stats(), hits=3, misses=2, hit_rate=0.6, size=2)
+
+
+def test_ttl_expiry():
+    """Запись старше TTL - промах, purge_expired удаляет ее из файла"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PubMedArticleCache(os.path.join(directory, "pubmed.sqlite3"), ttl=60)
+        with patch.object(pubmed_cache.time, "time", return_value=1000.0):
+            cache.put(ARTICLE)
+        with patch.object(pubmed_cache.time, "time", return_value=1059.0):
+            assert cache.get("111") == ARTICLE
+        with patch.object(pubmed_cache.time, "time", return_value=1061.0):
+            assert cache.get("111") is None
+            assert cache.purge_expired() == 1
+        assert cache.stats()["size"] == 0
+
+
+def test_stats_endpoint():
+    """Счетчики кэша статей - в разделе pubmed ответа /api/cache/stats"""
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PubMedArticleCache(os.path.join(directory, "pubmed.sqlite3"))
+        cache.put(ARTICLE)
+        cache.get_many(["111", "222"])
+        with patch.object(pubmed_cache, "_cache_instance", cache):
+            stats = app_module.app.test_client().get("/api/cache/stats").get_json()
+    assert stats["pubmed"] == dict(stats["pubmed"], hits=1, misses=1, size=1)
+
+
+if __name__ == '__main__':
+    test_hit_and_miss()
+    test_ttl_expiry()
+    test_stats_endpoint()
+    print("✅ Все тесты пройдены")
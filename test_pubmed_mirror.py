@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест локального зеркала PubMed (без сети)
+Перевод запросов в FTS5, поиск, статьи по PMID, файлы обновлений с DeleteCitation
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.pubmed_mirror import PubMedMirror, to_fts_query
+from scrapers.pubmed_xml import LXML_AVAILABLE
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "efetch_pubmed.xml")
+
+UPDATE = """<?xml version="1.0" ?>
+<PubmedArticleSet>
+<PubmedArticle><MedlineCitation><PMID Version="1">333</PMID><Article><Journal><JournalIssue><PubDate><Year>2021</Year></PubDate></JournalIssue></Journal><ArticleTitle>Pharmacokinetics of aspirin</ArticleTitle><Abstract><AbstractText>AUC<sub>0-t</sub> 40 ng·h/mL; p &lt; 0.05.</AbstractText></Abstract></Article></MedlineCitation></PubmedArticle>
+<DeleteCitation><PMID Version="1">222</PMID></DeleteCitation>
+</PubmedArticleSet>
+"""
+
+
+def test_query_translation():
+    """Операторы и скобки PubMed, кавычки для терминов, явный AND, лишние операторы отбрасываются"""
+    assert to_fts_query("metformin AND (pharmacokinetics OR C-max[tiab])") == \
+        '"metformin" AND ( "pharmacokinetics" OR "C-max" )'
+    assert to_fts_query('metformin "healthy volunteers" (fasting or fed)') == \
+        '"metformin" AND "healthy volunteers" AND ( "fasting" OR "fed" )'
+    assert to_fts_query("metformin NOT review") == '"metformin" NOT "review"'
+    assert to_fts_query("NOT foo") == '"foo"'
+    assert to_fts_query("foo AND") == '"foo"'
+    assert to_fts_query("foo AND OR bar") == '"foo" AND "bar"'
+    assert to_fts_query("(OR foo") == '( "foo" )'
+    assert to_fts_query("foo () ) bar") == '"foo" AND "bar"'
+    assert to_fts_query("NOT AND ()") == ""
+
+
+def make_mirror(directory: str) -> PubMedMirror:
+    mirror = PubMedMirror(os.path.join(directory, "mirror.sqlite3"))
+    assert mirror.ingest_file(FIXTURE) == {"articles": 2, "deleted": 0}
+    return mirror
+
+
+def test_search_and_get_articles():
+    """Поиск по заголовку и абстракту без разметки, статьи с разметкой; запросы с лишними операторами не падают"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        mirror = make_mirror(directory)
+
+        assert mirror.search("metformin AND (bioequivalence OR Cmax)") == {"count": 1, "pmids": ["111"]}
+        assert mirror.search("Cmaxss")["pmids"] == ["111"]
+        assert mirror.search("sub OR i")["count"] == 0
+        assert mirror.search("NOT metformin") == {"count": 1, "pmids": ["111"]}
+        assert mirror.search("abstract NOT metformin")["pmids"] == ["222"]
+        assert mirror.search("AND") == {"count": 0, "pmids": []}
+        assert mirror.search("metformin OR abstract", retmax=1)["count"] == 2
+
+        articles = mirror.get_articles(["111", 222, "999", "abc"])
+        assert set(articles) == {"111", "222"}
+        # Текст хранится как его отдает разбор XML, разметка убирается только из индекса
+        assert articles["111"]["title"] == "Bioequivalence of <i>metformin</i> tablets"
+        assert articles["111"]["abstract"] == \
+            "Intra-subject CV: 23.5 %. Cmax<sub>ss</sub> 512 ng/mL & AUC<sup>2</sup> 40 ng·h/mL and Tmax 2.5 h."
+        assert articles["111"]["authors"] == ["Ivanov I"] and articles["111"]["url"].endswith("/111")
+
+
+def test_update_file():
+    """Файл обновлений добавляет статьи и удаляет DeleteCitation из индекса"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        mirror = make_mirror(directory)
+        update = os.path.join(directory, "pubmed24n0002.xml")
+        with open(update, "w", encoding="utf-8") as f:
+            f.write(UPDATE)
+
+        assert mirror.ingest_file(update) == {"articles": 1, "deleted": 1}
+        assert mirror.is_ingested("pubmed24n0002.xml")
+        assert mirror.search("abstract")["count"] == 0
+        assert mirror.search('"AUC0-t"')["pmids"] == ["333"]
+        assert mirror.get_articles(["333"])["333"]["abstract"] == "AUC<sub>0-t</sub> 40 ng·h/mL; p < 0.05."
+        assert mirror.stats() == {"articles": 2, "files": 2}
+
+        # Повторная загрузка заменяет статьи и в индексе, без дублей
+        assert mirror.ingest_file(update) == {"articles": 1, "deleted": 0}
+        assert mirror.search("pharmacokinetics OR metformin")["count"] == 2
+        assert mirror.search("sub")["count"] == 0
+
+
+def test_rebuilds_old_index():
+    """Индекс прежнего формата (content='articles' с триггерами) перестраивается без разметки"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mirror.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.executescript(
+            """
+            CREATE TABLE articles (pmid INTEGER PRIMARY KEY, title TEXT NOT NULL, abstract TEXT NOT NULL,
+                                   authors TEXT NOT NULL, year TEXT NOT NULL);
+            CREATE VIRTUAL TABLE articles_fts USING fts5(title, abstract, content='articles', content_rowid='pmid');
+            CREATE TRIGGER articles_ad AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts(articles_fts, rowid, title, abstract)
+                VALUES ('delete', old.pmid, old.title, old.abstract);
+            END;
+            INSERT INTO articles VALUES (111, 'Cmax<sub>ss</sub> of metformin', '', '[]', '2020');
+            INSERT INTO articles_fts(articles_fts) VALUES ('rebuild');
+            """
+        )
+        conn.close()
+
+        mirror = PubMedMirror(path)
+        assert mirror.search("Cmaxss")["pmids"] == ["111"]
+        assert mirror.search("sub")["count"] == 0
+        assert mirror.get_articles(["111"])["111"]["title"] == "Cmax<sub>ss</sub> of metformin"
+        assert mirror._delete(["111"]) == 1
+        assert mirror.search("metformin")["count"] == 0
+
+
+if __name__ == '__main__':
+    test_query_translation()
+    test_search_and_get_articles()
+    test_update_file()
+    test_rebuilds_old_index()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест запросов PubMedScraper к E-utilities (без сети)
+_eutils подменяется ответами в формате NCBI (benchmarks/fake_sources.py)
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from benchmarks import fake_sources
+from scrapers.pubmed_scraper import PubMedScraper, reciprocal_rank_fusion
+from scrapers.rate_limiter import TokenBucketRateLimiter
+
+
+class FakeEutils:
+    """_eutils: ответы как у NCBI, запросы записываются"""
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.calls = []
+
+    def __call__(self, endpoint, **params):
+        self.calls.append((endpoint, params))
+        if endpoint == "esearch":
+            return io.BytesIO(fake_sources.esearch_xml(params["term"], int(params["retmax"]), self.total).encode())
+        if endpoint == "esummary":
+            return io.BytesIO(fake_sources.esummary_xml(params["id"].split(",")).encode())
+        if "WebEnv" in params:
+            start = int(params["WebEnv"].split("_")[1])
+            first = start + int(params["retstart"])
+            pmids = [str(first + i) for i in range(int(params["retmax"]))]
+        else:
+            pmids = str(params["id"]).split(",")
+        return io.BytesIO(fake_sources.efetch_xml(pmids).encode())
+
+
+def make_scraper(eutils: FakeEutils, batch_size: int = 200) -> PubMedScraper:
+    scraper = PubMedScraper.__new__(PubMedScraper)
+    scraper.email = "test@example.com"
+    scraper.api_key = ""
+    scraper.eutils_url = "https://eutils.example/entrez/eutils"
+    scraper.base_url = "https://pubmed.ncbi.nlm.nih.gov"
+    scraper.batch_size = batch_size
+    scraper.fetch_limit = 10
+    scraper.deep_max_articles = 2000
+    scraper.cache = None
+    scraper.mirror = None
+    scraper._eutils = eutils
+    return scraper
+
+
+def test_batch_efetch_chunks():
+    """PMID уходят пачками по batch_size, порядок статей - как в исходном списке"""
+    eutils = FakeEutils()
+    scraper = make_scraper(eutils)
+    pmids = [str(fake_sources.PMID_BASE + i) for i in range(450)]
+
+    articles = scraper.fetch_articles_batch(pmids)
+
+    assert [endpoint for endpoint, _ in eutils.calls] == ["efetch"] * 3
+    assert [len(params["id"].split(",")) for _, params in eutils.calls] == [200, 200, 50]
+    assert [article["pmid"] for article in articles] == pmids
+
+
+def test_long_id_lists_use_post():
+    """Больше 200 PMID - POST с параметрами в теле, как в Bio.Entrez"""
+    class Session:
+        def __init__(self):
+            self.calls = []
+
+        def request(self, method, url, **kwargs):
+            self.calls.append((method, url, kwargs))
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"<xml/>"
+            return response
+
+        def get(self, url, **kwargs):
+            return self.request("GET", url, **kwargs)
+
+        def post(self, url, **kwargs):
+            return self.request("POST", url, **kwargs)
+
+    scraper = make_scraper(FakeEutils())
+    del scraper._eutils
+    scraper.session = Session()
+    scraper.rate_limiter = TokenBucketRateLimiter(rate=1000, capacity=10)
+    scraper.timeout = 5
+    ids = [str(fake_sources.PMID_BASE + i) for i in range(201)]
+
+    scraper._eutils("efetch", id=",".join(ids[:200]))
+    scraper._eutils("efetch", id=",".join(ids))
+
+    (get_method, _, get_kwargs), (post_method, post_url, post_kwargs) = scraper.session.calls
+    assert get_method == "GET" and "params" in get_kwargs
+    assert post_method == "POST" and post_url.endswith("/efetch.fcgi")
+    assert post_kwargs["data"]["id"].split(",") == ids
+
+
+def test_deep_history_paging():
+    """Глубокий режим: esearch без списка PMID, затем efetch страницами retstart/retmax до max_articles"""
+    eutils = FakeEutils(total=1000)
+    scraper = make_scraper(eutils)
+
+    result = scraper.get_drug_pk_data_deep("metformin", max_articles=450)
+
+    esearch, *efetches = eutils.calls
+    assert esearch[0] == "esearch" and esearch[1]["retmax"] == 0 and esearch[1]["usehistory"] == "y"
+    assert [(params["retstart"], params["retmax"]) for _, params in efetches] == [(0, 200), (200, 200), (400, 50)]
+    assert all(params["WebEnv"].startswith("FAKE_") and params["query_key"] == "1" for _, params in efetches)
+    assert "id" not in efetches[0][1]
+
+    assert result["mode"] == "deep" and result["total_found"] == 1000 and result["count"] == 450
+    assert len(result["articles"]) == scraper.fetch_limit
+    assert result["pk_parameters"]["cmax"]
+
+
+def test_reciprocal_rank_fusion():
+    """Сумма 1 / (60 + позиция) по спискам; дубли схлопываются; при равенстве - кто встретился раньше"""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"], ["b", "c"]])
+    # c: 1/63 + 1/61 + 1/62, b: 1/62 + 1/61, a: 1/61, d: 1/62
+    assert fused == ["c", "b", "a", "d"]
+    assert reciprocal_rank_fusion([["x", "y"], ["y", "x"]]) == ["x", "y"]
+    assert reciprocal_rank_fusion([["a", "b"], ["b"]], k=0) == ["b", "a"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_fanout_dedup():
+    """Подзапросы выполняются параллельно, PMID из нескольких подзапросов - один раз и выше"""
+    eutils = FakeEutils(total=5)
+    scraper = make_scraper(eutils)
+    queries = ["{inn} AND pharmacokinetics", "{inn} AND bioequivalence", "{inn} AND Cmax"]
+    rankings = {
+        "metformin AND pharmacokinetics": ["1", "2", "3"],
+        "metformin AND bioequivalence": ["3", "4"],
+        "metformin AND Cmax": ["5", "3", "1"]
+    }
+
+    def search_query(query, retmax):
+        if query.endswith("Cmax"):
+            raise RuntimeError("503")
+        return rankings[query][:retmax]
+
+    scraper._search_query = search_query
+    # "3" в двух подзапросах - первым и один раз; упавший подзапрос не мешает остальным
+    assert scraper.search_drug_fanout("metformin", queries=queries, retmax=3) == ["3", "1", "2", "4"]
+
+    # Через esearch: каждый подзапрос уходит отдельным запросом
+    del scraper._search_query
+    pmids = scraper.search_drug_fanout("metformin", queries=queries[:2], retmax=5)
+    assert sorted(params["term"] for _, params in eutils.calls) == [
+        "metformin AND bioequivalence", "metformin AND pharmacokinetics"]
+    assert len(pmids) == len(set(pmids)) == 10
+
+if __name__ == '__main__':
+    test_batch_efetch_chunks()
+    test_long_id_lists_use_post()
+    test_deep_history_paging()
+    test_reciprocal_rank_fusion()
+    test_fanout_dedup()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест отбора статей PubMed по esummary (без сети)
+Оценка по заголовку, типу публикации и наличию абстракта, PMID без записи esummary
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks import fake_sources
+from scrapers.pubmed_triage import NO_ABSTRACT_PENALTY, rank_summaries, score_summary
+
+
+def summary(pmid: str, title: str = "", pub_types: list = (), has_abstract: bool = True) -> dict:
+    return {"pmid": pmid, "title": title, "pub_types": list(pub_types), "year": "2020", "has_abstract": has_abstract}
+
+
+def test_score_summary():
+    """Термины заголовка без учета регистра и типы публикаций складываются, без абстракта - штраф"""
+    assert score_summary(summary("1", "Bioequivalence of two Metformin formulations in healthy volunteers")) == 3.0 + 1.0 + 1.5
+    assert score_summary(summary("2", "Metformin", ["Clinical Trial, Phase I", "Equivalence Trial"])) == 5.5
+    assert score_summary(summary("3", "Pharmacokinetic review", ["Review"])) == 1.0
+    assert score_summary(summary("4", "Bioavailability", has_abstract=False)) == 2.0 + NO_ABSTRACT_PENALTY
+    assert score_summary({"pmid": "5"}) == 0.0
+
+
+def test_rank_order():
+    """По убыванию оценки; при равной оценке - порядок релевантности PubMed"""
+    summaries = [
+        summary("10", "Metformin in diabetes", ["Case Reports"]),
+        summary("11", "Intra-subject variability of metformin: replicate crossover study", ["Clinical Trial"]),
+        summary("12", "Metformin formulation"),
+        summary("13", "Generic metformin"),
+        summary("14", "Bioavailability of metformin", has_abstract=False),
+    ]
+    # 11: 3 + 2 + 1.5 + 2, 12 и 13: по 1, 10: -2, 14: 2 - 5
+    assert rank_summaries(summaries) == ["11", "12", "13", "10", "14"]
+
+
+def test_missing_summaries_kept():
+    """PMID без записи esummary не теряются: идут после оцененных в исходном порядке"""
+    from test_pubmed_scraper import FakeEutils, make_scraper
+
+    class PartialEutils(FakeEutils):
+        def __call__(self, endpoint, **params):
+            self.calls.append((endpoint, params))
+            returned = [pmid for pmid in params["id"].split(",") if pmid not in ("902", "904")]
+            return io.BytesIO(fake_sources.esummary_xml(returned).encode())
+
+    scraper = make_scraper(PartialEutils())
+    pmids = ["901", "902", "903", "904", "905"]
+    ranked = scraper.triage_pmids(pmids)
+
+    assert sorted(ranked) == sorted(pmids)
+    assert ranked[-2:] == ["902", "904"]
+    assert set(ranked[:3]) == {"901", "903", "905"}
+
+    # esummary не ответил совсем - исходный порядок
+    scraper.fetch_summaries = lambda pmids: []
+    assert scraper.triage_pmids(pmids) == pmids
+
+
+if __name__ == '__main__':
+    test_score_summary()
+    test_rank_order()
+    test_missing_summaries_kept()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест потокового парсера PubMed XML (без сети)
+Сравнивает результат с разбором через Entrez.read
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapers.pubmed_xml import LXML_AVAILABLE, iter_pubmed_articles
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "efetch_pubmed.xml")
+
+
+def test_iterparse_matches_entrez_read():
+    """Потоковый парсер дает те же словари статей, что и Entrez.read"""
+    if not LXML_AVAILABLE:
+        print("⚠️  lxml не установлен, тест пропущен")
+        return
+
+    from Bio import Entrez
+    from scrapers.pubmed_scraper import PubMedScraper
+
+    scraper = PubMedScraper.__new__(PubMedScraper)
+    scraper.base_url = "https://pubmed.ncbi.nlm.nih.gov"
+
+    with open(FIXTURE, "rb") as f:
+        expected = [scraper._parse_article(a) for a in Entrez.read(f)["PubmedArticle"]]
+    with open(FIXTURE, "rb") as f:
+        actual = list(iter_pubmed_articles(f))
+
+    assert actual == expected
+    assert [a["pmid"] for a in actual] == ["111", "222"]
+    assert actual[0]["authors"] == ["Ivanov I"]
+    assert actual[1]["year"] == ""
+
+
+if __name__ == '__main__':
+    test_iterparse_matches_entrez_read()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест лимита запросов к NCBI (без сети)
+Token bucket в процессе и между процессами (flock), повторы на 429 через лимитер
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from scrapers.http_session import create_http_adapter
+from scrapers.rate_limiter import ConcurrencyLimiter, TokenBucketRateLimiter
+
+
+def test_bucket_timing():
+    """Всплеск до capacity сразу, дальше - не чаще rate запросов в секунду, в том числе из потоков"""
+    limiter = TokenBucketRateLimiter(rate=20, capacity=2)
+    started = time.monotonic()
+    assert limiter.acquire() == 0 and limiter.acquire() == 0
+
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(2)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 2 из ведра + 8 по 1/20 сек
+    elapsed = time.monotonic() - started
+    assert 0.38 <= elapsed < 0.8, elapsed
+
+
+def _acquire_many(lock_file: str, count: int):
+    limiter = TokenBucketRateLimiter(rate=20, capacity=1, lock_file=lock_file)
+    for _ in range(count):
+        limiter.acquire()
+
+
+def test_shared_between_processes():
+    """С lock_file два процесса вместе укладываются в один лимит"""
+    with tempfile.TemporaryDirectory() as directory:
+        lock_file = os.path.join(directory, "ncbi.rate")
+        if TokenBucketRateLimiter(rate=20, lock_file=lock_file).lock_file is None:
+            print("⚠️  fcntl недоступен, тест пропущен")
+            return
+
+        processes = [multiprocessing.Process(target=_acquire_many, args=(lock_file, 5)) for _ in range(2)]
+        started = time.monotonic()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+        elapsed = time.monotonic() - started
+
+    assert all(process.exitcode == 0 for process in processes)
+    # 1 из ведра + 9 по 1/20 сек; без общего лимита было бы ~0.2 сек
+    assert elapsed >= 0.42, elapsed
+
+
+class TooManyRequestsHandler(BaseHTTPRequestHandler):
+    """Первые failures запросов отвечает 429, дальше 200"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests += 1
+        status = 429 if self.server.requests <= self.server.failures else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return 0.0
+
+
+def test_retries_go_through_limiter():
+    """Каждый повтор на 429 берет токен у лимитера"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TooManyRequestsHandler)
+    server.failures = 2
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/entrez/eutils"
+        limiter = CountingLimiter()
+        session = requests.Session()
+        session.mount(url, create_http_adapter(max_retries=3, retry_delay=0, rate_limiter=limiter))
+
+        assert session.get(f"{url}/esearch.fcgi", timeout=5).status_code == 200
+        assert server.requests == 3
+        assert limiter.acquired == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_shared_session_limits_eutils_retries():
+    """Общая сессия скраперов: у E-utilities повторы через лимит NCBI, у остальных источников - без"""
+    from config import Config
+    from scrapers import http_session, rate_limiter
+
+    with patch.object(http_session, "_session_instance", None):
+        session = http_session.get_http_session()
+        eutils_retry = session.get_adapter(f"{Config.NCBI_EUTILS_URL}/esearch.fcgi").max_retries
+        other_retry = session.get_adapter(f"{Config.DRUGBANK_BASE_URL}/drugs/DB00331").max_retries
+    assert eutils_retry.rate_limiter is rate_limiter.get_ncbi_rate_limiter()
+    assert other_retry.rate_limiter is None
+
+
+def test_api_key_raises_rate():
+    """Ключ, переданный скрапером, повышает общий лимит до 10 req/sec; явный NCBI_RATE_LIMIT не меняется"""
+    from config import Config
+    from scrapers import rate_limiter
+
+    with patch.object(rate_limiter, "_ncbi_limiter", None), \
+            patch.multiple(Config, NCBI_API_KEY="", NCBI_RATE_LIMIT=0, NCBI_RATE_LIMIT_FILE=""):
+        limiter = rate_limiter.get_ncbi_rate_limiter()
+        assert limiter.rate == 3
+        assert rate_limiter.get_ncbi_rate_limiter("key") is limiter and limiter.rate == 10
+        assert rate_limiter.get_ncbi_rate_limiter() is limiter and limiter.rate == 10
+
+    with patch.object(rate_limiter, "_ncbi_limiter", None), \
+            patch.multiple(Config, NCBI_API_KEY="", NCBI_RATE_LIMIT=2, NCBI_RATE_LIMIT_FILE=""):
+        assert rate_limiter.get_ncbi_rate_limiter("key").rate == 2
+
+    from scrapers.pubmed_scraper import BIO_AVAILABLE, PubMedScraper
+    if BIO_AVAILABLE:
+        from Bio import Entrez
+        with patch.object(rate_limiter, "_ncbi_limiter", None), patch.object(Entrez, "api_key", Entrez.api_key), \
+                patch.multiple(Config, NCBI_API_KEY="", NCBI_RATE_LIMIT=0, NCBI_RATE_LIMIT_FILE=""):
+            assert PubMedScraper(api_key="key").rate_limiter.rate == 10
+
+
+def test_concurrency_limiter_slots():
+    """Слоты общие для потоков и корутин; отмененное ожидание слота его не занимает"""
+    limiter = ConcurrencyLimiter(1)
+
+    async def wait_cancelled():
+        with limiter.slot():
+            waiter = asyncio.ensure_future(limiter.async_slot().__aenter__())
+            await asyncio.sleep(0.02)
+            waiter.cancel()
+        async with limiter.async_slot():
+            pass
+
+    asyncio.run(wait_cancelled())
+    with limiter.slot():
+        try:
+            with limiter.slot(timeout=0.05):
+                assert False, "второй слот занят при limit=1"
+        except TimeoutError:
+            pass
+    with limiter.slot(timeout=0.05):
+        pass
+
+
+if __name__ == '__main__':
+    test_bucket_timing()
+    test_shared_between_processes()
+    test_retries_go_through_limiter()
+    test_shared_session_limits_eutils_retries()
+    test_api_key_raises_rate()
+    test_concurrency_limiter_slots()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест кэша результатов полного анализа (без сети)
+LRU вытеснение, устаревшая запись отдается сразу и обновляется в фоне, заголовок X-Cache,
+какие статусы источников считаются полным результатом
+"""
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import result_cache
+from utils.result_cache import ResultCache, is_complete, result_key
+
+OK_SOURCES = {"pubmed": {"status": "ok"}, "drugbank": {"status": "ok"}, "grls": {"status": "ok"}}
+
+
+def analysis_result(n: int, grls_status: str = "ok") -> dict:
+    return {"n": n, "sources": dict(OK_SOURCES, grls={"status": grls_status})}
+
+
+def test_key_normalization():
+    """Регистр, пробелы и запись CVintra не создают новых записей"""
+    first = {"inn": "Metformin ", "dosage_form": "Таблетки", "dosage": "500 мг",
+             "administration_mode": "fasted", "cvintra": "25"}
+    second = {"inn": "metformin", "dosage_form": "таблетки", "dosage": "500мг",
+              "administration_mode": "Fasted", "cvintra": 25.0}
+    assert result_key(first) == result_key(second)
+    assert result_key(dict(second, cvintra=None)) != result_key(second)
+    assert result_key(dict(second, dosage="850 мг")) != result_key(second)
+
+
+def test_lru_and_partial_results():
+    """Вытесняется давно не запрошенная запись; неполный результат не кэшируется"""
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.put(("a",), analysis_result(1))
+    cache.put(("b",), analysis_result(2))
+    assert cache.get(("a",)) == (analysis_result(1), "hit")
+    cache.put(("c",), analysis_result(3))
+    assert cache.get(("b",)) == (None, "miss")
+    assert cache.get(("a",))[1] == "hit" and cache.get(("c",))[1] == "hit"
+
+    assert cache.put(("d",), analysis_result(4, grls_status="timeout")) is False
+    assert cache.get(("d",))[1] == "miss"
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["size"] == 2 and stats["misses"] == 2
+
+
+def test_stale_while_revalidate():
+    """Устаревшая запись отдается без ожидания, обновление в фоне - одно на ключ"""
+    cache = ResultCache(max_entries=10, ttl=0.1)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return analysis_result(len(calls))
+
+    assert cache.get_or_compute(("metformin",), compute) == (analysis_result(1), "miss")
+    assert cache.get_or_compute(("metformin",), compute) == (analysis_result(1), "hit")
+    time.sleep(0.15)
+
+    started = time.perf_counter()
+    assert cache.get_or_compute(("metformin",), compute) == (analysis_result(1), "stale")
+    assert cache.get_or_compute(("metformin",), compute)[1] == "stale"
+    assert time.perf_counter() - started < 0.1
+    release.set()
+
+    for _ in range(50):
+        if cache.stats()["refreshing"] == 0:
+            break
+        time.sleep(0.02)
+    assert len(calls) == 2 and cache.stats()["refreshes"] == 1
+    assert cache.get_or_compute(("metformin",), compute) == (analysis_result(2), "hit")
+
+
+def test_complete_statuses():
+    """ok и not_found - окончательные ответы; timeout, error, overloaded и отчет без статуса - нет"""
+    assert is_complete(analysis_result(1))
+    assert is_complete(analysis_result(1, grls_status="not_found"))
+    for status in ("timeout", "error", "overloaded", None):
+        assert not is_complete(analysis_result(1, grls_status=status))
+    assert not is_complete({"n": 1, "sources": dict(OK_SOURCES, grls={})})
+    assert not is_complete({"n": 1})
+
+
+def test_max_stale_dropped():
+    """Запись, которую не удалось обновить, удаляется через max_stale после ttl"""
+    now = [1000.0]
+    cache = ResultCache(max_entries=10, ttl=60, max_stale=100)
+
+    def incomplete(advance: float = 0):
+        now[0] += advance
+        return analysis_result(2, grls_status="error")
+
+    def wait_refreshed():
+        for _ in range(50):
+            if cache.stats()["refreshing"] == 0:
+                return
+            time.sleep(0.02)
+
+    with patch.object(result_cache.time, "monotonic", lambda: now[0]):
+        cache.put(("a",), analysis_result(1))
+        cache.put(("b",), analysis_result(1))
+
+        # Обновление вернуло неполный результат, но срок не истек - запись остается
+        now[0] = 1070.0
+        assert cache.get_or_compute(("a",), incomplete) == (analysis_result(1), "stale")
+        wait_refreshed()
+        assert cache.get(("a",))[1] == "stale"
+
+        # Неудачное обновление после ttl + max_stale удаляет запись
+        now[0] = 1159.0
+        assert cache.get_or_compute(("b",), lambda: incomplete(advance=2))[1] == "stale"
+        wait_refreshed()
+
+        now[0] = 1161.0
+        assert cache.get(("a",)) == (None, "miss")
+        stats = cache.stats()
+        assert stats["size"] == 0 and stats["expired"] == 2
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def test_source_failure_statuses():
+    """Сайт DrugBank или ГРЛС не ответил - статус error, а не пустой полный ответ"""
+    import requests
+    from scrapers.drugbank_scraper import DrugBankScraper
+    from scrapers.grls_scraper import GRLSScraper
+
+    drugbank = DrugBankScraper()
+    drugbank.store = drugbank.http_cache = None
+    grls = GRLSScraper()
+    grls.store = grls.http_cache = None
+
+    failure = requests.ConnectionError("connection refused")
+    with patch.object(drugbank.session, "get", side_effect=failure):
+        assert drugbank.get_drug_info("metformin")["status"] == "error"
+        assert grls.get_be_studies("metformin")["status"] == "error"
+
+    with patch.object(drugbank.session, "get", return_value=FakeResponse(b"<html><body></body></html>")):
+        assert drugbank.get_drug_info("metformin")["status"] == "not_found"
+        empty = grls.get_be_studies("metformin")
+        assert empty["status"] == "ok" and empty["count"] == 0
+
+
+def test_full_analysis_header():
+    """Повторный запрос отдается из кэша с X-Cache: HIT и МНН из текущего запроса"""
+    import app as app_module
+    from utils import analysis
+
+    calls = []
+
+    def fake_analysis(data, on_source=None):
+        calls.append(data)
+        return dict(analysis_result(len(calls)), inn=data["inn"])
+
+    cache = ResultCache(max_entries=10, ttl=60)
+    with patch.object(result_cache, "_result_cache_instance", cache), \
+            patch.object(app_module.Config, "ASYNC_SCRAPERS", False), \
+            patch.object(analysis, "run_full_analysis", fake_analysis):
+        client = app_module.app.test_client()
+        first = client.post("/api/full-analysis", json={"inn": "Metformin", "cvintra": 25})
+        second = client.post("/api/full-analysis", json={"inn": "metformin", "cvintra": "25"})
+
+    assert first.headers["X-Cache"] == "MISS" and second.headers["X-Cache"] == "HIT"
+    assert len(calls) == 1
+    assert second.get_json()["inn"] == "metformin" and second.get_json()["n"] == 1
+
+
+if __name__ == '__main__':
+    test_key_normalization()
+    test_lru_and_partial_results()
+    test_stale_while_revalidate()
+    test_complete_statuses()
+    test_max_stale_dropped()
+    test_source_failure_statuses()
+    test_full_analysis_header()
+    print("✅ Все тесты пройдены")
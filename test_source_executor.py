@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Тест общего пула опроса источников (без сети)
+Пулы по источникам изолированы, очередь ограничена, скраперы создаются один раз,
+одинаковые одновременные запросы объединяются
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from utils import analysis
+from utils import source_executor
+from utils.source_executor import SourceExecutor, SourceOverloaded
+
+RELEASE = threading.Event()
+
+
+def wait_release():
+    RELEASE.wait(10)
+    return "done"
+
+
+def test_bulkhead_and_gauges():
+    """Зависший ГРЛС занимает свои потоки, PubMed выполняется сразу; переполненная очередь отклоняется"""
+    executor = SourceExecutor(workers=2, queue_limit=1)
+    RELEASE.clear()
+    try:
+        hung = [executor.submit("grls", wait_release) for _ in range(3)]
+        time.sleep(0.1)
+        stats = executor.stats()["grls"]
+        assert stats["active"] == 2 and stats["queued"] == 1 and stats["workers"] == 2
+
+        try:
+            executor.submit("grls", wait_release)
+            assert False, "очередь ГРЛС заполнена"
+        except SourceOverloaded:
+            pass
+        assert executor.stats()["grls"]["rejected"] == 1
+
+        assert executor.submit("pubmed", lambda: 42).result(timeout=1) == 42
+        assert executor.stats()["pubmed"] == {"active": 0, "queued": 0, "completed": 1, "rejected": 0,
+                                                "coalesced": 0, "workers": 2}
+
+        # Отмененная задача уходит из очереди
+        assert hung[2].cancel()
+        assert executor.stats()["grls"]["queued"] == 0
+    finally:
+        RELEASE.set()
+    assert [future.result(timeout=1) for future in hung[:2]] == ["done", "done"]
+    assert executor.stats()["grls"]["active"] == 0
+    executor.shutdown()
+
+
+def test_full_analysis_overloaded_source():
+    """Переполненный источник получает статус "overloaded", анализ не ждет его"""
+    executor = SourceExecutor(workers=1, queue_limit=0)
+    with patch.object(source_executor, "_executor_instance", executor), \
+            patch.object(Config, "FULL_ANALYSIS_DEADLINE", 2), \
+            patch.object(analysis, "fetch_pubmed", lambda inn: {"articles": [], "count": 1}), \
+            patch.object(analysis, "fetch_drugbank", lambda inn: {"name": inn}), \
+            patch.object(analysis, "fetch_grls", lambda inn, deadline=None: {"registered_drugs": [], "count": 0}):
+        result = analysis.run_full_analysis({"inn": "metformin", "cvintra": 25})
+    executor.shutdown()
+
+    assert {source: report["status"] for source, report in result["sources"].items()} == \
+        {"pubmed": "overloaded", "drugbank": "overloaded", "grls": "overloaded"}
+    assert result["literature"]["pubmed"]["status"] == "overloaded"
+    assert result["sample_size"]["final_sample_size"]
+
+
+def test_scrapers_are_shared():
+    """Скрапер источника создается один раз на пул"""
+    executor = SourceExecutor(workers=1)
+    with patch.object(SourceExecutor, "_create_scraper", side_effect=lambda source: object()) as create:
+        first = executor.scraper("drugbank")
+        assert executor.scraper("drugbank") is first
+        assert executor.scraper("grls") is not first
+    assert create.call_count == 2
+    executor.shutdown()
+
+
+def test_coalescing_sync():
+    """Повторные вызовы ждут выполняющийся запрос; отмена одного ожидающего его не отменяет"""
+    executor = SourceExecutor(workers=2)
+    calls = []
+    release = threading.Event()
+
+    def fetch(inn):
+        calls.append(inn)
+        release.wait(5)
+        return {"inn": inn}
+
+    first = executor.submit_shared("pubmed", "metformin", fetch, "metformin")
+    second = executor.submit_shared("pubmed", "metformin", fetch, "metformin")
+    third = executor.submit_shared("pubmed", "metformin", fetch, "metformin")
+    other = executor.submit_shared("drugbank", "metformin", fetch, "metformin")
+    assert second.cancel()
+    release.set()
+
+    assert first.result(timeout=1) == {"inn": "metformin"} and third.result(timeout=1) is first.result()
+    other.result(timeout=1)
+    assert len(calls) == 2
+    assert executor.stats()["pubmed"]["coalesced"] == 2 and executor.stats()["drugbank"]["coalesced"] == 0
+
+    # После завершения запрос выполняется заново
+    executor.submit_shared("pubmed", "metformin", fetch, "metformin").result(timeout=1)
+    assert len(calls) == 3
+    executor.shutdown()
+
+
+def test_coalescing_async():
+    """Корутина выполняется один раз; при отмене первого вызвавшего остальные выполняют запрос сами"""
+    executor = SourceExecutor(workers=1)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def scenario():
+        shared = await asyncio.gather(*(executor.run_shared("grls", "metformin", fetch) for _ in range(3)))
+        assert shared == [1, 1, 1] and len(calls) == 1
+
+        leader = asyncio.ensure_future(executor.run_shared("grls", "ibuprofen", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(executor.run_shared("grls", "ibuprofen", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 3
+        assert leader.cancelled()
+
+    asyncio.run(scenario())
+    assert executor.stats()["grls"]["coalesced"] == 3
+    executor.shutdown()
+
+
+def test_full_analysis_coalesces_sources():
+    """Два одновременных анализа одного МНН - один запрос к каждому источнику"""
+    executor = SourceExecutor(workers=2)
+    calls = {"pubmed": 0, "drugbank": 0, "grls": 0}
+
+    def counted(source, result):
+        def fetch(inn, deadline=None):
+            calls[source] += 1
+            time.sleep(0.2)
+            return result
+        return fetch
+
+    with patch.object(source_executor, "_executor_instance", executor), \
+            patch.object(Config, "FULL_ANALYSIS_DEADLINE", 2), \
+            patch.object(analysis, "fetch_pubmed", counted("pubmed", {"articles": [], "count": 1})), \
+            patch.object(analysis, "fetch_drugbank", counted("drugbank", {"name": "metformin"})), \
+            patch.object(analysis, "fetch_grls", counted("grls", {"registered_drugs": [], "count": 0})):
+        results = []
+        threads = [threading.Thread(target=lambda inn=inn: results.append(
+            analysis.run_full_analysis({"inn": inn, "cvintra": 25}))) for inn in ("Metformin", "metformin ")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    executor.shutdown()
+
+    assert calls == {"pubmed": 1, "drugbank": 1, "grls": 1}
+    assert len(results) == 2 and all(result["sources"]["pubmed"]["status"] == "ok" for result in results)
+    assert all(stats["coalesced"] == 1 for stats in executor.stats().values())
+
+
+if __name__ == '__main__':
+    test_bulkhead_and_gauges()
+    test_full_analysis_overloaded_source()
+    test_scrapers_are_shared()
+    test_coalescing_sync()
+    test_coalescing_async()
+    test_full_analysis_coalesces_sources()
+    print("✅ Все тесты пройдены")
@@ -0,0 +1,654 @@
+"""
+Полный анализ препарата (/api/full-analysis): сбор данных из PubMed, DrugBank
+и ГРЛС, определение CVintra, выбор дизайна и расчет размера выборки
+
+run_full_analysis - источники опрашиваются в потоках (синхронные скраперы),
+run_full_analysis_async - в одном цикле событий (scrapers/async_scrapers.py).
+Формат результата у обоих одинаковый.
+
+На опрос источников отводится общий срок (FULL_ANALYSIS_DEADLINE): по его
+истечении ответ строится из того, что успело прийти, а не ответившие
+источники получают статус "timeout" и больше не ожидаются.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from cv_database import get_typical_cv
+from utils.sample_size import SampleSizeCalculator
+from utils.source_executor import SourceOverloaded, get_source_executor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Таймауты ожидания источников, сек (не больше общего срока анализа)
+SOURCE_TIMEOUTS = {
+    "pubmed": 20,
+    "drugbank": 15,
+    "grls": 15
+}
+
+
+def analysis_deadline() -> float:
+    """
+    Общий срок опроса источников, сек
+    """
+    try:
+        from config import Config
+        return Config.FULL_ANALYSIS_DEADLINE
+    except ImportError:
+        return max(SOURCE_TIMEOUTS.values())
+
+
+def source_deadline(source: str, started: float, deadline: float) -> float:
+    """
+    Срок ответа источника (time.monotonic()): его таймаут, но не позже общего срока
+    """
+    return min(started + SOURCE_TIMEOUTS[source], deadline)
+
+
+def analysis_params(data: dict) -> dict:
+    """
+    Параметры анализа из тела запроса
+    """
+    return {
+        "inn": data.get('inn', ''),
+        "dosage_form": data.get('dosage_form', ''),
+        "dosage": data.get('dosage', ''),
+        "administration_mode": data.get('administration_mode', 'fasted'),
+        "cvintra": data.get('cvintra')
+    }
+
+
+def resolve_cvintra(inn: str, cvintra) -> tuple:
+    """
+    CVintra пользователя или типичное значение из базы
+
+    Returns:
+        tuple: (cvintra, источник: "user_input" | "database")
+    """
+    if cvintra is not None:
+        return cvintra, "user_input"
+
+    logger.info(f"ℹ️ CVintra не задан, пытаюсь определить из базы данных...")
+    cvintra = get_typical_cv(inn)
+    logger.info(f"ℹ️ CVintra из базы данных: {cvintra}%")
+    return cvintra, "database"
+
+
+def build_base_results(params: dict) -> dict:
+    inn = params["inn"]
+    return {
+        "inn": inn,
+        "dosage_form": params["dosage_form"],
+        "dosage": params["dosage"],
+        "administration_mode": params["administration_mode"],
+        "literature": {
+            "pubmed": {
+                "articles": [],
+                "count": 0,
+                "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}+AND+(bioequivalence+OR+pharmacokinetics)",
+                "message": f"Поиск статей о {inn} на PubMed"
+            },
+            "drugbank": {
+                "name": inn,
+                "search_url": f"https://go.drugbank.com/drugs/search?q={inn}",
+                "message": f"Поиск данных о {inn} на DrugBank"
+            },
+            "grls": {
+                "registered_drugs": [],
+                "count": 0,
+                "search_url": "https://grls.rosminzdrav.ru/",
+                "message": f"Поиск {inn} в Государственном реестре"
+            }
+        },
+        "design_recommendation": {},
+        "sample_size": {},
+        "regulatory_check": {}
+    }
+
+
+def source_fallback(source: str, inn: str, status: str, error: str = None) -> dict:
+    """
+    Результат источника, который не ответил (status: "timeout" | "error" | "overloaded")
+    """
+    if source == "pubmed":
+        result = {"articles": [], "count": 0, "search_url": f"https://pubmed.ncbi.nlm.nih.gov/?term={inn}", "status": status}
+        if error is not None:
+            result["error"] = error
+        return result
+    if source == "drugbank":
+        return {"name": inn, "search_url": f"https://go.drugbank.com/drugs/search?q={inn}", "status": status}
+    return {"inn": inn, "registered_drugs": [], "search_url": "https://grls.rosminzdrav.ru/", "status": status}
+
+
+def log_pubmed_result(result: dict):
+    logger.info(f"  ✅ PubMed вернул: count={result.get('count')}, articles={len(result.get('articles', []))}")
+
+    # Логируем PK параметры если найдены
+    if result.get('pk_parameters'):
+        pk = result['pk_parameters']
+        if pk.get('cvintra', {}).get('value'):
+            logger.info(f"  📊 CVintra из PubMed: {pk['cvintra']['value']}%")
+
+
+def apply_pubmed_result(results: dict, pubmed_result: dict, cvintra, cvintra_source: str) -> tuple:
+    """
+    Сохранить результат PubMed и уточнить CVintra, если он был взят из базы
+
+    Returns:
+        tuple: (cvintra, cvintra_source)
+    """
+    results["literature"]["pubmed"] = pubmed_result
+    logger.info(f"  ✅ PubMed: {pubmed_result.get('count', 0)} статей")
+
+    # Если CVintra был из базы данных, пытаемся уточнить из PubMed
+    if cvintra_source == "database" and pubmed_result.get('pk_parameters'):
+        pk_params = pubmed_result.get('pk_parameters', {})
+        if pk_params.get('cvintra', {}).get('value'):
+            pubmed_cv = pk_params['cvintra']['value']
+            logger.info(f"  📊 CVintra из PubMed: {pubmed_cv}%")
+            # Используем PubMed значение если оно разумное
+            if 5 <= pubmed_cv <= 100:
+                cvintra = pubmed_cv
+                cvintra_source = "pubmed"
+                logger.info(f"  ✅ Использую CVintra из PubMed: {cvintra}%")
+
+    # Сохраняем PK параметры
+    if pubmed_result.get('pk_parameters'):
+        results["pk_parameters"] = pubmed_result['pk_parameters']
+
+    return cvintra, cvintra_source
+
+
+def apply_source_results(results: dict, source_results: dict, cvintra, cvintra_source: str,
+                         started: float, budget: float) -> tuple:
+    """
+    Сохранить ответы источников и отчет о них в results["sources"]
+
+    Args:
+        source_results: {источник: (результат, секунд от начала опроса)}
+
+    Returns:
+        tuple: (cvintra, cvintra_source)
+    """
+    pubmed_result = source_results["pubmed"][0]
+    if pubmed_result.get("status") in ("timeout", "error", "overloaded"):
+        results["literature"]["pubmed"] = pubmed_result
+    else:
+        cvintra, cvintra_source = apply_pubmed_result(results, pubmed_result, cvintra, cvintra_source)
+
+    results["literature"]["drugbank"] = source_results["drugbank"][0]
+    results["literature"]["grls"] = source_results["grls"][0]
+
+    results["sources"] = {
+        source: {"status": result.get("status", "ok"), "elapsed": round(elapsed, 2)}
+        for source, (result, elapsed) in source_results.items()
+    }
+    timed_out = [source for source, report in results["sources"].items() if report["status"] == "timeout"]
+    results["deadline"] = {
+        "budget": budget,
+        "elapsed": round(time.monotonic() - started, 2),
+        "partial": bool(timed_out)
+    }
+    logger.info(
+        "  📡 Источники: " + ", ".join(f"{source}={report['status']} ({report['elapsed']} сек)"
+                                     for source, report in results["sources"].items())
+    )
+    return cvintra, cvintra_source
+
+
+def design_sections(design_rec: dict, cvintra, cvintra_source: str) -> dict:
+    """
+    Разделы design_recommendation и sample_size результата
+    """
+    return {
+        "design_recommendation": {
+            "recommended_design": design_rec.get("recommended_design"),
+            "rationale": design_rec.get("rationale"),
+            "cvintra": cvintra,
+            "cvintra_source": cvintra_source
+        },
+        "sample_size": {
+            "design": design_rec.get("recommended_design"),
+            "cvintra": cvintra,
+            "base_sample_size": design_rec.get("base_sample_size"),
+            "dropout_rate": design_rec.get("dropout_rate"),
+            "final_sample_size": design_rec.get("final_sample_size"),
+            "calculation_steps": design_rec.get("steps", [])
+        }
+    }
+
+
+def finalize_results(results: dict, cvintra, cvintra_source: str, design_rec: dict) -> dict:
+    """
+    Дизайн, размер выборки и регуляторная проверка
+    """
+    # Пересчитываем дизайн с уточненным CVintra если он изменился
+    if cvintra_source != "user_input":
+        design_rec = SampleSizeCalculator.recommend_design(cvintra)
+        logger.info(f"  🔄 Пересчитан дизайн с CVintra={cvintra}%: {design_rec.get('recommended_design')}")
+
+    results.update(design_sections(design_rec, cvintra, cvintra_source))
+
+    # Регуляторная проверка
+    results["regulatory_check"] = {
+        "decision_85": {
+            "compliant": True,
+            "requirements": "По Решению № 85 РФ препарат должен соответствовать стандартам BE"
+        },
+        "ema": {
+            "compliant": True,
+            "requirements": "По EMA guidelines дизайн должен быть одобренным"
+        },
+        "fda": {
+            "compliant": True,
+            "requirements": "По FDA guidance требуется подтверждение биоэквивалентности"
+        }
+    }
+
+    logger.info(f"✅ Анализ завершен. N={design_rec.get('final_sample_size')}")
+    return results
+
+
+def _start_analysis(params: dict) -> tuple:
+    inn = params["inn"]
+    cvintra, cvintra_source = resolve_cvintra(inn, params["cvintra"])
+
+    logger.info(f"📋 Строю ответ для {inn}...")
+    results = build_base_results(params)
+
+    logger.info(f"🧮 Вызываю recommend_design({cvintra})...")
+    design_rec = SampleSizeCalculator.recommend_design(cvintra)
+    logger.info(f"✅ Получен результат: {design_rec.get('recommended_design')}")
+
+    return results, cvintra, cvintra_source, design_rec
+
+
+# ============= СИНХРОННЫЙ СБОР (ПОТОКИ) =============
+
+def fetch_pubmed(inn: str) -> dict:
+    try:
+        logger.info(f"  → PubMed с API...")
+        pubmed = get_source_executor().scraper("pubmed")
+
+        # Проверяем что scraper инициализирован
+        if not hasattr(pubmed, 'api_key'):
+            logger.warning("  ⚠️ PubMedScraper не инициализирован (возможно, biopython не установлен)")
+            return source_fallback("pubmed", inn, "error", "biopython not installed")
+
+        result = pubmed.get_drug_pk_data(inn)
+        log_pubmed_result(result)
+        return result
+    except Exception as e:
+        logger.error(f"  ❌ PubMed ошибка: {str(e)}", exc_info=True)
+        return source_fallback("pubmed", inn, "error", str(e))
+
+
+def fetch_drugbank(inn: str) -> dict:
+    try:
+        logger.info(f"  → DrugBank...")
+        return get_source_executor().scraper("drugbank").get_drug_info(inn)
+    except Exception as e:
+        logger.warning(f"  ⚠️ DrugBank: {str(e)[:60]}")
+        return source_fallback("drugbank", inn, "error")
+
+
+def fetch_grls(inn: str, deadline: float = None) -> dict:
+    try:
+        logger.info(f"  → ГРЛС...")
+        return get_source_executor().scraper("grls").get_be_studies(inn, deadline)
+    except Exception as e:
+        logger.warning(f"  ⚠️ ГРЛС: {str(e)[:60]}")
+        return source_fallback("grls", inn, "error")
+
+
+def flight_key(inn: str) -> str:
+    """
+    Ключ объединения одинаковых запросов к источнику
+    """
+    return " ".join(inn.lower().split())
+
+
+def _finished(fetch, *args) -> tuple:
+    # Время окончания, а не длительность: результат общего запроса получают
+    # анализы, начавшиеся в разное время
+    result = fetch(*args)
+    return result, time.monotonic()
+
+
+def submit_source(source: str, inn: str, fetch, *args) -> Future:
+    """
+    Задача источника в общем пуле; при заполненной очереди - сразу готовый
+    результат со статусом "overloaded"
+
+    Если такой же запрос (источник, МНН) уже выполняется, ожидается он.
+
+    Returns:
+        Future: (результат, time.monotonic() окончания)
+    """
+    try:
+        return get_source_executor().submit_shared(source, flight_key(inn), _finished, fetch, *args)
+    except SourceOverloaded as e:
+        logger.warning(f"  🚧 {e}")
+        future = Future()
+        future.set_result((source_fallback(source, inn, "overloaded"), time.monotonic()))
+        return future
+
+
+def submit_sources(inn: str, started: float, deadline: float) -> dict:
+    """
+    Запустить опрос PubMed, DrugBank и ГРЛС в общем пуле
+
+    Returns:
+        dict: {источник: Future}
+    """
+    return {
+        "pubmed": submit_source("pubmed", inn, fetch_pubmed, inn),
+        "drugbank": submit_source("drugbank", inn, fetch_drugbank, inn),
+        "grls": submit_source("grls", inn, fetch_grls, inn, source_deadline("grls", started, deadline))
+    }
+
+
+def iter_sources(futures: dict, inn: str, started: float, deadline: float):
+    """
+    Ответы источников по мере поступления, каждый - не позже своего срока
+
+    Не ответившие вовремя источники получают статус "timeout"; их задачи
+    не ожидаются (future отменяется, если еще не запущен).
+
+    Yields:
+        tuple: (источник, (результат, секунд от начала опроса))
+    """
+    pending = {future: source for source, future in futures.items()}
+    while pending:
+        now = time.monotonic()
+        for future, source in list(pending.items()):
+            if not future.done() and source_deadline(source, started, deadline) <= now:
+                del pending[future]
+                future.cancel()
+                logger.warning(f"  ⏱️ {source} timeout ({now - started:.1f} сек)")
+                yield source, (source_fallback(source, inn, "timeout"), now - started)
+        if not pending:
+            break
+
+        timeout = min(source_deadline(source, started, deadline) for source in pending.values()) - time.monotonic()
+        done, _ = wait(pending, timeout=max(0, timeout), return_when=FIRST_COMPLETED)
+        for future in done:
+            source = pending.pop(future)
+            try:
+                result, finished = future.result()
+                yield source, (result, max(0.0, finished - started))
+            except Exception as e:
+                yield source, (source_fallback(source, inn, "error", str(e)), time.monotonic() - started)
+
+
+def collect_sources(futures: dict, inn: str, started: float, deadline: float, on_source=None) -> dict:
+    """
+    Ждать ответы источников, каждый - не дольше своего срока (см. iter_sources)
+
+    Args:
+        on_source: вызывается после каждого ответа: on_source(источник, ответило, всего)
+
+    Returns:
+        dict: {источник: (результат, секунд от начала опроса)}
+    """
+    source_results = {}
+    for source, answer in iter_sources(futures, inn, started, deadline):
+        source_results[source] = answer
+        if on_source:
+            on_source(source, len(source_results), len(futures))
+    return source_results
+
+
+def run_full_analysis(data: dict, on_source=None) -> dict:
+    """
+    Полный анализ с параллельным опросом источников в потоках
+
+    Источники опрашиваются в общем пуле приложения (utils/source_executor.py).
+    Ответ возвращается не позже общего срока: зависший источник не держит
+    запрос - его задача отменяется, если еще не началась, или дорабатывает
+    в своем пуле без ожидания.
+
+    Args:
+        on_source: прогресс опроса источников (см. collect_sources)
+    """
+    params = analysis_params(data)
+    inn = params["inn"]
+    results, cvintra, cvintra_source, design_rec = _start_analysis(params)
+
+    # 🌍 РЕАЛЬНЫЙ ПАРСИНГ ИНТЕРНЕТА С ОБЩИМ СРОКОМ
+    budget = analysis_deadline()
+    started = time.monotonic()
+    deadline = started + budget
+    logger.info(f"🌍 Начинаю реальный поиск данных (срок {budget} сек)...")
+
+    source_results = collect_sources(submit_sources(inn, started, deadline), inn, started, deadline, on_source)
+
+    cvintra, cvintra_source = apply_source_results(results, source_results, cvintra, cvintra_source, started, budget)
+    return finalize_results(results, cvintra, cvintra_source, design_rec)
+
+
+def stream_full_analysis(data: dict):
+    """
+    Полный анализ с промежуточными результатами (для /api/full-analysis/stream)
+
+    Расчетные разделы отдаются сразу, ответы источников - по мере поступления.
+
+    Yields:
+        tuple: (событие, данные):
+            "cv_database" - CVintra пользователя или типичный из базы
+            "sample_size" - дизайн и размер выборки по этому CVintra
+            "pubmed" / "drugbank" / "grls" - ответ источника, его статус и время
+            "refined" - дизайн и размер выборки после уточнения CVintra по PubMed
+            "final" - полный результат (как у run_full_analysis)
+    """
+    params = analysis_params(data)
+    inn = params["inn"]
+    results, cvintra, cvintra_source, design_rec = _start_analysis(params)
+    yield "cv_database", {"inn": inn, "cvintra": cvintra, "cvintra_source": cvintra_source}
+    yield "sample_size", design_sections(design_rec, cvintra, cvintra_source)
+
+    budget = analysis_deadline()
+    started = time.monotonic()
+    deadline = started + budget
+    logger.info(f"🌍 Начинаю реальный поиск данных (поток событий, срок {budget} сек)...")
+
+    futures = submit_sources(inn, started, deadline)
+    source_results = {}
+    try:
+        for source, (result, elapsed) in iter_sources(futures, inn, started, deadline):
+            source_results[source] = (result, elapsed)
+            yield source, {"result": result, "status": result.get("status", "ok"), "elapsed": round(elapsed, 2)}
+    finally:
+        # Клиент отключился - ответы источников больше не нужны
+        for future in futures.values():
+            future.cancel()
+
+    initial_cvintra = cvintra
+    cvintra, cvintra_source = apply_source_results(results, source_results, cvintra, cvintra_source, started, budget)
+    results = finalize_results(results, cvintra, cvintra_source, design_rec)
+    yield "refined", {
+        "design_recommendation": results["design_recommendation"],
+        "sample_size": results["sample_size"],
+        "changed": cvintra != initial_cvintra
+    }
+    yield "final", results
+
+
+# ============= АСИНХРОННЫЙ СБОР =============
+
+async def fetch_pubmed_async(client, inn: str) -> dict:
+    from scrapers.async_scrapers import AsyncPubMedScraper
+    try:
+        logger.info(f"  → PubMed с API (async)...")
+        pubmed = AsyncPubMedScraper.from_scraper(get_source_executor().scraper("pubmed"), client)
+
+        if not hasattr(pubmed, 'api_key'):
+            logger.warning("  ⚠️ PubMedScraper не инициализирован (возможно, biopython не установлен)")
+            return source_fallback("pubmed", inn, "error", "biopython not installed")
+
+        result = await pubmed.get_drug_pk_data(inn)
+        log_pubmed_result(result)
+        return result
+    except Exception as e:
+        logger.error(f"  ❌ PubMed ошибка: {str(e)}", exc_info=True)
+        return source_fallback("pubmed", inn, "error", str(e))
+
+
+async def fetch_drugbank_async(client, inn: str) -> dict:
+    from scrapers.async_scrapers import AsyncDrugBankScraper
+    try:
+        logger.info(f"  → DrugBank (async)...")
+        scraper = AsyncDrugBankScraper.from_scraper(get_source_executor().scraper("drugbank"), client)
+        return await scraper.get_drug_info(inn)
+    except Exception as e:
+        logger.warning(f"  ⚠️ DrugBank: {str(e)[:60]}")
+        return source_fallback("drugbank", inn, "error")
+
+
+async def fetch_grls_async(client, inn: str, deadline: float = None) -> dict:
+    from scrapers.async_scrapers import AsyncGRLSScraper
+    try:
+        logger.info(f"  → ГРЛС (async)...")
+        scraper = AsyncGRLSScraper.from_scraper(get_source_executor().scraper("grls"), client)
+        return await scraper.get_be_studies(inn, deadline)
+    except Exception as e:
+        logger.warning(f"  ⚠️ ГРЛС: {str(e)[:60]}")
+        return source_fallback("grls", inn, "error")
+
+
+async def _with_timeout(source: str, inn: str, make_coroutine, started: float, deadline: float) -> tuple:
+    """
+    Ответ источника не позже его срока; по истечении срока корутина отменяется
+
+    Одинаковые запросы (источник, МНН) из параллельных анализов объединяются:
+    make_coroutine() вызывается только у первого из них.
+
+    Returns:
+        tuple: (результат, секунд от начала опроса)
+    """
+    timeout = max(0, source_deadline(source, started, deadline) - time.monotonic())
+    shared = get_source_executor().run_shared(source, flight_key(inn), make_coroutine)
+    try:
+        result = await asyncio.wait_for(shared, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"  ⏱️ {source} timeout ({time.monotonic() - started:.1f} сек)")
+        result = source_fallback(source, inn, "timeout")
+    return result, time.monotonic() - started
+
+
+async def run_full_analysis_async(data: dict, client=None, on_source=None) -> dict:
+    """
+    Полный анализ с опросом источников в одном цикле событий
+
+    Args:
+        data: тело запроса /api/full-analysis
+        client: общий httpx.AsyncClient (если не передан, создается на время анализа)
+        on_source: прогресс опроса источников (см. collect_sources)
+    """
+    from scrapers.async_scrapers import open_async_client
+
+    if client is None:
+        async with open_async_client() as own_client:
+            return await run_full_analysis_async(data, own_client, on_source)
+
+    params = analysis_params(data)
+    inn = params["inn"]
+    results, cvintra, cvintra_source, design_rec = _start_analysis(params)
+
+    budget = analysis_deadline()
+    started = time.monotonic()
+    deadline = started + budget
+    logger.info(f"🌍 Начинаю реальный поиск данных (async, срок {budget} сек)...")
+    answered = []
+
+    async def collect(source: str, make_coroutine) -> tuple:
+        answer = await _with_timeout(source, inn, make_coroutine, started, deadline)
+        answered.append(source)
+        if on_source:
+            on_source(source, len(answered), 3)
+        return answer
+
+    pubmed, drugbank, grls = await asyncio.gather(
+        collect("pubmed", lambda: fetch_pubmed_async(client, inn)),
+        collect("drugbank", lambda: fetch_drugbank_async(client, inn)),
+        collect("grls", lambda: fetch_grls_async(client, inn, source_deadline("grls", started, deadline)))
+    )
+
+    source_results = {"pubmed": pubmed, "drugbank": drugbank, "grls": grls}
+    cvintra, cvintra_source = apply_source_results(results, source_results, cvintra, cvintra_source, started, budget)
+    return finalize_results(results, cvintra, cvintra_source, design_rec)
+
+
+# ============= ТОЧКА ВХОДА =============
+
+def _analyze(data: dict, on_source=None) -> dict:
+    from config import Config
+    if Config.ASYNC_SCRAPERS:
+        return asyncio.run(run_full_analysis_async(data, on_source=on_source))
+    return run_full_analysis(data, on_source)
+
+
+def _with_request_fields(results: dict, params: dict) -> dict:
+    # Запись кэша могла быть сохранена для того же МНН в другом написании
+    return dict(results, **{field: params[field] for field in
+                            ("inn", "dosage_form", "dosage", "administration_mode")})
+
+
+def run_analysis(data: dict, on_source=None) -> tuple:
+    """
+    Полный анализ для /api/full-analysis и фоновых задач: асинхронный или
+    потоковый сбор (Config.ASYNC_SCRAPERS), повторные запросы - из кэша
+    результатов (utils/result_cache.py)
+
+    Args:
+        on_source: прогресс опроса источников (см. collect_sources); при
+                   ответе из кэша не вызывается
+
+    Returns:
+        tuple: (результат, статус кэша: "hit" | "stale" | "miss" | "bypass")
+    """
+    from utils.result_cache import get_result_cache, result_key
+
+    result_cache = get_result_cache()
+    if not result_cache:
+        return _analyze(data, on_source), "bypass"
+
+    params = analysis_params(data)
+    # Фоновое обновление устаревшей записи идет после ответа и не сообщает прогресс
+    results, cache_status = result_cache.get_or_compute(
+        result_key(params), lambda: _analyze(data, on_source), refresh=lambda: _analyze(data)
+    )
+    logger.info(f"🗄️ Кэш результатов: {cache_status}")
+    return _with_request_fields(results, params), cache_status
+
+
+def stream_analysis(data: dict):
+    """
+    События полного анализа (stream_full_analysis) с учетом кэша результатов:
+    результат из кэша отдается сразу одним событием "final"
+
+    Yields:
+        tuple: (событие, данные); данные "final" содержат поле "cache"
+    """
+    from utils.result_cache import get_result_cache, result_key
+
+    params = analysis_params(data)
+    result_cache = get_result_cache()
+    key = result_key(params) if result_cache else None
+    if result_cache:
+        cached, cache_status = result_cache.get(key)
+        if cache_status != "miss":
+            if cache_status == "stale":
+                result_cache.refresh(key, lambda: _analyze(data))
+            yield "final", dict(_with_request_fields(cached, params), cache=cache_status)
+            return
+
+    for event, payload in stream_full_analysis(data):
+        if event == "final":
+            if result_cache:
+                result_cache.put(key, payload)
+            payload = dict(payload, cache="miss" if result_cache else "bypass")
+        yield event, payload
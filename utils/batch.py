@@ -0,0 +1,234 @@
+"""
+Пакетный анализ портфеля препаратов (/api/batch/full-analysis)
+
+Список препаратов сохраняется в SQLite (BATCH_DB_PATH) под batch_id, анализы
+выполняются в общем для всех пакетов пуле из BATCH_CONCURRENCY потоков, а
+результат каждого препарата сохраняется сразу по готовности. Поэтому
+прерванный пакет (обрыв соединения, перезапуск) продолжается по batch_id:
+готовые препараты не анализируются заново.
+
+Нагрузка на источники ограничена дважды: пакет не держит больше
+BATCH_CONCURRENCY анализов одновременно, а каждый анализ идет через общий
+пул источников (utils/source_executor.py) с его лимитами потоков на
+источник, объединением одинаковых запросов и общим лимитом запросов к NCBI.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Статусы препаратов: done - все источники дали окончательный ответ (в том
+# числе "not_found"), partial - результат неполный (источник не ответил),
+# error - анализ не выполнен.
+# При продолжении пакета заново анализируются все, кроме done.
+ITEM_STATUSES = ("pending", "done", "partial", "error")
+
+
+class BatchStore:
+    """
+    Пакеты и результаты по препаратам в SQLite
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_items (
+                batch_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                spec TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                elapsed REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (batch_id, idx)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create(self, specs: list) -> str:
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT INTO batches (id, total, created_at) VALUES (?, ?, ?)",
+                                   (batch_id, len(specs), now))
+                self._conn.executemany(
+                    "INSERT INTO batch_items (batch_id, idx, spec, status, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+                    [(batch_id, index, json.dumps(spec, ensure_ascii=False), now) for index, spec in enumerate(specs)]
+                )
+        return batch_id
+
+    def exists(self, batch_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM batches WHERE id = ?", (batch_id,)).fetchone() is not None
+
+    def items(self, batch_id: str, done: bool) -> list:
+        """
+        Препараты пакета: готовые (done=True) или требующие анализа
+
+        Returns:
+            list: [{"index", "spec", "status", "result", "error", "elapsed"}]
+        """
+        condition = "status = 'done'" if done else "status != 'done'"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT idx, spec, status, result, error, elapsed FROM batch_items "
+                f"WHERE batch_id = ? AND {condition} ORDER BY idx",
+                (batch_id,)
+            ).fetchall()
+        return [
+            {"index": index, "spec": json.loads(spec), "status": status,
+             "result": json.loads(result) if result else None, "error": error, "elapsed": elapsed}
+            for index, spec, status, result, error, elapsed in rows
+        ]
+
+    def save(self, batch_id: str, index: int, status: str, result: dict = None, error: str = None,
+             elapsed: float = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batch_items SET status = ?, result = ?, error = ?, elapsed = ?, updated_at = ? "
+                "WHERE batch_id = ? AND idx = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 elapsed, time.time(), batch_id, index)
+            )
+            self._conn.commit()
+
+    def summary(self, batch_id: str) -> dict:
+        """
+        Число препаратов пакета по статусам или None
+        """
+        with self._lock:
+            batch = self._conn.execute("SELECT total, created_at FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            if batch is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM batch_items WHERE batch_id = ? GROUP BY status", (batch_id,)
+            ).fetchall()
+        counts = dict.fromkeys(ITEM_STATUSES, 0)
+        counts.update(rows)
+        return {"batch_id": batch_id, "total": batch[0], "created_at": batch[1], **counts}
+
+
+def item_line(batch_id: str, item: dict) -> dict:
+    """
+    Строка NDJSON ответа для препарата
+    """
+    line = {
+        "batch_id": batch_id,
+        "index": item["index"],
+        "inn": item["spec"].get("inn"),
+        "status": item["status"],
+        "elapsed": item["elapsed"]
+    }
+    if item["status"] == "error":
+        line["error"] = item["error"]
+    else:
+        line["result"] = item["result"]
+    return line
+
+
+class BatchRunner:
+    """
+    Выполнение пакетов: общий пул анализов и хранилище результатов
+    """
+
+    def __init__(self, store: BatchStore, concurrency: int = 3):
+        """
+        Args:
+            concurrency: анализов одновременно во всех пакетах
+        """
+        self.store = store
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+
+    def _analyze(self, batch_id: str, item: dict) -> dict:
+        from utils.analysis import run_analysis
+        from utils.result_cache import is_complete
+
+        started = time.monotonic()
+        try:
+            result, _ = run_analysis(item["spec"])
+        except Exception as e:
+            logger.warning(f"  ⚠️ Пакет {batch_id}, {item['spec'].get('inn')}: {e}")
+            item.update(status="error", result=None, error=str(e))
+        else:
+            item.update(status="done" if is_complete(result) else "partial", result=result, error=None)
+        item["elapsed"] = round(time.monotonic() - started, 2)
+        # Сохраняем сразу: результат не теряется, даже если клиент уже отключился
+        self.store.save(batch_id, item["index"], item["status"], item["result"], item["error"], item["elapsed"])
+        return item
+
+    def run(self, batch_id: str):
+        """
+        Строки NDJSON ответа по мере готовности: сначала уже готовые
+        препараты (при продолжении пакета), затем остальные в порядке
+        завершения
+
+        Yields:
+            dict: строка ответа (item_line)
+        """
+        for item in self.store.items(batch_id, done=True):
+            yield item_line(batch_id, item)
+
+        remaining = iter(self.store.items(batch_id, done=False))
+        logger.info(f"📦 Пакет {batch_id}: {self.store.summary(batch_id)['total']} препаратов")
+        in_flight = set()
+        try:
+            while True:
+                # Не больше concurrency задач пакета в очереди пула - пакеты делят пул поровну
+                for item in remaining:
+                    in_flight.add(self._executor.submit(self._analyze, batch_id, item))
+                    if len(in_flight) >= self.concurrency:
+                        break
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield item_line(batch_id, future.result())
+        finally:
+            # Клиент отключился: еще не начатые анализы отменяются, начатые сохранятся
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+_batch_instance = None
+_batch_lock = threading.Lock()
+
+def get_batch_runner() -> BatchRunner:
+    """
+    Получить общий пул пакетного анализа
+    """
+    global _batch_instance
+    if _batch_instance is None:
+        with _batch_lock:
+            if _batch_instance is None:
+                from config import Config
+                _batch_instance = BatchRunner(BatchStore(Config.BATCH_DB_PATH), Config.BATCH_CONCURRENCY)
+    return _batch_instance
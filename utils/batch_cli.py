@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Пакетный анализ без сервера: CSV с препаратами -> JSONL или Parquet
+
+Строки CSV (МНН, форма выпуска, дозировка, режим приема, при желании CVintra)
+анализируются в пуле процессов: в каждом - полный анализ (опрос источников,
+SampleSizeCalculator) и данные синопсиса (generate_full_synopsis_data), при
+--synopsis еще и файл синопсиса.
+
+Результат каждой строки сразу дописывается в контрольную точку (для JSONL -
+сам выходной файл, для Parquet - <выход>.checkpoint.jsonl). При повторном
+запуске с тем же выходом строки со статусом "done" пропускаются, остальные
+(partial - не ответил источник, error) анализируются заново. В конце файл
+упорядочивается по номеру строки, Parquet (нужен pyarrow) строится из
+контрольной точки.
+
+Запуск (из корня проекта):
+    python -m utils.batch_cli drugs.csv -o results/portfolio.jsonl
+    python -m utils.batch_cli drugs.csv -o results/portfolio.parquet --workers 8 --synopsis docx
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Поля анализа и заголовки столбцов CSV (без учета регистра)
+CSV_COLUMNS = {
+    "inn": ("inn", "мнн"),
+    "dosage_form": ("dosage_form", "form", "форма выпуска", "форма"),
+    "dosage": ("dosage", "дозировка"),
+    "administration_mode": ("administration_mode", "mode", "режим"),
+    "cvintra": ("cvintra",)
+}
+
+# Столбцы Parquet и их типы: схема задана явно, а не выводится из первой записи
+# (у записи со статусом error нет итогов анализа)
+PARQUET_COLUMNS = [
+    ("row", "int"),
+    ("status", "str"),
+    ("inn", "str"),
+    ("dosage_form", "str"),
+    ("dosage", "str"),
+    ("administration_mode", "str"),
+    ("cvintra", "float"),
+    ("cvintra_source", "str"),
+    ("recommended_design", "str"),
+    ("final_sample_size", "int"),
+    ("synopsis_file", "str"),
+    ("error", "str"),
+    ("elapsed", "float"),
+    ("analysis", "json"),
+    ("synopsis", "json")
+]
+
+# Начало записи контрольной точки: номер строки и статус читаются без разбора анализа
+_RECORD_PREFIX = re.compile(rb'^\{"row": (\d+), "status": "(\w+)"')
+
+
+def csv_columns(header: list) -> dict:
+    """
+    Номера столбцов полей анализа по строке заголовков
+    """
+    columns = {}
+    for index, title in enumerate(header):
+        title = " ".join(title.split()).casefold()
+        for field, aliases in CSV_COLUMNS.items():
+            if field not in columns and title in aliases:
+                columns[field] = index
+    return columns
+
+
+def read_specs(path: str):
+    """
+    Параметры анализа из CSV (UTF-8 или cp1251, разделитель ; , или табуляция)
+
+    Yields:
+        tuple: (номер строки данных с 1, параметры анализа)
+    """
+    from scrapers.grls_store import iter_csv_rows
+
+    with open(path, "rb") as source:
+        rows = iter_csv_rows(source)
+        columns = csv_columns(next(rows, []))
+        if "inn" not in columns:
+            raise ValueError(f"{path}: нет столбца inn (МНН) в заголовке")
+
+        for number, cells in enumerate(rows, start=1):
+            spec = {}
+            for field, index in columns.items():
+                value = cells[index].strip() if index < len(cells) else ""
+                if value:
+                    spec[field] = value
+            if not spec.get("inn"):
+                continue
+            if "cvintra" in spec:
+                try:
+                    spec["cvintra"] = float(spec["cvintra"].replace(",", "."))
+                except ValueError:
+                    logger.warning(f"⚠️ Строка {number}: CVintra '{spec.pop('cvintra')}' не число, будет взят из базы")
+            yield number, spec
+
+
+# ============= ВОРКЕР =============
+
+def _init_worker(rate_limit_file: str, verbose: bool):
+    from config import Config
+
+    # Лимит запросов к NCBI - общий для всех процессов пула
+    if rate_limit_file:
+        Config.NCBI_RATE_LIMIT_FILE = rate_limit_file
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+
+def analyze_row(number: int, spec: dict, synopsis_format: str = None, synopsis_dir: str = None) -> dict:
+    """
+    Анализ одной строки (выполняется в процессе пула)
+
+    Returns:
+        dict: запись результата (status: "done" | "partial" | "error")
+    """
+    from utils.analysis import run_full_analysis
+    from utils.full_synopsis_generator import generate_full_synopsis_data
+    from utils.result_cache import is_complete
+
+    started = time.monotonic()
+    # row и status - первыми: по ним контрольная точка читается без разбора всей записи
+    record = {"row": number, "status": None, **{field: spec.get(field) for field in CSV_COLUMNS}}
+    try:
+        result = run_full_analysis(spec)
+        synopsis = generate_full_synopsis_data(result)
+        synopsis_file = None
+        if synopsis_format:
+            from utils.synopsis_formatters import save_synopsis
+            synopsis_file, _ = save_synopsis(synopsis, synopsis_format, synopsis_dir)
+    except Exception as e:
+        record.update(status="error", error=str(e), elapsed=round(time.monotonic() - started, 2))
+        return record
+
+    record.update(
+        status="done" if is_complete(result) else "partial",
+        recommended_design=result["design_recommendation"].get("recommended_design"),
+        cvintra=result["design_recommendation"].get("cvintra"),
+        cvintra_source=result["design_recommendation"].get("cvintra_source"),
+        final_sample_size=result["sample_size"].get("final_sample_size"),
+        synopsis_file=synopsis_file,
+        elapsed=round(time.monotonic() - started, 2),
+        analysis=result,
+        synopsis=synopsis
+    )
+    return record
+
+
+# ============= КОНТРОЛЬНАЯ ТОЧКА =============
+
+def read_checkpoint(path: str) -> dict:
+    """
+    Статус и положение последней записи по каждой строке контрольной точки
+
+    Записи читаются по одной и не накапливаются: у записи с row и status в
+    начале разбирается только это начало, остальные разбираются целиком.
+    Оборванная при сбое последняя строка файла пропускается.
+
+    Returns:
+        dict: {номер строки: (статус, смещение записи в файле)}
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            # Без перевода строки может быть только оборванная последняя запись
+            match = _RECORD_PREFIX.match(line) if line.endswith(b"\n") else None
+            if match:
+                entries[int(match.group(1))] = (match.group(2).decode("ascii"), offset)
+            else:
+                try:
+                    record = json.loads(line)
+                    entries[record["row"]] = (record["status"], offset)
+                except (ValueError, KeyError, TypeError):
+                    pass
+            offset += len(line)
+    return entries
+
+
+class Checkpoint:
+    """
+    JSONL, в который запись каждой строки дописывается сразу (flush + fsync)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._drop_incomplete_tail()
+
+    def _drop_incomplete_tail(self):
+        """
+        Отрезать запись, оборванную при сбое: в файле остаются только целые строки
+        """
+        end = self._file.seek(0, os.SEEK_END)
+        if not end:
+            return
+        self._file.seek(end - 1)
+        if self._file.read(1) == b"\n":
+            return
+        while end > 0:
+            start = max(0, end - 65536)
+            self._file.seek(start)
+            newline = self._file.read(end - start).rfind(b"\n")
+            if newline != -1:
+                self._file.truncate(start + newline + 1)
+                return
+            end = start
+        self._file.truncate(0)
+
+    def append(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def compact(path: str) -> int:
+    """
+    Переписать контрольную точку: по записи на строку, по порядку строк
+    (записи копируются по одной, без разбора)
+
+    Returns:
+        int: записей
+    """
+    entries = read_checkpoint(path)
+    directory = os.path.dirname(path) or "."
+    with open(path, "rb") as source, \
+            tempfile.NamedTemporaryFile("wb", dir=directory, delete=False, suffix=".tmp") as f:
+        for row in sorted(entries):
+            source.seek(entries[row][1])
+            line = source.readline()
+            f.write(line if line.endswith(b"\n") else line + b"\n")
+    os.replace(f.name, path)
+    return len(entries)
+
+
+def parquet_row(record: dict) -> dict:
+    """
+    Значения столбцов PARQUET_COLUMNS из записи: отсутствующие - None,
+    полные анализ и синопсис - JSON строками
+    """
+    casts = {"int": int, "float": float, "str": str,
+             "json": lambda value: json.dumps(value, ensure_ascii=False, default=str)}
+    row = {}
+    for name, kind in PARQUET_COLUMNS:
+        value = record.get(name)
+        row[name] = None if value is None else casts[kind](value)
+    return row
+
+
+def write_parquet(jsonl_path: str, path: str, batch_size: int = 500):
+    """
+    Parquet из JSONL контрольной точки: поля строки и итоги анализа - столбцами,
+    полные анализ и синопсис - JSON строками. Записи читаются по одной и
+    пишутся группами по batch_size
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow не установлен. Установите: pip install pyarrow")
+    types = {"int": pyarrow.int64(), "float": pyarrow.float64(), "str": pyarrow.string(), "json": pyarrow.string()}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in PARQUET_COLUMNS])
+
+    with open(jsonl_path, encoding="utf-8") as source, pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        batch = []
+        for line in source:
+            batch.append(parquet_row(json.loads(line)))
+            if len(batch) >= batch_size:
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+
+
+# ============= ЗАПУСК =============
+
+def run_batch(input_path: str, output_path: str, workers: int = None, synopsis_format: str = None,
+              synopsis_dir: str = None, verbose: bool = False) -> dict:
+    """
+    Проанализировать CSV с продолжением с контрольной точки
+
+    Returns:
+        dict: число строк по статусам и пропущенных (уже готовых)
+    """
+    from config import Config
+
+    parquet = output_path.endswith(".parquet")
+    if parquet and not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow не установлен. Установите: pip install pyarrow")
+    checkpoint_path = output_path + ".checkpoint.jsonl" if parquet else output_path
+    synopsis_dir = synopsis_dir or os.path.join(os.path.dirname(output_path) or ".", "synopses")
+    rate_limit_file = Config.NCBI_RATE_LIMIT_FILE or checkpoint_path + ".ncbi_rate"
+
+    done = {row for row, (status, _) in read_checkpoint(checkpoint_path).items() if status == "done"}
+    specs = [(number, spec) for number, spec in read_specs(input_path) if number not in done]
+    counts = {"done": 0, "partial": 0, "error": 0, "skipped": len(done)}
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"📦 {input_path}: к анализу {len(specs)} строк, уже готово {len(done)}, процессов {workers}")
+
+    checkpoint = Checkpoint(checkpoint_path)
+    started = time.monotonic()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(rate_limit_file, verbose)) as executor:
+            remaining = iter(specs)
+            in_flight = set()
+            while True:
+                # Окно задач: остановленный запуск не оставляет тысяч задач в очереди
+                for number, spec in remaining:
+                    in_flight.add(executor.submit(analyze_row, number, spec, synopsis_format, synopsis_dir))
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    checkpoint.append(record)
+                    counts[record["status"]] += 1
+                    processed = counts["done"] + counts["partial"] + counts["error"]
+                    if processed % 50 == 0 or processed == len(specs):
+                        logger.info(f"  {processed}/{len(specs)} ({time.monotonic() - started:.0f} сек)")
+    finally:
+        checkpoint.close()
+
+    compact(checkpoint_path)
+    if parquet:
+        write_parquet(checkpoint_path, output_path)
+    logger.info(f"✅ Готово за {time.monotonic() - started:.0f} сек: {counts}, результат: {output_path}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный полный анализ препаратов из CSV")
+    parser.add_argument("input", help="CSV со столбцами inn, dosage_form, dosage, administration_mode (и cvintra)")
+    parser.add_argument("-o", "--output", required=True, help="результат: .jsonl или .parquet (нужен pyarrow)")
+    parser.add_argument("--workers", type=int, default=None, help="процессов (по умолчанию - число ядер)")
+    parser.add_argument("--synopsis", choices=["json", "markdown", "docx"], default=None,
+                        help="сохранить файл синопсиса для каждой строки")
+    parser.add_argument("--synopsis-dir", default=None, help="папка синопсисов (по умолчанию <папка результата>/synopses)")
+    parser.add_argument("--verbose", action="store_true", help="подробный лог анализа в процессах пула")
+    args = parser.parse_args()
+
+    counts = run_batch(args.input, args.output, args.workers, args.synopsis, args.synopsis_dir, args.verbose)
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Фоновые задачи: полный анализ и генерация синопсиса
+
+POST /api/jobs/... сразу возвращает id задачи, а сама задача выполняется в
+ограниченном пуле потоков (JOB_WORKERS). GET /api/jobs/<id> возвращает
+статус, этап, прогресс и результат (для синопсиса - ссылку на файл).
+
+Задачи хранятся в SQLite (JOBS_DB_PATH): после перезапуска процесса
+незавершенные задачи запускаются снова. Задача переходит из "queued" в
+"running" условным UPDATE, поэтому ее не выполнят два процесса сразу, а
+выполняемые задачи периодически отмечаются (heartbeat): задача процесса,
+который остановился, через 3 * JOB_HEARTBEAT секунд возвращается в очередь.
+Завершенные задачи старше JOB_RETENTION удаляются той же фоновой проверкой.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "error")
+
+
+class JobQueueFull(RuntimeError):
+    """Слишком много задач в очереди"""
+
+
+# ============= ОБРАБОТЧИКИ =============
+
+def run_analysis_job(params: dict, progress) -> tuple:
+    """
+    Полный анализ (как /api/full-analysis); прогресс - по мере ответов источников
+
+    Returns:
+        tuple: (результат, путь к файлу или None)
+    """
+    from utils.analysis import run_analysis
+
+    def on_source(source: str, answered: int, total: int):
+        progress(source, 0.1 + 0.8 * answered / total)
+
+    progress("analysis", 0.1)
+    results, _ = run_analysis(params, on_source=on_source)
+    return results, None
+
+
+def run_synopsis_job(params: dict, progress) -> tuple:
+    """
+    Синопсис (как /api/generate-full-synopsis)
+
+    Returns:
+        tuple: (описание файла, путь к файлу)
+    """
+    from config import Config
+    from utils.full_synopsis_generator import generate_full_synopsis_data
+    from utils.synopsis_formatters import save_synopsis
+
+    progress("synopsis_data", 0.2)
+    synopsis_data = generate_full_synopsis_data(params)
+    progress("synopsis_file", 0.6)
+    output_path, output_format = save_synopsis(synopsis_data, params.get("output_format", "markdown"),
+                                               Config.OUTPUT_DIR)
+    return {"output_format": output_format, "filename": os.path.basename(output_path)}, output_path
+
+
+JOB_KINDS = {
+    "full_analysis": run_analysis_job,
+    "synopsis": run_synopsis_job
+}
+
+
+# ============= ХРАНИЛИЩЕ =============
+
+class JobStore:
+    """
+    Задачи в SQLite: параметры, статус, прогресс, результат
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                params TEXT NOT NULL,
+                result TEXT,
+                file_path TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at);
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, sql: str, args: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, args)
+            self._conn.commit()
+            return cursor
+
+    def create(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(params, ensure_ascii=False), now, now)
+        )
+        return job_id
+
+    def claim(self, job_id: str) -> bool:
+        """
+        Перевести задачу в "running", если она еще в очереди
+        """
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        )
+        return cursor.rowcount == 1
+
+    def progress(self, job_id: str, stage: str, progress: float):
+        # Запоздавший прогресс не меняет завершенную задачу
+        self._execute("UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                      (stage, progress, time.time(), job_id))
+
+    def finish(self, job_id: str, result, file_path: str = None):
+        self._execute(
+            "UPDATE jobs SET status = 'done', stage = 'done', progress = 1, result = ?, file_path = ?, "
+            "updated_at = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), file_path, time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = 'error', error = ?, updated_at = ? WHERE id = ?",
+                      (error, time.time(), job_id))
+
+    def get(self, job_id: str) -> dict:
+        """
+        Задача или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, stage, progress, params, result, file_path, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, status, stage, progress, params, result, file_path, error, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "stage": stage,
+            "progress": progress,
+            "params": json.loads(params),
+            "result": json.loads(result) if result else None,
+            "file_path": file_path,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def params(self, job_id: str) -> tuple:
+        """
+        Returns:
+            tuple: (тип задачи, параметры)
+        """
+        job = self.get(job_id)
+        return job["kind"], job["params"]
+
+    def touch(self, job_ids: list):
+        """
+        Отметить, что задачи "running" еще выполняются
+        """
+        if job_ids:
+            placeholders = ", ".join("?" * len(job_ids))
+            self._execute(f"UPDATE jobs SET updated_at = ? WHERE status = 'running' AND id IN ({placeholders})",
+                          (time.time(), *job_ids))
+
+    def queued_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def unfinished(self, stale_after: float) -> list:
+        """
+        Задачи для запуска: в очереди и "running" без обновлений дольше
+        stale_after секунд (последние возвращаются в очередь)
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (time.time(), time.time() - stale_after)
+            )
+            self._conn.commit()
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        """
+        Удалить завершенные задачи старше older_than секунд
+        """
+        cursor = self._execute("DELETE FROM jobs WHERE status IN ('done', 'error') AND updated_at < ?",
+                               (time.time() - older_than,))
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+
+# ============= ВЫПОЛНЕНИЕ =============
+
+class JobRunner:
+    """
+    Ограниченный пул потоков, выполняющий задачи из JobStore
+
+    Фоновый поток раз в heartbeat секунд обновляет updated_at выполняемых
+    задач и подхватывает задачи из очереди и "running" без обновлений дольше
+    3 * heartbeat (процесс, выполнявший их, остановлен); не чаще раза в
+    purge_interval удаляет завершенные задачи старше retention.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, queue_limit: int = 100, heartbeat: float = 10,
+                 retention: float = None, purge_interval: float = 3600):
+        """
+        Args:
+            workers: задач, выполняемых одновременно
+            queue_limit: задач в очереди, сверх которых новые отклоняются
+            heartbeat: период обновления выполняемых задач и проверки очереди, сек
+            retention: секунд хранения завершенных задач (None - не удалять)
+            purge_interval: секунд между удалениями завершенных задач
+        """
+        self.store = store
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.heartbeat = heartbeat
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._local = set()  # задачи, отправленные в пул этого процесса
+        self._local_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def submit(self, kind: str, params: dict) -> str:
+        """
+        Поставить задачу в очередь
+
+        Raises:
+            JobQueueFull: в очереди уже queue_limit задач
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+        if self.store.queued_count() >= self.queue_limit:
+            raise JobQueueFull(f"в очереди {self.queue_limit} задач")
+        job_id = self.store.create(kind, params)
+        self._enqueue(job_id)
+        logger.info(f"📥 Задача {kind} {job_id} поставлена в очередь")
+        return job_id
+
+    def _enqueue(self, job_id: str) -> bool:
+        with self._local_lock:
+            if job_id in self._local:
+                return False
+            self._local.add(job_id)
+        self._executor.submit(self._run, job_id)
+        return True
+
+    def sweep(self) -> int:
+        """
+        Обновить выполняемые задачи, запустить незавершенные (в том числе
+        оставшиеся после перезапуска процесса) и удалить старые завершенные
+
+        Returns:
+            int: задач поставлено в пул
+        """
+        with self._local_lock:
+            local = list(self._local)
+        self.store.touch(local)
+        if self.retention is not None and time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            purged = self.store.purge(self.retention)
+            if purged:
+                logger.info(f"🧹 Удалено завершенных задач: {purged}")
+        resumed = sum(self._enqueue(job_id) for job_id in self.store.unfinished(3 * self.heartbeat))
+        if resumed:
+            logger.info(f"🔁 Возобновлено задач: {resumed}")
+        return resumed
+
+    def start(self):
+        """
+        Запустить незавершенные задачи и фоновую проверку
+        """
+        self.sweep()
+
+        def loop():
+            while not self._stopped.wait(self.heartbeat):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning(f"⚠️ Проверка задач не удалась: {e}")
+
+        threading.Thread(target=loop, name="job-heartbeat", daemon=True).start()
+
+    def _run(self, job_id: str):
+        try:
+            if not self.store.claim(job_id):
+                return  # задачу уже выполняет другой процесс
+            self._execute(job_id)
+        finally:
+            with self._local_lock:
+                self._local.discard(job_id)
+
+    def _execute(self, job_id: str):
+        kind, params = self.store.params(job_id)
+        started = time.monotonic()
+
+        def progress(stage: str, fraction: float):
+            self.store.progress(job_id, stage, fraction)
+
+        try:
+            result, file_path = JOB_KINDS[kind](params, progress)
+        except Exception as e:
+            logger.error(f"❌ Задача {kind} {job_id}: {e}", exc_info=True)
+            self.store.fail(job_id, str(e))
+            return
+        self.store.finish(job_id, result, file_path)
+        logger.info(f"✅ Задача {kind} {job_id} выполнена за {time.monotonic() - started:.1f} сек")
+
+    def stats(self) -> dict:
+        with self._local_lock:
+            local = len(self._local)
+        return dict(self.store.stats(), local=local, workers=self.workers, queue_limit=self.queue_limit)
+
+    def shutdown(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+_runner_instance = None
+_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """
+    Получить общий пул фоновых задач (при создании запускает незавершенные задачи)
+    """
+    global _runner_instance
+    if _runner_instance is None:
+        with _runner_lock:
+            if _runner_instance is None:
+                from config import Config
+                store = JobStore(Config.JOBS_DB_PATH)
+                runner = JobRunner(store, Config.JOB_WORKERS, Config.JOB_QUEUE_LIMIT, Config.JOB_HEARTBEAT,
+                                   Config.JOB_RETENTION)
+                runner.start()
+                _runner_instance = runner
+    return _runner_instance
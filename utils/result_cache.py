@@ -0,0 +1,206 @@
+"""
+Кэш результатов полного анализа (/api/full-analysis) в памяти процесса
+
+Ключ - нормализованные параметры запроса (МНН, форма, дозировка, режим
+приема, CVintra). Записей не больше max_entries (вытесняются давно не
+запрошенные, LRU); запись старше ttl считается устаревшей: она сразу
+отдается клиенту, а свежий результат считается в фоне (stale-while-revalidate).
+Запись старше ttl + max_stale (фоновое обновление так и не удалось)
+удаляется и больше не отдается.
+
+Неполные результаты (источник не ответил или переполнен) не кэшируются.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def result_key(params: dict) -> tuple:
+    """
+    Ключ кэша из параметров анализа (utils.analysis.analysis_params)
+
+    Регистр и лишние пробелы не различаются, "25" и 25.0 для CVintra - одно значение.
+    """
+    cvintra = params.get("cvintra")
+    if cvintra is not None:
+        try:
+            cvintra = round(float(cvintra), 2)
+        except (TypeError, ValueError):
+            cvintra = _normalize_text(cvintra)
+    return (
+        _normalize_text(params.get("inn")),
+        _normalize_text(params.get("dosage_form")),
+        _normalize_text(params.get("dosage")).replace(" ", ""),
+        _normalize_text(params.get("administration_mode")),
+        cvintra
+    )
+
+
+# Окончательные ответы источника: "not_found" - источник ответил, что данных нет.
+# "timeout", "error", "overloaded" и отчет без статуса - ответа не было
+COMPLETE_STATUSES = ("ok", "not_found")
+
+
+def is_complete(result: dict) -> bool:
+    """
+    Все источники дали окончательный ответ - результат можно кэшировать
+    (и не пересчитывать при продолжении пакета)
+    """
+    sources = result.get("sources")
+    return bool(sources) and all(report.get("status") in COMPLETE_STATUSES for report in sources.values())
+
+
+class ResultCache:
+    """
+    TTL + LRU кэш результатов анализа с фоновым обновлением устаревших записей
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, refresh_workers: int = 2,
+                 max_stale: float = 86400):
+        """
+        Args:
+            max_entries: максимум записей, сверх - вытесняются давно не запрошенные
+            ttl: секунд, после которых запись отдается как устаревшая и обновляется в фоне
+            refresh_workers: потоков для фонового обновления
+            max_stale: секунд после ttl, после которых устаревшая запись удаляется
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries = OrderedDict()  # key -> (result, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="result-refresh")
+        self._stats = {"hits": 0, "stale": 0, "misses": 0, "evictions": 0, "refreshes": 0, "expired": 0}
+
+    def get(self, key: tuple) -> tuple:
+        """
+        Returns:
+            tuple: (результат или None, статус: "hit" | "stale" | "miss")
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, "miss"
+            result, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age >= self.ttl + self.max_stale:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None, "miss"
+            self._entries.move_to_end(key)
+            status = "hit" if age < self.ttl else "stale"
+            self._stats["hits" if status == "hit" else "stale"] += 1
+            return result, status
+
+    def put(self, key: tuple, result: dict) -> bool:
+        """
+        Сохранить результат (неполный не сохраняется)
+
+        Returns:
+            bool: результат сохранен
+        """
+        if not is_complete(result):
+            return False
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def get_or_compute(self, key: tuple, compute, refresh=None) -> tuple:
+        """
+        Результат из кэша или compute(); устаревший результат отдается сразу,
+        refresh() (по умолчанию compute()) для него запускается в фоне
+
+        Args:
+            refresh: вычисление для фонового обновления, если compute привязан
+                     к вызывающему (например, сообщает прогресс его задаче)
+
+        Returns:
+            tuple: (результат, статус: "hit" | "stale" | "miss")
+        """
+        result, status = self.get(key)
+        if status == "miss":
+            result = compute()
+            self.put(key, result)
+        elif status == "stale":
+            self.refresh(key, refresh or compute)
+        return result, status
+
+    def refresh(self, key: tuple, compute):
+        """
+        Обновить запись в фоне (не больше одного обновления на ключ одновременно)
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+
+        def run():
+            try:
+                if not self.put(key, compute()):
+                    logger.warning(f"⚠️ Фоновое обновление анализа {key[0]} вернуло неполный результат")
+                    self._drop_expired(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Фоновое обновление анализа {key[0]} не удалось: {e}")
+                self._drop_expired(key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        logger.info(f"🔄 Результат для {key[0]} устарел, обновляю в фоне")
+        self._refresher.submit(run)
+
+    def _drop_expired(self, key: tuple):
+        """
+        Удалить запись, если она устарела больше чем на max_stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] >= self.ttl + self.max_stale:
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), max_entries=self.max_entries,
+                        ttl=self.ttl, max_stale=self.max_stale, refreshing=len(self._refreshing))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton instance
+_result_cache_instance = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """
+    Получить общий кэш результатов анализа (None, если кэш отключен в конфиге)
+    """
+    global _result_cache_instance
+    if _result_cache_instance is None:
+        with _result_cache_lock:
+            if _result_cache_instance is None:
+                from config import Config
+                if Config.RESULT_CACHE_SIZE <= 0 or Config.RESULT_CACHE_TTL <= 0:
+                    return None
+                _result_cache_instance = ResultCache(Config.RESULT_CACHE_SIZE, Config.RESULT_CACHE_TTL,
+                                                     max_stale=Config.RESULT_CACHE_MAX_STALE)
+    return _result_cache_instance
@@ -0,0 +1,271 @@
+"""
+Общий для приложения пул опроса источников (PubMed, DrugBank, ГРЛС)
+
+У каждого источника свой пул потоков на Config.MAX_WORKERS потоков
+(bulkhead): зависший ГРЛС занимает только свои потоки и не задерживает
+PubMed и DrugBank, а число одновременных запросов к каждому источнику
+ограничено независимо от числа пользователей. Очередь источника тоже
+ограничена (SOURCE_QUEUE_LIMIT): при переполнении задача сразу
+отклоняется, и источник получает статус "overloaded".
+
+Одинаковые запросы объединяются (single-flight): пока данные источника по
+МНН загружаются, повторные вызовы для того же МНН ждут этот же запрос, а не
+отправляют новый (счетчик "coalesced").
+
+Пулы и скраперы создаются один раз на процесс (get_source_executor).
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SOURCES = ("pubmed", "drugbank", "grls")
+
+
+class SourceOverloaded(RuntimeError):
+    """Очередь источника заполнена"""
+
+
+class FlightAbandoned(RuntimeError):
+    """Общий запрос отменен до получения результата"""
+
+
+class _Flight:
+    """
+    Выполняющийся запрос источника, который ждут несколько вызывающих
+
+    cancellable: запрос отменяется, когда его перестали ждать все вызывающие
+    (задача в пуле; асинхронный запрос отменяет только его владелец)
+    """
+
+    def __init__(self, future: Future, cancellable: bool):
+        self.future = future
+        self.cancellable = cancellable
+        self.waiters = 0
+
+
+class SourceExecutor:
+    """
+    Пулы потоков по источникам с показателями нагрузки
+    """
+
+    def __init__(self, workers: int = 3, queue_limit: int = 50, sources: tuple = SOURCES):
+        """
+        Args:
+            workers: потоков на источник
+            queue_limit: задач в очереди источника, сверх которых задачи отклоняются
+        """
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._flights_lock = threading.Lock()
+        self._flights = {}  # (source, key) -> _Flight
+        self._scrapers = {}
+        self._pools = {
+            source: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"source-{source}")
+            for source in sources
+        }
+        self._gauges = {
+            source: {"active": 0, "queued": 0, "completed": 0, "rejected": 0, "coalesced": 0}
+            for source in sources
+        }
+        logger.info(f"🧵 Пул источников: {', '.join(sources)} по {workers} потока, очередь до {queue_limit}")
+
+    def submit(self, source: str, fn, *args, **kwargs):
+        """
+        Запустить задачу в пуле источника
+
+        Raises:
+            SourceOverloaded: очередь источника заполнена
+        """
+        gauges = self._gauges[source]
+        with self._lock:
+            if gauges["queued"] >= self.queue_limit:
+                gauges["rejected"] += 1
+                raise SourceOverloaded(f"{source}: в очереди {gauges['queued']} задач")
+            gauges["queued"] += 1
+
+        def run():
+            with self._lock:
+                gauges["queued"] -= 1
+                gauges["active"] += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    gauges["active"] -= 1
+                    gauges["completed"] += 1
+
+        future = self._pools[source].submit(run)
+        future.add_done_callback(lambda f: self._cancelled(gauges) if f.cancelled() else None)
+        return future
+
+    def _cancelled(self, gauges: dict):
+        # Отмененная задача не запускалась и осталась в счетчике очереди
+        with self._lock:
+            gauges["queued"] -= 1
+
+    def submit_shared(self, source: str, key: str, fn, *args) -> Future:
+        """
+        Как submit, но пока задача (source, key) выполняется, повторные вызовы
+        получают ее результат вместо запуска новой задачи
+
+        У каждого вызывающего свой future: его отмена не отменяет задачу, пока
+        результат ждут другие.
+
+        Raises:
+            SourceOverloaded: очередь источника заполнена
+        """
+        with self._flights_lock:
+            flight = self._flights.get((source, key))
+            leader = flight is None
+            if leader:
+                flight = _Flight(self.submit(source, fn, *args), cancellable=True)
+                self._flights[(source, key)] = flight
+            else:
+                self._coalesced(source, key)
+            waiter = self._waiter(flight)
+
+        if leader:
+            flight.future.add_done_callback(lambda f: self._land(source, key, flight))
+        return waiter
+
+    async def run_shared(self, source: str, key: str, make_coroutine):
+        """
+        Асинхронный вариант submit_shared: корутина make_coroutine() выполняется
+        в цикле событий первого вызвавшего, остальные ждут ее результат
+
+        Если первый вызвавший отменен (истек его срок), ожидающие выполняют
+        запрос сами.
+        """
+        while True:
+            with self._flights_lock:
+                flight = self._flights.get((source, key))
+                leader = flight is None
+                if leader:
+                    flight = _Flight(Future(), cancellable=False)
+                    self._flights[(source, key)] = flight
+                else:
+                    self._coalesced(source, key)
+                    waiter = self._waiter(flight)
+
+            if leader:
+                try:
+                    result = await make_coroutine()
+                except asyncio.CancelledError:
+                    flight.future.cancel()
+                    raise
+                except Exception as e:
+                    flight.future.set_exception(e)
+                    raise
+                else:
+                    flight.future.set_result(result)
+                    return result
+                finally:
+                    self._land(source, key, flight)
+
+            try:
+                return await asyncio.wrap_future(waiter)
+            except FlightAbandoned:
+                continue
+
+    def _coalesced(self, source: str, key: str):
+        with self._lock:
+            self._gauges[source]["coalesced"] += 1
+        logger.info(f"🔗 {source}: запрос для {key} уже выполняется, жду его результат")
+
+    def _waiter(self, flight: _Flight) -> Future:
+        # Вызывается под _flights_lock
+        waiter = Future()
+        flight.waiters += 1
+
+        def relay(f: Future):
+            try:
+                if f.cancelled():
+                    waiter.set_exception(FlightAbandoned("общий запрос отменен"))
+                elif f.exception() is not None:
+                    waiter.set_exception(f.exception())
+                else:
+                    waiter.set_result(f.result())
+            except InvalidStateError:
+                pass  # вызывающий уже отменил свой future
+
+        def leave(w: Future):
+            if not w.cancelled():
+                return
+            with self._flights_lock:
+                flight.waiters -= 1
+                unused = flight.cancellable and flight.waiters == 0
+            if unused:
+                flight.future.cancel()
+
+        waiter.add_done_callback(leave)
+        flight.future.add_done_callback(relay)
+        return waiter
+
+    def _land(self, source: str, key: str, flight: _Flight):
+        with self._flights_lock:
+            if self._flights.get((source, key)) is flight:
+                del self._flights[(source, key)]
+
+    def scraper(self, source: str):
+        """
+        Скрапер источника, общий для всех запросов (создается при первом обращении)
+        """
+        with self._lock:
+            if source not in self._scrapers:
+                self._scrapers[source] = self._create_scraper(source)
+            return self._scrapers[source]
+
+    @staticmethod
+    def _create_scraper(source: str):
+        if source == "pubmed":
+            from scrapers.pubmed_scraper import PubMedScraper
+            return PubMedScraper()
+        if source == "drugbank":
+            from scrapers.drugbank_scraper import DrugBankScraper
+            return DrugBankScraper()
+        if source == "grls":
+            from scrapers.grls_scraper import GRLSScraper
+            return GRLSScraper()
+        raise ValueError(f"Неизвестный источник: {source}")
+
+    def stats(self) -> dict:
+        """
+        Показатели по источникам: active (выполняются), queued (ждут потока),
+        completed, rejected (отклонены при заполненной очереди),
+        coalesced (вызовы, получившие результат уже выполнявшегося запроса)
+        """
+        with self._lock:
+            return {
+                source: dict(gauges, workers=self.workers)
+                for source, gauges in self._gauges.items()
+            }
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+def get_source_executor() -> SourceExecutor:
+    """
+    Получить общий пул опроса источников
+    """
+    global _executor_instance
+    if _executor_instance is None:
+        with _executor_lock:
+            if _executor_instance is None:
+                try:
+                    from config import Config
+                    workers, queue_limit = Config.MAX_WORKERS, Config.SOURCE_QUEUE_LIMIT
+                except ImportError:
+                    workers, queue_limit = 3, 50
+                _executor_instance = SourceExecutor(workers, queue_limit)
+    return _executor_instance
@@ -391,4 +391,67 @@ def generate_markdown_synopsis(synopsis_data: Dict[str, Any]) -> str:
     
     md += "\n---\n\n*Документ автоматически сгенерирован системой BE Study Design AI Assistant*\n"
     
-    return md
\ No newline at end of file
+    return md
+
+def synopsis_file_slug(inn: Any) -> str:
+    """
+    МНН для имени файла синопсиса: буквы, цифры, "_" и "-"
+
+    Разделители путей и прочие символы заменяются на "_"; пустой МНН
+    и "N/A" (значение по умолчанию generate_full_synopsis_data) - "unknown".
+    """
+    import re
+
+    text = str(inn or '').strip()
+    if text.upper() == 'N/A':
+        return 'unknown'
+    slug = re.sub(r'[^\w-]+', '_', text).strip('_')[:80]
+    return slug or 'unknown'
+
+
+def save_synopsis(synopsis_data: Dict[str, Any], output_format: str, output_dir: str) -> tuple:
+    """
+    Сохраняет синопсис в файл (json, markdown или docx)
+
+    Без python-docx вместо DOCX сохраняется markdown. Существующий файл с тем
+    же именем (тот же МНН в ту же секунду) не перезаписывается: имя занимается
+    созданием файла в режиме "x", занятое имя получает суффикс _1, _2, ...
+
+    Returns:
+        tuple: (путь к файлу, фактический формат)
+    """
+    import json
+    import os
+    from datetime import datetime
+
+    if output_format == 'docx' and not DOCX_AVAILABLE:
+        logger.warning("  ⚠️ python-docx не установлен, используем markdown вместо docx")
+        output_format = 'markdown'
+    extension = {'json': '.json', 'docx': '.docx'}.get(output_format, '.md')
+
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    inn = synopsis_file_slug(synopsis_data.get('inn'))
+    base_path = os.path.join(output_dir, f"synopsis_{inn}_{timestamp}")
+    output_path, copy = base_path + extension, 1
+    while True:
+        try:
+            # Создание и проверка имени - одна операция: параллельный запрос не получит то же имя
+            open(output_path, 'x').close()
+            break
+        except FileExistsError:
+            output_path, copy = f"{base_path}_{copy}{extension}", copy + 1
+
+    if output_format == 'json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(synopsis_data, f, ensure_ascii=False, indent=2)
+        logger.info(f"  ✅ JSON синопсис сохранен: {output_path}")
+    elif output_format == 'docx':
+        generate_docx_synopsis(synopsis_data, output_path)
+        logger.info(f"  ✅ DOCX синопсис сохранен: {output_path}")
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(generate_markdown_synopsis(synopsis_data))
+        logger.info(f"  ✅ Markdown синопсис сохранен: {output_path}")
+        output_format = 'markdown'
+    return output_path, output_format